@@ -1,19 +1,13 @@
 from playwright.sync_api import sync_playwright
 
+from schema_discovery import iter_nodes
+
 def find_paths(data, target_value, path=""):
-    """Recursive function to find where a specific value lives in the JSON"""
-    if isinstance(data, dict):
-        for k, v in data.items():
-            new_path = f"{path}.{k}"
-            if str(v) == str(target_value):
-                print(f"🎯 FOUND '{target_value}' at: {new_path}")
-            find_paths(v, target_value, new_path)
-    elif isinstance(data, list):
-        for i, item in enumerate(data):
-            new_path = f"{path}[{i}]"
-            if str(item) == str(target_value):
-                print(f"🎯 FOUND '{target_value}' at: {new_path}")
-            find_paths(item, target_value, new_path)
+    """Prints every path where a specific value lives in the JSON (see schema_discovery.py for bulk)"""
+    target = str(target_value)
+    for node_path, _, value in iter_nodes(data, normalize=False):
+        if str(value) == target:
+            print(f"🎯 FOUND '{target_value}' at: {path}{node_path}")
 
 def debug_fotmob_structure():
     with sync_playwright() as p:
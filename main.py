@@ -1,5 +1,16 @@
+import os
+
+import uvicorn
+
+
 def main():
-    print("Hello from gem-scouting!")
+    # Read API (src/api/app.py); one event loop + response cache per worker
+    uvicorn.run(
+        "src.api.app:app",
+        host=os.getenv("API_HOST", "127.0.0.1"),
+        port=int(os.getenv("API_PORT", "8000")),
+        workers=int(os.getenv("API_WORKERS", "1")),
+    )
 
 
 if __name__ == "__main__":
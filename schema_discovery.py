@@ -0,0 +1,312 @@
+"""
+Offline schema discovery over saved __NEXT_DATA__ payloads.
+
+When FotMob moves a field, find where it went across thousands of payloads:
+
+    python schema_discovery.py build data/payload_cache --kind player
+    python schema_discovery.py query --key birthDate
+    python schema_discovery.py query --value 2000-07-21
+    python schema_discovery.py query --path height
+
+`build` walks every payload in parallel (one process per core) and writes an
+inverted index: value -> paths and key -> paths, each with the number of
+payloads it appears in. Queries are a binary search / dict lookup on it.
+Paths are normalized so they line up across payloads: list positions
+become [] and long digit runs in keys (IDs) become {n}.
+"""
+import argparse
+import hashlib
+import json
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.ingestion.payload_cache import DEFAULT_CACHE_DIR, PayloadCache
+
+DEFAULT_INDEX_PATH = "data/schema_index.npz"
+MAX_VALUE_LEN = 120          # Longer strings (HTML, descriptions) aren't worth indexing
+FILES_PER_TASK = 64
+
+_ID_IN_KEY = re.compile(r"\d{4,}")
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}[t ]")
+
+
+# --- Traversal ---
+
+@lru_cache(maxsize=1 << 16)
+def _key_part(key: str) -> str:
+    return _ID_IN_KEY.sub("{n}", key)
+
+
+def iter_nodes(data, normalize: bool = True) -> Iterator[Tuple[str, str, object]]:
+    """
+    Yields (path, key, value) for every node below `data`, depth-first.
+    `key` is the dict key the node sits under ("" for list items).
+    Iterative (explicit stack), so payload depth is never a recursion limit.
+    """
+    stack = [("", "", data)]
+    while stack:
+        path, key, value = stack.pop()
+        if path:
+            yield path, key, value
+        # Children are pushed in reverse so they come out in document order
+        if isinstance(value, dict):
+            for child_key, child in reversed(value.items()):
+                part = _key_part(child_key) if normalize else child_key
+                stack.append((f"{path}.{part}", child_key, child))
+        elif isinstance(value, list):
+            for i in range(len(value) - 1, -1, -1):
+                stack.append((f"{path}[]" if normalize else f"{path}[{i}]", "", value[i]))
+
+
+def normalize_value(value) -> List[str]:
+    """Index/query forms of a leaf: lowercased text, plus the date of ISO datetimes."""
+    if isinstance(value, bool):
+        return ["true" if value else "false"]
+    if isinstance(value, (int, float)):
+        return [str(int(value)) if float(value).is_integer() else repr(float(value))]
+    if isinstance(value, str) and len(value) <= MAX_VALUE_LEN:
+        text = value.strip().lower()
+        if _ISO_DATE.match(text):
+            return [text, text[:10]]
+        return [text] if text else []
+    return []
+
+
+def value_hash(text: str) -> int:
+    """Stable 63-bit hash (Python's hash() differs between worker processes)."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little") >> 1
+
+
+@lru_cache(maxsize=1 << 18, typed=True)
+def leaf_hashes(value) -> Tuple[int, ...]:
+    """value_hash of every indexed form of a leaf; leaves repeat a lot across payloads."""
+    return tuple(value_hash(text) for text in normalize_value(value))
+
+
+# --- Build (runs in worker processes) ---
+
+def load_payload(path: Path) -> Optional[dict]:
+    raw = path.read_bytes()
+    if path.suffix == ".z":
+        raw = zlib.decompress(raw)
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def index_files(files: List[Path]):
+    """
+    Indexes a chunk of payload files. Each (value, path) pair and each path
+    counts once per payload. Returns local path table + numpy arrays so
+    only compact data crosses back to the parent.
+    """
+    path_ids: Dict[str, int] = {}
+    path_keys: List[str] = []
+    path_payloads: List[int] = []
+    chunks: List[np.ndarray] = []
+    payloads = 0
+
+    for file in files:
+        try:
+            data = load_payload(file)
+        except (OSError, zlib.error):
+            data = None
+        if data is None:
+            continue
+        payloads += 1
+        seen_paths, pairs = set(), set()
+        for path, key, value in iter_nodes(data):
+            pid = path_ids.get(path)
+            if pid is None:
+                pid = path_ids[path] = len(path_keys)
+                path_keys.append(key)
+                path_payloads.append(0)
+            if pid not in seen_paths:
+                seen_paths.add(pid)
+                path_payloads[pid] += 1
+            if not isinstance(value, (dict, list)):
+                for digest in leaf_hashes(value):
+                    pairs.add((digest, pid))
+        if pairs:
+            chunks.append(np.array(list(pairs), dtype=np.int64))
+
+    merged = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+    hashes, pids, counts = _count_pairs(merged[:, 0], merged[:, 1], np.ones(len(merged), dtype=np.int64))
+    return payloads, list(path_ids), path_keys, np.array(path_payloads, dtype=np.int64), hashes, pids, counts
+
+
+def _count_pairs(hashes: np.ndarray, pids: np.ndarray, counts: np.ndarray):
+    """Sums counts of identical (hash, path id) pairs; output sorted by hash."""
+    if not len(hashes):
+        return hashes, pids, counts
+    order = np.lexsort((pids, hashes))
+    hashes, pids, counts = hashes[order], pids[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, (hashes[1:] != hashes[:-1]) | (pids[1:] != pids[:-1])])
+    return hashes[starts], pids[starts], np.add.reduceat(counts, starts)
+
+
+# --- Index ---
+
+class SchemaIndex:
+    """
+    paths[i] appears in path_payloads[i] payloads; value_hashes (sorted) /
+    value_paths / value_counts say in how many payloads a value sat at a path.
+    """
+
+    def __init__(self, payloads: int, paths: List[str], path_keys: List[str], path_payloads: np.ndarray,
+                 value_hashes: np.ndarray, value_paths: np.ndarray, value_counts: np.ndarray):
+        self.payloads = payloads
+        self.paths = paths
+        self.path_keys = path_keys
+        self.path_payloads = path_payloads
+        self.value_hashes = value_hashes
+        self.value_paths = value_paths
+        self.value_counts = value_counts
+        self.by_key: Dict[str, List[int]] = {}
+        for pid, key in enumerate(path_keys):
+            if key:
+                self.by_key.setdefault(key.lower(), []).append(pid)
+
+    def _rows(self, pids, counts) -> List[Tuple[str, int, float]]:
+        rows = [(self.paths[pid], int(count), count / max(self.payloads, 1)) for pid, count in zip(pids, counts)]
+        return sorted(rows, key=lambda row: (-row[1], row[0]))
+
+    def where_value(self, value) -> List[Tuple[str, int, float]]:
+        """(path, payloads, share) for every path holding this value."""
+        forms = normalize_value(value) or [str(value).lower()]
+        target = value_hash(forms[0])
+        lo = np.searchsorted(self.value_hashes, target, side="left")
+        hi = np.searchsorted(self.value_hashes, target, side="right")
+        return self._rows(self.value_paths[lo:hi], self.value_counts[lo:hi])
+
+    def where_key(self, key: str) -> List[Tuple[str, int, float]]:
+        """(path, payloads, share) for every path ending in this key."""
+        pids = self.by_key.get(key.lower(), [])
+        return self._rows(pids, self.path_payloads[pids])
+
+    def paths_like(self, fragment: str) -> List[Tuple[str, int, float]]:
+        fragment = fragment.lower()
+        pids = [pid for pid, path in enumerate(self.paths) if fragment in path.lower()]
+        return self._rows(pids, self.path_payloads[pids])
+
+    def save(self, path: str = DEFAULT_INDEX_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path, payloads=self.payloads, path_payloads=self.path_payloads,
+            value_hashes=self.value_hashes, value_paths=self.value_paths, value_counts=self.value_counts,
+            paths=np.array(json.dumps([self.paths, self.path_keys])),
+        )
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH) -> "SchemaIndex":
+        data = np.load(path)
+        paths, keys = json.loads(str(data["paths"]))
+        return cls(int(data["payloads"]), paths, keys, data["path_payloads"],
+                   data["value_hashes"], data["value_paths"], data["value_counts"])
+
+
+def payload_files(root: str, kind: Optional[str] = None) -> List[Path]:
+    """Newest blob per entity for a PayloadCache dir, else every *.json / *.json.z below root."""
+    root = Path(root)
+    if (root / "index.sqlite").exists():
+        with PayloadCache(str(root)) as cache:
+            return cache.latest_blob_paths(kind)
+    return sorted([*root.rglob("*.json"), *root.rglob("*.json.z")])
+
+
+def build_index(files: List[Path], workers: Optional[int] = None) -> SchemaIndex:
+    """Indexes the files in parallel and merges the per-chunk results."""
+    chunks = [files[i:i + FILES_PER_TASK] for i in range(0, len(files), FILES_PER_TASK)]
+    paths: Dict[str, int] = {}
+    path_keys: List[str] = []
+    path_payloads: List[int] = []
+    payloads = 0
+    hashes, pids, counts = [], [], []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for n, local_paths, local_keys, local_payloads, h, p, c in executor.map(index_files, chunks):
+            payloads += n
+            remap = np.empty(len(local_paths), dtype=np.int64)
+            for local_id, path in enumerate(local_paths):
+                global_id = paths.get(path)
+                if global_id is None:
+                    global_id = paths[path] = len(path_keys)
+                    path_keys.append(local_keys[local_id])
+                    path_payloads.append(0)
+                path_payloads[global_id] += int(local_payloads[local_id])
+                remap[local_id] = global_id
+            hashes.append(h)
+            pids.append(remap[p] if len(p) else p)
+            counts.append(c)
+
+    if hashes:
+        merged = _count_pairs(np.concatenate(hashes), np.concatenate(pids), np.concatenate(counts))
+    else:
+        merged = (np.empty(0, dtype=np.int64),) * 3
+    return SchemaIndex(payloads, list(paths), path_keys, np.array(path_payloads, dtype=np.int64), *merged)
+
+
+# --- CLI ---
+
+def _print_rows(title: str, rows, limit: int):
+    print(f"\n🎯 {title}: {len(rows)} path(s)")
+    for path, count, share in rows[:limit]:
+        print(f"   {share:7.1%}  {count:>7,}  {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="index a directory of saved payloads")
+    build.add_argument("root", nargs="?", default=DEFAULT_CACHE_DIR)
+    build.add_argument("--kind", help="PayloadCache kind to index (default: all)")
+    build.add_argument("--workers", type=int)
+    build.add_argument("--out", default=DEFAULT_INDEX_PATH)
+
+    query = commands.add_parser("query", help="look up where a key or value lives")
+    query.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    query.add_argument("--key", action="append", default=[])
+    query.add_argument("--value", action="append", default=[])
+    query.add_argument("--path", action="append", default=[], help="substring of the path")
+    query.add_argument("--limit", type=int, default=25)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        files = payload_files(args.root, args.kind)
+        print(f"📂 Indexing {len(files):,} payload(s) from {args.root}...")
+        started = time.perf_counter()
+        index = build_index(files, args.workers)
+        index.save(args.out)
+        print(f"✅ {index.payloads:,} payloads | {len(index.paths):,} paths | "
+              f"{len(index.value_hashes):,} value/path pairs in {time.perf_counter() - started:.1f}s -> {args.out}")
+        return
+
+    started = time.perf_counter()
+    index = SchemaIndex.load(args.index)
+    print(f"📖 Loaded {index.payloads:,} payloads in {(time.perf_counter() - started) * 1000:.0f} ms")
+    for key in args.key:
+        started = time.perf_counter()
+        rows = index.where_key(key)
+        _print_rows(f"key '{key}' ({(time.perf_counter() - started) * 1000:.2f} ms)", rows, args.limit)
+    for value in args.value:
+        started = time.perf_counter()
+        rows = index.where_value(value)
+        _print_rows(f"value '{value}' ({(time.perf_counter() - started) * 1000:.2f} ms)", rows, args.limit)
+    for fragment in args.path:
+        started = time.perf_counter()
+        rows = index.paths_like(fragment)
+        _print_rows(f"path ~ '{fragment}' ({(time.perf_counter() - started) * 1000:.2f} ms)", rows, args.limit)
+
+
+if __name__ == "__main__":
+    main()
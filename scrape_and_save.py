@@ -1,193 +1,73 @@
+import asyncio
 import logging
 import traceback
-import re
-from datetime import datetime
-from playwright.sync_api import sync_playwright
+from itertools import islice
+from typing import List, Optional
 from sqlalchemy.orm import Session
 
 # Import our Database tools
 from src.database.db import SessionLocal
-from src.database.models import Player, Team, Country, PositionGroup
+from src.database.schemas import PlayerScraperInput
+from src.database.upserts import upsert_players, DEFAULT_BATCH_SIZE
+from src.ingestion.browser_pool import BrowserPool
+from src.ingestion.crawler import FotMobCrawler, entity_id_from_url
+from src.ingestion.extractors import extract_player_fields
+from src.ingestion.next_data import NextDataClient
+from src.ingestion.payload_cache import PayloadCache, DEFAULT_CACHE_DIR
+from src.ingestion.pipeline import IngestionPipeline, validate_player
+from src.ingestion.scheduler import (
+    due_players, last_match_date, payload_digest, save_players_with_crawl_state, unchanged_ids,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def parse_fotmob_date(date_obj):
-    """Robust Date Parser for strings or dicts"""
-    if not date_obj: return None
-    date_str = date_obj.get('utcTime') if isinstance(date_obj, dict) else date_obj
-    if not isinstance(date_str, str): return None
-    try:
-        clean_str = date_str.replace("Z", "").split(".")[0]
-        return datetime.fromisoformat(clean_str).date()
-    except:
-        return None
-
-def parse_market_text(value_str):
-    """Parses '€180M' -> 180000000"""
-    if not value_str or not isinstance(value_str, str): return None
-    
-    try:
-        # Remove currency symbols and whitespace
-        clean = re.sub(r"[€£$]", "", value_str).strip().upper()
-        
-        multiplier = 1
-        if "M" in clean:
-            multiplier = 1_000_000
-            clean = clean.replace("M", "")
-        elif "K" in clean:
-            multiplier = 1_000
-            clean = clean.replace("K", "")
-            
-        return int(float(clean) * multiplier)
-    except:
-        return None
-
-def get_info_value(info_list, target_labels):
+def extract_player(next_data: dict) -> Optional[PlayerScraperInput]:
+    """Pulls the player profile out of a page's __NEXT_DATA__."""
+    fields = extract_player_fields(next_data)
+    return validate_player(fields) if fields else None
+
+def extract_players(payloads):
+    """Lazily extracts every payload, dropping the ones that fail."""
+    for next_data in payloads:
+        player = extract_player(next_data)
+        if player:
+            yield player
+
+def scrape_and_save_player(url, pool: BrowserPool = None, cache: PayloadCache = None,
+                           skip_unchanged: bool = True):
     """
-    CRASH-PROOF HELPER:
-    Handles cases where 'title' is a Dictionary OR just a String.
+    Scrapes a single player. By default the embedded __NEXT_DATA__ is read
+    over plain HTTP; pass a shared BrowserPool to force rendering.
+    Unless skip_unchanged=False, a payload that hashes the same as the last
+    crawl only bumps its crawl state.
     """
-    if not info_list: return None
-    if isinstance(target_labels, str): target_labels = [target_labels]
-    
-    targets_lower = [t.lower() for t in target_labels]
-
-    for item in info_list:
-        if not isinstance(item, dict): continue
-        
-        title_data = item.get('title')
-        value_data = item.get('value')
-        
-        match = False
-        
-        # CASE A: Title is a Dictionary (The complex one)
-        if isinstance(title_data, dict):
-            key_text = str(title_data.get('key', '')).lower()
-            default_text = str(title_data.get('default', '')).lower()
-            if key_text in targets_lower or default_text in targets_lower:
-                match = True
-                
-        # CASE B: Title is a String (The one that crashed you)
-        elif isinstance(title_data, str):
-            if title_data.lower() in targets_lower:
-                match = True
-        
-        if match:
-            # Found it! Now extract the value safely
-            if isinstance(value_data, dict):
-                return value_data.get('fallback')
-            return value_data
-            
-    return None
-
-def map_position_group(fotmob_label: str) -> PositionGroup:
-    if not fotmob_label: return None
-    label = fotmob_label.lower()
-    
-    if "goalkeeper" in label: return PositionGroup.GOALKEEPER
-    if "centre back" in label: return PositionGroup.CENTRE_BACK
-    if "left back" in label or "right back" in label: return PositionGroup.FULL_BACK
-    if any(x in label for x in ["defensive midfield", "central midfield"]): return PositionGroup.MIDFIELDER
-    if any(x in label for x in ["attacking midfield", "right wing", "left wing", "winger"]): return PositionGroup.WINGER_AM
-    if any(x in label for x in ["center forward", "striker", "cf", "st"]): return PositionGroup.STRIKER
-    return None
-
-def scrape_and_save_player(url):
+    try:
+        if pool is None:
+            with NextDataClient() as client:
+                next_data = client.fetch(url)
+        else:
+            next_data = pool.fetch(url)
+    except Exception as e:
+        logger.error(f"❌ Error: {e}")
+        traceback.print_exc()
+        return
+
+    if not next_data:
+        logger.error(f"❌ No __NEXT_DATA__ for {url}")
+        return
+
+    entity_id = entity_id_from_url(url)
+    if cache:
+        cache.put("player", entity_id, next_data)
+
+    # The session is only opened once the page is in hand
     db: Session = SessionLocal()
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)
-            page = browser.new_page()
-            logger.info(f"🌍 Navigating to {url}...")
-            page.goto(url)
-            page.wait_for_selector("h1")
-
-            next_data = page.evaluate("() => window.__NEXT_DATA__")
-            fallback = next_data['props']['pageProps']['fallback']
-            
-            # Find the main player object
-            player_data = None
-            for key, data in fallback.items():
-                if isinstance(data, dict) and 'name' in data:
-                     # We look for birthDate or contractEnd to confirm it's the main profile
-                     if 'contractEnd' in data or 'birthDate' in data:
-                        player_data = data
-                        break
-            
-            if not player_data:
-                logger.error("❌ Could not find valid player data.")
-                return
-
-            logger.info(f"✅ Extracted Data for: {player_data.get('name')}")
-
-            # --- EXTRACTION ---
-            fotmob_id = player_data.get('id')
-            name = player_data.get('name')
-            birth_date = parse_fotmob_date(player_data.get('birthDate'))
-            contract_expiry = parse_fotmob_date(player_data.get('contractEnd'))
-            
-            # Use our NEW crash-proof librarian
-            info_list = player_data.get('playerInformation', [])
-            raw_mv_text = get_info_value(info_list, ['Market value', 'Transfer value'])
-            current_value = parse_market_text(raw_mv_text)
-
-            # Country
-            country_name = "Unknown"
-            meta = player_data.get('meta', {})
-            if isinstance(meta, dict):
-                country_name = meta.get('personJSONLD', {}).get('nationality', {}).get('name')
-
-            primary_team = player_data.get('primaryTeam')
-            team_name = primary_team.get('teamName') if isinstance(primary_team, dict) else None
-
-            # --- DB CHECKS ---
-            country_obj = db.query(Country).filter(Country.name == country_name).first()
-            if not country_obj:
-                logger.warning(f"⚠️ Country '{country_name}' not found. Skipping insert.")
-                return
-
-            team_obj = db.query(Team).filter(Team.name == team_name).first()
-            if not birth_date:
-                logger.error("🛑 HALTING: Birth Date is None.")
-                return
-
-            # --- UPSERT ---
-            player = db.query(Player).filter(Player.fotmob_id == fotmob_id).first()
-            if not player:
-                logger.info("🆕 Creating new player...")
-                player = Player(fotmob_id=fotmob_id)
-            else:
-                logger.info("🔄 Updating player...")
-
-            player.name = name
-            player.birth_date = birth_date
-            player.nationality_id = country_obj.id
-            player.contract_expiry = contract_expiry
-            player.current_market_value = current_value 
-            
-            if team_obj: player.current_team_id = team_obj.id
-            
-            # Position Mapping
-            pos_desc = player_data.get('positionDescription', {})
-            raw_pos_label = None
-            if isinstance(pos_desc, dict):
-                 primary = pos_desc.get('primaryPosition', {})
-                 if isinstance(primary, dict): raw_pos_label = primary.get('label') 
-                 if not raw_pos_label:
-                     str_pos = pos_desc.get('strPos', {})
-                     if isinstance(str_pos, dict): raw_pos_label = str_pos.get('label')
-
-            mapped_group = map_position_group(raw_pos_label)
-            if mapped_group: player.position_group = mapped_group
-            if raw_pos_label: player.specific_positions = [raw_pos_label]
-            
-            db.add(player)
-            db.commit()
-            
-            # Display Result
-            val_display = f"€{current_value:,.0f}" if current_value else "None"
-            logger.info(f"💾 SAVED: {name} | Value: {val_display} | Contract: {contract_expiry}")
+        if entity_id in save_player_payloads(db, [(entity_id, next_data)], skip_unchanged=skip_unchanged):
+            logger.info(f"💾 {url} is up to date")
+        else:
+            logger.error(f"❌ {url} was not saved")
 
     except Exception as e:
         logger.error(f"❌ Error: {e}")
@@ -195,5 +75,149 @@ def scrape_and_save_player(url):
     finally:
         db.close()
 
+def save_player_payloads(db: Session, fetched, batch_size: int = DEFAULT_BATCH_SIZE,
+                         skip_unchanged: bool = True) -> List[int]:
+    """
+    Upserts (fotmob_id, next_data) pairs batch_size at a time, each batch
+    in one transaction with its crawl state. With skip_unchanged, payloads
+    whose relevant part hashes the same as the last stored crawl are never
+    extracted or written. Returns the IDs now up to date in the DB.
+    """
+    fetched = iter(fetched)
+    done: List[int] = []
+    while True:
+        chunk = list(islice(fetched, batch_size))
+        if not chunk:
+            break
+        payloads = {int(entity_id): next_data for entity_id, next_data in chunk
+                    if entity_id is not None and next_data}  # Last fetch of a duplicate wins
+        digests = {entity_id: payload_digest("player", next_data) for entity_id, next_data in payloads.items()}
+        unchanged = unchanged_ids(db, "player", digests) if skip_unchanged else set()
+        if unchanged:
+            logger.info(f"⏭️ {len(unchanged)} unchanged player payload(s) skipped")
+        batch = [
+            (entity_id, digests[entity_id], last_match_date(next_data),
+             None if entity_id in unchanged else extract_player(next_data))
+            for entity_id, next_data in payloads.items()
+        ]
+        written = save_players_with_crawl_state(db, batch, unchanged)
+        done += unchanged.union(written)
+    return done
+
+def scrape_and_save_players(urls, pages: int = 4, headless: bool = True, mode: str = "http",
+                            cache: PayloadCache = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                            skip_unchanged: bool = True):
+    """
+    Sweeps many player URLs. mode="http" reads payloads over httpx and only
+    renders the misses; mode="browser" uses one long-lived browser pool.
+    Fetches run in parallel; DB writes stay on this thread, one upsert per batch.
+    """
+    urls = list(urls)
+    db: Session = SessionLocal()
+    try:
+        if mode == "http":
+            fetcher = NextDataClient(fallback_pages=pages)
+            results = fetcher.fetch_all(urls, workers=pages * 2)
+        else:
+            fetcher = BrowserPool(size=pages, headless=headless)
+            results = fetcher.fetch_all(urls)
+
+        def fetched():
+            for url, next_data in results:
+                if not next_data:
+                    continue
+                entity_id = entity_id_from_url(url)
+                if cache:
+                    cache.put("player", entity_id, next_data)
+                yield entity_id, next_data
+
+        with fetcher:
+            saved = save_player_payloads(db, fetched(), batch_size, skip_unchanged)
+    finally:
+        db.close()
+    logger.info(f"🏁 {len(saved)}/{len(urls)} players up to date.")
+
+def crawl_and_save_players(player_ids, concurrency: int = 8, rate: float = 2.0,
+                           journal_path: str = "data/player_crawl.jsonl", mode: str = "http",
+                           cache: PayloadCache = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                           skip_unchanged: bool = True):
+    """
+    Overnight refresh: async crawl of many FotMob player IDs.
+    Re-running with the same journal resumes where the last run stopped.
+    Fetched payloads are buffered and saved batch_size at a time; a player
+    is only journaled as done once their batch has committed.
+    """
+    db: Session = SessionLocal()
+    buffer = []
+    crawler = FotMobCrawler(concurrency=concurrency, rate=rate, journal_path=journal_path, mode=mode)
+
+    def flush():
+        try:
+            crawler.mark_done("player", save_player_payloads(db, buffer, batch_size, skip_unchanged))
+        except Exception as e:
+            # Not journaled, so a resumed run fetches them again
+            logger.error(f"❌ Saving {len(buffer)} crawled player(s) failed: {e}")
+            db.rollback()
+        buffer.clear()
+
+    def handle(entity_id, next_data):
+        if cache:
+            cache.put("player", entity_id, next_data)
+        buffer.append((entity_id, next_data))
+        if len(buffer) >= batch_size:
+            flush()
+        return False  # Journaled by flush() once the batch commits
+
+    try:
+        return asyncio.run(crawler.crawl(player_ids, handler=handle, kind="player", flush=flush))
+    finally:
+        db.close()
+
+def refresh_due_players(limit: int = 5000, concurrency: int = 8, rate: float = 2.0, mode: str = "http",
+                        cache: PayloadCache = None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Daily refresh: crawls only the players the scheduler says are due
+    (just played, contract ending, stale), most urgent first, and writes
+    only the ones whose payload actually changed.
+    """
+    db: Session = SessionLocal()
+    try:
+        player_ids = due_players(db, limit=limit)
+    finally:
+        db.close()
+    if not player_ids:
+        logger.info("😴 Nothing due for a refresh.")
+        return {"ok": 0, "failed": 0, "skipped": 0}
+    # No journal: due-ness is the resume point, finished players drop off the list
+    return crawl_and_save_players(player_ids, concurrency=concurrency, rate=rate, journal_path=None,
+                                  mode=mode, cache=cache, batch_size=batch_size)
+
+def pipeline_save_players(player_ids, fetch_workers: int = 16, parse_workers: int = None,
+                          rate: float = 5.0, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Large crawls through the staged pipeline: fetches, parsing (in a process
+    pool), validation and batched writes all overlap, so throughput is set
+    by the slowest stage and memory stays flat however many IDs are passed.
+    """
+    pipeline = IngestionPipeline(
+        extract=extract_player_fields, fetch_workers=fetch_workers, parse_workers=parse_workers,
+        rate=rate, batch_size=batch_size,
+    )
+    return asyncio.run(pipeline.run(player_ids))
+
+def replay_cached_players(cache_dir: str = DEFAULT_CACHE_DIR, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Re-runs extraction + upsert over every cached player payload.
+    Fully offline: use it after changing a parsing rule.
+    """
+    db: Session = SessionLocal()
+    try:
+        with PayloadCache(cache_dir) as cache:
+            payloads = (next_data for _, _, next_data in cache.iter_latest("player"))
+            saved = upsert_players(db, extract_players(payloads), batch_size=batch_size)
+    finally:
+        db.close()
+    logger.info(f"🔁 Replayed {len(saved)} cached players.")
+
 if __name__ == "__main__":
     scrape_and_save_player("https://www.fotmob.com/players/737066/erling-haaland")
\ No newline at end of file
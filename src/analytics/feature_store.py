@@ -0,0 +1,295 @@
+import json
+import logging
+import shutil
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import REAL, and_, case, cast, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from src.analytics.gem_score import DETAILED_PER90_KEYS
+from src.database.change_tracking import advance_watermark, dirty_player_ids, latest_change
+from src.database.db import SessionLocal
+from src.database.models import (
+    Competition, Player, PlayerForm, PlayerSeasonStat, PositionGroup, Transfer, hot_stat,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURE_STORE_JOB = "feature_store"
+DEFAULT_STORE_DIR = "data/features"
+KEEP_SNAPSHOTS = 14
+
+POSITION_CODES = {group: code for code, group in enumerate(PositionGroup)}
+POSITION_BY_CODE = {code: group for group, code in POSITION_CODES.items()}
+
+SEASON_COLUMNS = ["minutes", "goals", "assists", "xg", "xa", "rating", "strength", *DETAILED_PER90_KEYS]
+FORM_COLUMNS = [
+    "matches_played", "form_rating", "form_minutes_share", "form_goals_p90", "form_assists_p90",
+    "form_xg_p90", "ewm_rating", "ewm_minutes_share", "ewm_goals_p90", "ewm_assists_p90",
+    "ewm_xg_p90", "momentum",
+]
+
+# Every column of the matrix, in order. Dates are stored as ordinals (NaN
+# when unknown) so age-like features are derived by the consumer.
+COLUMNS = [
+    "position_code", "birth_ordinal", "contract_ordinal", "height_cm",
+    "gem_score", "market_value", "last_fee", "last_transfer_ordinal",
+    *SEASON_COLUMNS, *FORM_COLUMNS,
+]
+
+
+# --- Extraction ---
+
+def _feature_query():
+    """
+    One set-based query for every column: the player row, their latest
+    season's totals (rating and competition strength minutes-weighted,
+    detailed stats summed from their hot-stat columns, all in SQL), their
+    latest transfer and their form summary.
+    """
+    minutes = func.sum(PlayerSeasonStat.minutes)
+    strength = func.coalesce(cast(Competition.strength_embedding, ARRAY(REAL))[1], 1.0)
+    seasons = (
+        select(
+            PlayerSeasonStat.player_id,
+            minutes.label("minutes"),
+            func.sum(PlayerSeasonStat.goals).label("goals"),
+            func.sum(PlayerSeasonStat.assists).label("assists"),
+            func.sum(PlayerSeasonStat.xg).label("xg"),
+            func.sum(PlayerSeasonStat.xa).label("xa"),
+            (func.sum(PlayerSeasonStat.rating * PlayerSeasonStat.minutes)
+             / func.nullif(func.sum(case((PlayerSeasonStat.rating.is_not(None), PlayerSeasonStat.minutes),
+                                         else_=0)), 0)).label("rating"),
+            (func.sum(strength * PlayerSeasonStat.minutes) / func.nullif(minutes, 0)).label("strength"),
+            *(func.sum(hot_stat(PlayerSeasonStat, key)).label(key) for key in DETAILED_PER90_KEYS),
+            func.row_number().over(
+                partition_by=PlayerSeasonStat.player_id, order_by=PlayerSeasonStat.season_id.desc()
+            ).label("recency"),
+        )
+        .join(Competition, Competition.id == PlayerSeasonStat.competition_id)
+        .group_by(PlayerSeasonStat.player_id, PlayerSeasonStat.season_id)
+        .subquery()
+    )
+    transfers = (
+        select(Transfer.player_id, Transfer.fee_amount, Transfer.date)
+        .distinct(Transfer.player_id)
+        .order_by(Transfer.player_id, Transfer.date.desc())
+        .subquery()
+    )
+    return (
+        select(
+            Player.id, Player.position_group, Player.birth_date, Player.contract_expiry, Player.height_cm,
+            Player.current_gem_score, Player.current_market_value,
+            transfers.c.fee_amount, transfers.c.date,
+            *(seasons.c[col] for col in SEASON_COLUMNS),
+            *(getattr(PlayerForm, col) for col in FORM_COLUMNS),
+        )
+        .outerjoin(seasons, and_(seasons.c.player_id == Player.id, seasons.c.recency == 1))
+        .outerjoin(transfers, transfers.c.player_id == Player.id)
+        .outerjoin(PlayerForm, PlayerForm.player_id == Player.id)
+    )
+
+
+def _ordinal(value) -> float:
+    return float(value.toordinal()) if value is not None else np.nan
+
+
+def extract(db: Session, player_ids: Optional[Iterable[int]] = None):
+    """Runs the feature query into (ids, float64 matrix over COLUMNS)."""
+    query = _feature_query()
+    if player_ids is not None:
+        query = query.where(Player.id.in_(list(player_ids)))
+    rows = db.execute(query).all()
+
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    matrix = np.full((len(rows), len(COLUMNS)), np.nan)
+    for i, (_, position, birth, contract, *rest) in enumerate(rows):
+        matrix[i, 0] = POSITION_CODES.get(position, -1)
+        matrix[i, 1] = _ordinal(birth)
+        matrix[i, 2] = _ordinal(contract)
+        height, gem, value, fee, transfer_date, *numbers = rest
+        matrix[i, 3:8] = [
+            np.nan if v is None else float(v) for v in (height, gem, value, fee)
+        ] + [_ordinal(transfer_date)]
+        matrix[i, 8:] = [np.nan if v is None else float(v) for v in numbers]
+    return ids, matrix
+
+
+# --- Snapshots ---
+
+class FeatureSnapshot:
+    """
+    One dated, read-only feature matrix. Opened memory-mapped, so loading is
+    instant and worker processes share the pages.
+    """
+
+    def __init__(self, path, ids: np.ndarray, matrix: np.ndarray, meta: dict):
+        self.path = Path(path)
+        self.ids = ids
+        self.matrix = matrix
+        self.meta = meta
+        self.columns: List[str] = meta["columns"]
+        self._col = {name: i for i, name in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def snapshot_date(self) -> date:
+        return date.fromisoformat(self.meta["snapshot_date"])
+
+    @classmethod
+    def open(cls, path, mmap: bool = True) -> "FeatureSnapshot":
+        path = Path(path)
+        mode = "r" if mmap else None
+        meta = json.loads((path / "meta.json").read_text())
+        return cls(path, np.load(path / "ids.npy", mmap_mode=mode),
+                   np.load(path / "matrix.npy", mmap_mode=mode), meta)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.matrix[:, self._col[name]]
+
+    def rows(self, player_ids: Iterable[int]) -> np.ndarray:
+        """Row positions of these players (-1 when missing); ids are stored sorted."""
+        wanted = np.asarray(list(player_ids), dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(wanted), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.ids, wanted), len(self.ids) - 1)
+        return np.where(self.ids[pos] == wanted, pos, -1)
+
+    def frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        columns = columns or self.columns
+        data = self.matrix[:, [self._col[c] for c in columns]]
+        return pd.DataFrame(np.asarray(data), index=pd.Index(self.ids, name="player_id"), columns=columns)
+
+    def players_frame(self) -> pd.DataFrame:
+        """
+        Players with a season row in the shape gem_score.aggregate_players
+        returns, so scoring can run straight off the store.
+        """
+        frame = self.frame(["position_code", "birth_ordinal", *SEASON_COLUMNS])
+        frame = frame[frame["minutes"].notna() & (frame["position_code"] >= 0)].copy()
+        frame["position_group"] = frame.pop("position_code").astype(int).map(POSITION_BY_CODE)
+        frame["birth_date"] = [date.fromordinal(int(d)) if not np.isnan(d) else None
+                               for d in frame.pop("birth_ordinal")]
+        frame["strength"] = frame["strength"].fillna(1.0)
+        return frame
+
+
+class FeatureStore:
+    """
+    Directory of dated snapshots: <root>/<YYYY-MM-DD>/{ids,matrix}.npy + meta.json.
+
+    refresh() re-extracts only players marked dirty since the last run and
+    writes today's snapshot as the previous matrix with those rows replaced.
+    Snapshots are written to a temp dir and renamed into place, so readers
+    holding an older snapshot open are never disturbed. Run it after the
+    form and gem-score jobs so their outputs for the same dirty players are
+    picked up; after a full rescore, refresh with full=True.
+
+        store = FeatureStore()
+        store.refresh(db)
+        features = store.latest().frame(["minutes", "rating", "momentum"])
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, keep: int = KEEP_SNAPSHOTS):
+        self.root = Path(root)
+        self.keep = keep
+
+    def snapshot_dates(self) -> List[date]:
+        if not self.root.exists():
+            return []
+        dates = []
+        for path in self.root.iterdir():
+            try:
+                if (path / "meta.json").exists():
+                    dates.append(date.fromisoformat(path.name))
+            except ValueError:
+                continue
+        return sorted(dates)
+
+    def open(self, as_of: Optional[date] = None, mmap: bool = True) -> Optional[FeatureSnapshot]:
+        """Latest snapshot on or before `as_of` (default: the newest)."""
+        dates = [d for d in self.snapshot_dates() if as_of is None or d <= as_of]
+        return FeatureSnapshot.open(self.root / dates[-1].isoformat(), mmap) if dates else None
+
+    def latest(self, mmap: bool = True) -> Optional[FeatureSnapshot]:
+        return self.open(mmap=mmap)
+
+    def _write(self, ids: np.ndarray, matrix: np.ndarray, snapshot_date: date, watermark) -> FeatureSnapshot:
+        order = np.argsort(ids, kind="stable")
+        target = self.root / snapshot_date.isoformat()
+        tmp = self.root / f".{snapshot_date.isoformat()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "ids.npy", ids[order])
+        np.save(tmp / "matrix.npy", np.ascontiguousarray(matrix[order]))
+        meta = {
+            "columns": COLUMNS,
+            "snapshot_date": snapshot_date.isoformat(),
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "watermark": watermark,
+            "rows": int(len(ids)),
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+        if target.exists():
+            shutil.rmtree(target)
+        tmp.rename(target)
+        self._prune()
+        return FeatureSnapshot.open(target)
+
+    def _prune(self):
+        for old in self.snapshot_dates()[:-self.keep]:
+            shutil.rmtree(self.root / old.isoformat(), ignore_errors=True)
+
+    def refresh(self, db: Session, full: bool = False, snapshot_date: Optional[date] = None) -> FeatureSnapshot:
+        snapshot_date = snapshot_date or date.today()
+        previous = None if full else self.latest(mmap=False)
+        if previous is not None and previous.columns != COLUMNS:
+            logger.info("🔁 Feature columns changed, rebuilding the store from scratch.")
+            previous = None
+
+        if previous is None:
+            mark = latest_change(db)
+            ids, matrix = extract(db)
+        else:
+            player_ids, mark = dirty_player_ids(db, FEATURE_STORE_JOB)
+            ids, matrix = previous.ids, previous.matrix
+            if player_ids:
+                new_ids, new_rows = extract(db, player_ids)
+                keep = ~np.isin(ids, new_ids)
+                ids = np.concatenate([ids[keep], new_ids])
+                matrix = np.vstack([matrix[keep], new_rows])
+
+        snapshot = self._write(ids, matrix, snapshot_date, mark)
+        if mark is not None:
+            advance_watermark(db, FEATURE_STORE_JOB, mark)
+            db.commit()
+        return snapshot
+
+
+def refresh_features(full: bool = False, root=DEFAULT_STORE_DIR) -> int:
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        snapshot = FeatureStore(root).refresh(db, full=full)
+        logger.info(f"🧱 Feature snapshot {snapshot.snapshot_date} | {len(snapshot)} players x "
+                    f"{len(snapshot.columns)} features in {time.perf_counter() - started:.2f}s")
+        return len(snapshot)
+    except Exception as e:
+        logger.error(f"❌ Feature refresh failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    refresh_features()
@@ -0,0 +1,246 @@
+import logging
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.database.change_tracking import advance_watermark, dirty_player_ids, latest_change
+from src.database.db import SessionLocal
+from src.database.models import MATCH_STAT_KEYS, MatchSnapshot, PlayerForm, hot_stat
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORM_JOB = "form"
+
+WINDOW = 5               # Matches in the rolling "last N" window
+HALFLIFE = 4.0           # Matches for a fast EWM weight to halve
+BASELINE_HALFLIFE = 20.0 # Long-term rating baseline used for momentum
+MATCH_MINUTES = 90.0
+
+# Per-match counts read out of MatchSnapshot.stats
+STAT_KEYS = MATCH_STAT_KEYS
+# Missing counts mean "didn't happen"; missing xG means "not measured"
+ZERO_IF_MISSING = {"goals", "assists"}
+
+FAST_ALPHA = 1 - 0.5 ** (1 / HALFLIFE)
+SLOW_ALPHA = 1 - 0.5 ** (1 / BASELINE_HALFLIFE)
+
+# EWM accumulator -> (source column, alpha)
+EWM_SERIES = {
+    "rating": ("match_rating", FAST_ALPHA),
+    "baseline": ("match_rating", SLOW_ALPHA),
+    "minutes": ("minutes_played", FAST_ALPHA),
+    **{key: (key, FAST_ALPHA) for key in STAT_KEYS},
+}
+
+WINDOW_FIELDS = ["date", "minutes_played", "match_rating", *STAT_KEYS]
+
+
+def _snapshot_query():
+    """Set-based extraction: stats read from their generated hot-stat columns."""
+    return select(
+        MatchSnapshot.player_id, MatchSnapshot.date, MatchSnapshot.minutes_played,
+        MatchSnapshot.match_rating,
+        *(hot_stat(MatchSnapshot, key).label(key) for key in STAT_KEYS),
+    )
+
+
+def _frame(rows) -> pd.DataFrame:
+    frame = pd.DataFrame(rows, columns=["player_id", "date", "minutes_played", "match_rating", *STAT_KEYS])
+    for key in ZERO_IF_MISSING:
+        frame[key] = frame[key].fillna(0.0)
+    frame["minutes_played"] = frame["minutes_played"].fillna(0).astype(float)
+    return frame.sort_values(["player_id", "date"], kind="stable").reset_index(drop=True)
+
+
+def _ratio(num, den, scale=1.0):
+    if num is None or den is None or den <= 0:
+        return None
+    return float(num) / float(den) * scale
+
+
+def _as_date(value) -> Optional[date]:
+    return date.fromisoformat(value) if value else None
+
+
+def summarize(player_id: int, state: dict) -> dict:
+    """Turns a player's running state into a player_form row."""
+    window = state["window"]
+    ewm = state["ewm"]
+    ratings = [m[2] for m in window if m[2] is not None]
+    minutes = sum(m[1] for m in window)
+
+    def window_p90(position):
+        values = [m[position] for m in window if m[position] is not None]
+        return _ratio(sum(values), minutes, MATCH_MINUTES) if values else None
+
+    form_rating = float(np.mean(ratings)) if ratings else None
+    momentum = None
+    if ewm.get("rating") is not None and ewm.get("baseline") is not None:
+        momentum = ewm["rating"] - ewm["baseline"]
+
+    return {
+        "player_id": player_id,
+        "first_match_date": _as_date(state["first_match_date"]),
+        "last_match_date": _as_date(window[-1][0]) if window else None,
+        "matches_played": state["matches_played"],
+        "form_rating": form_rating,
+        "form_minutes_share": _ratio(minutes, len(window) * MATCH_MINUTES) if window else None,
+        "form_goals_p90": window_p90(3),
+        "form_assists_p90": window_p90(4),
+        "form_xg_p90": window_p90(5),
+        "ewm_rating": ewm.get("rating"),
+        "ewm_minutes_share": _ratio(ewm.get("minutes"), MATCH_MINUTES),
+        "ewm_goals_p90": _ratio(ewm.get("goals"), ewm.get("minutes"), MATCH_MINUTES),
+        "ewm_assists_p90": _ratio(ewm.get("assists"), ewm.get("minutes"), MATCH_MINUTES),
+        "ewm_xg_p90": _ratio(ewm.get("xg"), ewm.get("minutes"), MATCH_MINUTES),
+        "momentum": momentum,
+        "state": state,
+    }
+
+
+# --- Full recompute (vectorized) ---
+
+def compute_full_states(frame: pd.DataFrame) -> Dict[int, dict]:
+    """
+    Every player's state from their whole history in one pass: grouped EWMs
+    (adjust=False, so they match the incremental recurrence exactly) and a
+    groupby tail for the window.
+    """
+    grouped = frame.groupby("player_id", sort=False)
+    ewm_last = {}
+    for name, (column, alpha) in EWM_SERIES.items():
+        series = grouped[column].ewm(alpha=alpha, adjust=False, ignore_na=True).mean()
+        ewm_last[name] = series.groupby(level=0).last()
+
+    counts = grouped.size()
+    firsts = grouped["date"].min()
+
+    states = {
+        int(pid): {
+            "first_match_date": firsts[pid].isoformat(),
+            "matches_played": int(counts[pid]),
+            "window": [],
+            "ewm": {name: _clean(ewm_last[name].get(pid)) for name in EWM_SERIES},
+        }
+        for pid in counts.index
+    }
+    tail = grouped.tail(WINDOW)
+    for row in tail[["player_id", *WINDOW_FIELDS]].itertuples(index=False):
+        states[int(row[0])]["window"].append(_window_entry(row[1:]))
+    return states
+
+
+def _clean(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return float(value)
+
+
+def _window_entry(values) -> list:
+    match_date, *numbers = values
+    return [match_date.isoformat(), *(_clean(v) for v in numbers)]
+
+
+# --- Incremental ---
+
+def advance_state(state: Optional[dict], matches: List[tuple]) -> dict:
+    """Feeds new matches (date-ordered WINDOW_FIELDS tuples) into a running state."""
+    if state is None:
+        state = {"first_match_date": None, "matches_played": 0, "window": [],
+                 "ewm": {name: None for name in EWM_SERIES}}
+    field_pos = {f: i for i, f in enumerate(WINDOW_FIELDS)}
+    for match in matches:
+        entry = _window_entry(match)
+        if state["first_match_date"] is None:
+            state["first_match_date"] = entry[0]
+        state["matches_played"] += 1
+        state["window"] = (state["window"] + [entry])[-WINDOW:]
+        for name, (column, alpha) in EWM_SERIES.items():
+            x = entry[field_pos[column]]
+            if x is None:
+                continue
+            prev = state["ewm"].get(name)
+            state["ewm"][name] = x if prev is None else (1 - alpha) * prev + alpha * x
+    return state
+
+
+def _write_rows(db: Session, rows: List[dict], chunk_size: int = 5_000) -> int:
+    for start in range(0, len(rows), chunk_size):
+        stmt = insert(PlayerForm).values(rows[start:start + chunk_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PlayerForm.player_id],
+            set_={**{c: stmt.excluded[c] for c in rows[0] if c != "player_id"}, "updated_at": func.now()},
+        )
+        db.execute(stmt)
+    return len(rows)
+
+
+def refresh_form_full(db: Session) -> int:
+    mark = latest_change(db)
+    frame = _frame(db.execute(_snapshot_query()).all())
+    if frame.empty:
+        return 0
+    states = compute_full_states(frame)
+    count = _write_rows(db, [summarize(pid, state) for pid, state in states.items()])
+    if mark is not None:
+        advance_watermark(db, FORM_JOB, mark)
+    db.commit()
+    return count
+
+
+def refresh_form_incremental(db: Session) -> int:
+    """
+    Updates only dirty players, from only their matches after the stored
+    last_match_date. Backfilled older matches need a full refresh.
+    """
+    player_ids, mark = dirty_player_ids(db, FORM_JOB)
+    if not player_ids:
+        return 0
+
+    stored = dict(db.execute(
+        select(PlayerForm.player_id, PlayerForm.state).where(PlayerForm.player_id.in_(player_ids))
+    ).all())
+    rows = db.execute(
+        _snapshot_query()
+        .outerjoin(PlayerForm, PlayerForm.player_id == MatchSnapshot.player_id)
+        .where(MatchSnapshot.player_id.in_(player_ids))
+        .where(or_(PlayerForm.last_match_date.is_(None), MatchSnapshot.date > PlayerForm.last_match_date))
+    ).all()
+    frame = _frame(rows)
+
+    out = []
+    for pid, matches in frame.groupby("player_id", sort=False):
+        state = advance_state(stored.get(pid) or None,
+                              list(matches[WINDOW_FIELDS].itertuples(index=False, name=None)))
+        out.append(summarize(int(pid), state))
+    count = _write_rows(db, out) if out else 0
+    advance_watermark(db, FORM_JOB, mark)
+    db.commit()
+    return count
+
+
+def refresh_form(full: bool = False) -> int:
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        count = refresh_form_full(db) if full else refresh_form_incremental(db)
+        logger.info(f"📈 Form updated for {count} players ({'full' if full else 'incremental'}) "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return count
+    except Exception as e:
+        logger.error(f"❌ Form refresh failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    refresh_form()
@@ -0,0 +1,206 @@
+import logging
+from datetime import date
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.database.cache_events import PLAYERS, notify_cache_invalidation
+from src.database.models import SEASON_STAT_KEYS, Competition, Player, PlayerSeasonStat, PositionGroup
+from src.database.upserts import bulk_update_column
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Below this a season sample is too noisy to rank
+MIN_MINUTES = 450
+
+# Column stats turned into per-90 rates
+PER90_COLUMNS = ["goals", "assists", "xg", "xa"]
+
+# Advanced stats pulled out of detailed_stats when the scraper provides them
+DETAILED_PER90_KEYS = SEASON_STAT_KEYS
+
+# Everything that gets a within-group percentile
+METRICS = ["rating", *(f"{col}_p90" for col in [*PER90_COLUMNS, *DETAILED_PER90_KEYS])]
+
+# How much each percentile counts towards the score, per position group.
+# Metrics a row doesn't have are dropped and the rest re-weighted.
+POSITION_WEIGHTS = {
+    PositionGroup.GOALKEEPER: {"rating": 0.6, "saves_p90": 0.4},
+    PositionGroup.CENTRE_BACK: {"rating": 0.4, "tackles_won_p90": 0.2, "interceptions_p90": 0.2,
+                                "progressive_passes_p90": 0.2},
+    PositionGroup.FULL_BACK: {"rating": 0.3, "xa_p90": 0.2, "assists_p90": 0.1, "tackles_won_p90": 0.2,
+                              "progressive_carries_p90": 0.2},
+    PositionGroup.MIDFIELDER: {"rating": 0.3, "xa_p90": 0.15, "progressive_passes_p90": 0.25,
+                               "interceptions_p90": 0.15, "xg_p90": 0.15},
+    PositionGroup.WINGER_AM: {"rating": 0.2, "xg_p90": 0.2, "xa_p90": 0.2, "goals_p90": 0.1,
+                              "assists_p90": 0.1, "successful_dribbles_p90": 0.2},
+    PositionGroup.STRIKER: {"rating": 0.2, "xg_p90": 0.3, "goals_p90": 0.3, "xa_p90": 0.1,
+                            "assists_p90": 0.1},
+}
+
+# Youth bonus: linear from +AGE_BONUS at YOUTH_AGE down to 0 at PEAK_AGE
+YOUTH_AGE, PEAK_AGE, AGE_BONUS = 18.0, 27.0, 0.25
+# Score multiplier = strength ** STRENGTH_EXPONENT (strength 1.0 = average league)
+STRENGTH_EXPONENT = 0.5
+
+
+def competition_strength(embedding) -> float:
+    """Component 0 of Competition.strength_embedding is the overall strength index."""
+    if embedding is None or len(embedding) == 0:
+        return 1.0
+    return float(embedding[0])
+
+
+def load_season_frame(db: Session, season_id: Optional[str] = None,
+                      player_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """
+    One query for every season-stat row plus the player/competition context.
+    Without season_id each player's latest season is used; player_ids limits
+    the load to a delta for incremental runs.
+    """
+    query = (
+        select(
+            PlayerSeasonStat.player_id, PlayerSeasonStat.season_id, PlayerSeasonStat.minutes,
+            PlayerSeasonStat.goals, PlayerSeasonStat.assists, PlayerSeasonStat.xg, PlayerSeasonStat.xa,
+            PlayerSeasonStat.rating, PlayerSeasonStat.detailed_stats,
+            Player.position_group, Player.birth_date, Competition.strength_embedding,
+        )
+        .join(Player, Player.id == PlayerSeasonStat.player_id)
+        .join(Competition, Competition.id == PlayerSeasonStat.competition_id)
+    )
+    if season_id:
+        query = query.where(PlayerSeasonStat.season_id == season_id)
+    if player_ids is not None:
+        query = query.where(PlayerSeasonStat.player_id.in_(list(player_ids)))
+
+    rows = db.execute(query).all()
+    frame = pd.DataFrame(rows, columns=[
+        "player_id", "season_id", "minutes", "goals", "assists", "xg", "xa", "rating",
+        "detailed_stats", "position_group", "birth_date", "strength_embedding",
+    ])
+    if frame.empty:
+        return frame
+    if not season_id:
+        latest = frame.groupby("player_id")["season_id"].transform("max")
+        frame = frame[frame["season_id"] == latest]
+    return frame.reset_index(drop=True)
+
+
+def aggregate_players(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapses a player's rows (several teams/competitions in one season)
+    into one row: counts summed, rating and strength minutes-weighted.
+    """
+    detailed = pd.DataFrame.from_records(
+        [d or {} for d in frame["detailed_stats"]], columns=DETAILED_PER90_KEYS
+    ).apply(pd.to_numeric, errors="coerce")
+
+    work = pd.concat([frame.drop(columns=["detailed_stats"]), detailed], axis=1)
+    work["strength"] = [competition_strength(e) for e in work["strength_embedding"]]
+    minutes = work["minutes"].clip(lower=0).astype(float)
+    work["rating_x_min"] = work["rating"] * minutes
+    work["rated_min"] = minutes.where(work["rating"].notna(), 0.0)
+    work["strength_x_min"] = work["strength"] * minutes
+
+    sums = work.groupby("player_id")[
+        ["minutes", *PER90_COLUMNS, *DETAILED_PER90_KEYS,
+         "rating_x_min", "rated_min", "strength_x_min"]
+    ].sum(min_count=1)
+    meta = work.groupby("player_id")[["position_group", "birth_date"]].first()
+    players = sums.join(meta)
+
+    players["rating"] = players["rating_x_min"] / players["rated_min"].replace(0, np.nan)
+    players["strength"] = (players["strength_x_min"] / players["minutes"].replace(0, np.nan)).fillna(1.0)
+    return players.drop(columns=["rating_x_min", "rated_min", "strength_x_min"])
+
+
+def metric_frame(players: pd.DataFrame) -> pd.DataFrame:
+    """Players with enough minutes, plus a column per scoring metric (see METRICS)."""
+    eligible = players[players["minutes"] >= MIN_MINUTES].copy()
+    per90 = 90.0 / eligible["minutes"]
+    for col in [*PER90_COLUMNS, *DETAILED_PER90_KEYS]:
+        eligible[f"{col}_p90"] = eligible[col] * per90
+    return eligible
+
+
+def blend_scores(eligible: pd.DataFrame, pct: pd.DataFrame, today: Optional[date] = None) -> pd.Series:
+    """
+    Weighted blend of per-metric percentiles (0-1) with the competition-
+    strength and age adjustments. Returns 0-100 by player_id.
+    """
+    today = today or date.today()
+    weights = (
+        pd.DataFrame(POSITION_WEIGHTS).T.reindex(columns=METRICS).fillna(0.0)
+        .reindex(eligible["position_group"]).to_numpy()
+    )
+    values = pct[METRICS].to_numpy(dtype=float)
+    available = ~np.isnan(values)
+    weight_sum = (weights * available).sum(axis=1)
+    base = np.where(
+        weight_sum > 0,
+        np.nansum(values * weights, axis=1) / np.where(weight_sum > 0, weight_sum, 1.0),
+        np.nan,
+    )
+
+    birth = pd.to_datetime(eligible["birth_date"])
+    age = (pd.Timestamp(today) - birth).dt.days.to_numpy() / 365.25
+    youth = np.clip((PEAK_AGE - age) / (PEAK_AGE - YOUTH_AGE), 0.0, 1.0)
+    age_factor = 1.0 + AGE_BONUS * np.nan_to_num(youth)
+
+    strength_factor = np.power(eligible["strength"].clip(lower=0.05).to_numpy(), STRENGTH_EXPONENT)
+
+    score = np.clip(base * 100.0 * age_factor * strength_factor, 0.0, 100.0)
+    return pd.Series(score, index=eligible.index, name="gem_score").dropna()
+
+
+def group_percentiles(eligible: pd.DataFrame) -> pd.DataFrame:
+    """
+    Percentile of each metric inside the player's own position group: the
+    share of the group at or below the value (ties all get the top rank,
+    NaN stays NaN). The same definition PercentileIndex.percentiles uses,
+    so full and incremental runs score alike.
+    """
+    return eligible.groupby("position_group")[METRICS].rank(method="max", pct=True)
+
+
+def compute_gem_scores(players: pd.DataFrame, today: Optional[date] = None) -> pd.Series:
+    """
+    Vectorized scoring over the whole population at once:
+    per-90 rates -> within-PositionGroup percentiles -> weighted blend
+    -> competition-strength and age adjustments. Returns 0-100 by player_id.
+    """
+    eligible = metric_frame(players)
+    if eligible.empty:
+        return pd.Series(dtype=float)
+    return blend_scores(eligible, group_percentiles(eligible), today)
+
+
+def write_gem_scores(db: Session, scores: pd.Series, cleared: Iterable[int] = ()) -> int:
+    """
+    One bulk UPDATE for every score, one commit. `cleared` players (no
+    longer eligible) get a NULL score in the same UPDATE, so the API and
+    leaderboards stop showing their last one.
+    """
+    values = {int(pid): None for pid in cleared}
+    values.update({int(pid): float(s) for pid, s in scores.items()})
+    bulk_update_column(db, Player.current_gem_score, values)
+    notify_cache_invalidation(db, PLAYERS)
+    db.commit()
+    return len(scores)
+
+
+def rescore_all() -> int:
+    """
+    Full rescore. Goes through incremental.rescore_full so the percentile
+    index and the change-log watermark are rebuilt along with the scores.
+    """
+    from src.analytics.incremental import rescore  # It imports this module
+    return rescore(full=True)
+
+
+if __name__ == "__main__":
+    rescore_all()
@@ -0,0 +1,215 @@
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.analytics.feature_store import FeatureStore
+from src.analytics.gem_score import (
+    METRICS, aggregate_players, blend_scores, load_season_frame, metric_frame, write_gem_scores,
+)
+from src.database.change_tracking import advance_watermark, dirty_player_ids, latest_change
+from src.database.db import SessionLocal
+from src.database.leaderboards import refresh_leaderboards
+from src.database.models import Player
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GEM_SCORE_JOB = "gem_score"
+DEFAULT_INDEX_PATH = "data/gem_percentiles.npz"
+
+
+class PercentileIndex:
+    """
+    Per-PositionGroup sorted arrays of every metric, maintained in place.
+
+    Updating k players costs O(k log n) searches plus one array shift per
+    (group, metric), and ranking the delta is a searchsorted, so an
+    incremental run never reloads the whole population. The per-player
+    values are kept too, which is what lets stale values be removed.
+    """
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = list(metrics)
+        self.players: Dict[int, Tuple[str, np.ndarray]] = {}
+        self.sorted: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.players)
+
+    # --- Maintenance ---
+
+    def _remove_values(self, key, olds: np.ndarray):
+        arr = self.sorted.get(key)
+        olds = np.sort(olds[~np.isnan(olds)])
+        if arr is None or not len(olds):
+            return
+        # Equal values need distinct slots: offset each by its occurrence number
+        occurrence = np.arange(len(olds)) - np.searchsorted(olds, olds, side="left")
+        self.sorted[key] = np.delete(arr, np.searchsorted(arr, olds, side="left") + occurrence)
+
+    def _insert_values(self, key, news: np.ndarray):
+        news = np.sort(news[~np.isnan(news)])
+        if not len(news):
+            return
+        arr = self.sorted.get(key, np.empty(0))
+        self.sorted[key] = np.insert(arr, np.searchsorted(arr, news), news)
+
+    def remove(self, player_ids: Iterable[int]):
+        by_key: Dict[Tuple[str, int], list] = {}
+        for pid in player_ids:
+            entry = self.players.pop(int(pid), None)
+            if entry is None:
+                continue
+            group, values = entry
+            for m in range(len(self.metrics)):
+                by_key.setdefault((group, m), []).append(values[m])
+        for key, olds in by_key.items():
+            self._remove_values(key, np.array(olds, dtype=float))
+
+    def upsert(self, frame: pd.DataFrame):
+        """frame: indexed by player_id with position_group + metric columns."""
+        self.remove(frame.index)
+        groups = frame["position_group"].map(lambda g: getattr(g, "value", g)).to_numpy()
+        values = frame[self.metrics].to_numpy(dtype=float)
+        for pid, group, row in zip(frame.index, groups, values):
+            self.players[int(pid)] = (group, row)
+        for group in np.unique(groups):
+            rows = values[groups == group]
+            for m in range(len(self.metrics)):
+                self._insert_values((group, m), rows[:, m])
+
+    # --- Ranking ---
+
+    def percentiles(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Share of the group at or below each value (NaN stays NaN); the
+        definition gem_score.group_percentiles uses for a one-shot ranking.
+        """
+        groups = frame["position_group"].map(lambda g: getattr(g, "value", g)).to_numpy()
+        values = frame[self.metrics].to_numpy(dtype=float)
+        out = np.full(values.shape, np.nan)
+        for group in np.unique(groups):
+            rows = groups == group
+            for m in range(len(self.metrics)):
+                arr = self.sorted.get((group, m))
+                if arr is None or not len(arr):
+                    continue
+                col = values[rows, m]
+                pct = np.searchsorted(arr, col, side="right") / len(arr)
+                out[rows, m] = np.where(np.isnan(col), np.nan, pct)
+        return pd.DataFrame(out, index=frame.index, columns=self.metrics)
+
+    # --- Persistence ---
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        ids = np.fromiter(self.players.keys(), dtype=np.int64, count=len(self.players))
+        groups = np.array([g for g, _ in self.players.values()], dtype=str)
+        values = (np.vstack([v for _, v in self.players.values()])
+                  if self.players else np.empty((0, len(self.metrics))))
+        np.savez(path, ids=ids, groups=groups, values=values, metrics=np.array(self.metrics))
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH) -> "PercentileIndex":
+        data = np.load(path)
+        index = cls(metrics=[str(m) for m in data["metrics"]])
+        frame = pd.DataFrame(data["values"], index=data["ids"], columns=index.metrics)
+        frame["position_group"] = data["groups"]
+        index.upsert(frame)
+        return index
+
+
+def rescore_full(db: Session, index_path=DEFAULT_INDEX_PATH, store: Optional[FeatureStore] = None) -> int:
+    """
+    Scores everyone, rebuilds the percentile index and resets the watermark.
+    With a feature store the season aggregates come from its latest snapshot
+    instead of the JSONB-heavy season query. Players who had a score but
+    aren't eligible any more have it cleared.
+    """
+    mark = latest_change(db)
+    snapshot = store.latest() if store is not None else None
+    if snapshot is not None:
+        players = snapshot.players_frame()
+    else:
+        frame = load_season_frame(db)
+        players = aggregate_players(frame) if not frame.empty else pd.DataFrame()
+    if players.empty:
+        return 0
+    eligible = metric_frame(players)
+    index = PercentileIndex()
+    index.upsert(eligible)
+    scores = blend_scores(eligible, index.percentiles(eligible))
+    scored = set(db.scalars(select(Player.id).where(Player.current_gem_score.is_not(None))).all())
+    count = write_gem_scores(db, scores, cleared=scored - set(scores.index))
+    if mark is not None:
+        advance_watermark(db, GEM_SCORE_JOB, mark)
+        db.commit()
+    index.save(index_path)
+    return count
+
+
+def rescore_dirty(db: Session, index_path=DEFAULT_INDEX_PATH) -> int:
+    """
+    Rescores only players marked dirty since the last run.
+
+    The delta's metrics replace their old entries in the percentile index
+    and the delta is ranked against it. Scores of players who did not
+    change are not rewritten, so they drift slightly as the population
+    moves; run rescore_full periodically (e.g. weekly) to re-anchor.
+    """
+    if not Path(index_path).exists():
+        logger.info("📭 No percentile index yet, running a full rescore.")
+        return rescore_full(db, index_path)
+
+    player_ids, mark = dirty_player_ids(db, GEM_SCORE_JOB)
+    if not player_ids:
+        logger.info("✅ No dirty players since the last run.")
+        return 0
+
+    index = PercentileIndex.load(index_path)
+    frame = load_season_frame(db, player_ids=player_ids)
+    eligible = metric_frame(aggregate_players(frame)) if not frame.empty else pd.DataFrame()
+
+    # Players that dropped below the minutes threshold leave the distribution
+    index.remove(set(player_ids) - set(eligible.index))
+    scores = pd.Series(dtype=float)
+    if not eligible.empty:
+        index.upsert(eligible)
+        scores = blend_scores(eligible, index.percentiles(eligible))
+    # ...and lose their score, along with anyone left unscorable
+    count = write_gem_scores(db, scores, cleared=set(player_ids) - set(scores.index))
+
+    advance_watermark(db, GEM_SCORE_JOB, mark)
+    db.commit()
+    index.save(index_path)
+    return count
+
+
+def rescore(full: bool = False, index_path=DEFAULT_INDEX_PATH, from_store: bool = False) -> int:
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        store = FeatureStore() if from_store else None
+        count = rescore_full(db, index_path, store) if full else rescore_dirty(db, index_path)
+        if count:
+            refresh_leaderboards(db)
+        logger.info(f"💎 Rescored {count} players ({'full' if full else 'incremental'}) "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return count
+    except Exception as e:
+        logger.error(f"❌ Rescoring failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rescore()
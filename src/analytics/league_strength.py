@@ -0,0 +1,363 @@
+import logging
+import math
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import spsolve
+from sqlalchemy import delete, exists, func, select, text, update
+from sqlalchemy.orm import Session, aliased
+
+from src.database.db import SessionLocal
+from src.database.models import Competition, RankingSnapshot, Team, TeamMatchResult
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = "data/league_strength.npz"
+
+# --- ELO ---
+ELO_START = 1500.0
+ELO_K = 20.0
+HOME_ADVANTAGE = 60.0   # ELO points
+RESULT_WEIGHT = 0.5     # Outcome = RESULT_WEIGHT * result + rest * xG share
+MAX_MARGIN = 2.5        # Cap on the xG-dominance multiplier
+
+# --- Least-squares strengths ---
+RIDGE = 1.0             # Pulls teams with few matches towards average (0)
+HALFLIFE_DAYS = 365.0   # Old results fade out of the accumulated fit
+
+EMBEDDING_DIM = 8
+
+
+def _settle_results(db: Session):
+    """
+    Waits for in-flight result writers to commit, like change_tracking._settle:
+    change_seq values are drawn before commit, so a slow writer could
+    otherwise commit a position the fit has already read past.
+    """
+    db.execute(text("LOCK TABLE team_match_results IN SHARE MODE"))
+
+
+def load_results(db: Session, since: Optional[date] = None, after_seq: Optional[int] = None) -> pd.DataFrame:
+    """
+    One query for every result (dated after `since`, or created after the
+    change-log position `after_seq`), one row per match: each match is
+    stored once per team, so mirrored rows are dropped. A new row whose
+    mirror was already read in an earlier run is left out too, so a match
+    is never counted twice.
+    """
+    query = select(
+        TeamMatchResult.id, TeamMatchResult.date, TeamMatchResult.team_id, TeamMatchResult.opponent_id,
+        TeamMatchResult.goals_for, TeamMatchResult.goals_against,
+        TeamMatchResult.is_home, TeamMatchResult.is_neutral_venue,
+        TeamMatchResult.xg_for, TeamMatchResult.xg_against,
+    )
+    if since is not None:
+        query = query.where(TeamMatchResult.date > since)
+    if after_seq is not None:
+        mirror = aliased(TeamMatchResult)
+        query = query.where(TeamMatchResult.created_seq > after_seq, ~exists().where(
+            mirror.date == TeamMatchResult.date,
+            mirror.team_id == TeamMatchResult.opponent_id,
+            mirror.opponent_id == TeamMatchResult.team_id,
+            mirror.created_seq <= after_seq,
+        ))
+    frame = pd.DataFrame(db.execute(query).all(), columns=[
+        "id", "date", "team_id", "opponent_id", "goals_for", "goals_against",
+        "is_home", "is_neutral_venue", "xg_for", "xg_against",
+    ])
+    if frame.empty:
+        return frame
+    lo = frame[["team_id", "opponent_id"]].min(axis=1)
+    hi = frame[["team_id", "opponent_id"]].max(axis=1)
+    frame = frame.assign(_lo=lo, _hi=hi).drop_duplicates(["_lo", "_hi", "date"])
+    return frame.drop(columns=["_lo", "_hi"]).sort_values("date", kind="stable").reset_index(drop=True)
+
+
+def _home_sign(frame: pd.DataFrame) -> np.ndarray:
+    """+1 team at home, -1 opponent at home, 0 neutral."""
+    sign = np.where(frame["is_home"].fillna(True).to_numpy(dtype=bool), 1.0, -1.0)
+    return np.where(frame["is_neutral_venue"].fillna(False).to_numpy(dtype=bool), 0.0, sign)
+
+
+# --- Sequential ELO ---
+
+def run_elo(results: pd.DataFrame, ratings: Optional[Dict[int, float]] = None) -> Dict[int, float]:
+    """
+    xG-weighted ELO over date-ordered results. Pass the previous ratings to
+    continue from them (incremental); new teams start at ELO_START.
+    """
+    ratings = dict(ratings or {})
+    home = _home_sign(results) * HOME_ADVANTAGE
+    columns = results[["team_id", "opponent_id", "goals_for", "goals_against", "xg_for", "xg_against"]]
+    for (team, opp, gf, ga, xgf, xga), hfa in zip(columns.itertuples(index=False, name=None), home):
+        ra = ratings.get(team, ELO_START)
+        rb = ratings.get(opp, ELO_START)
+        expected = 1.0 / (1.0 + 10 ** ((rb - ra - hfa) / 400.0))
+
+        result = 1.0 if gf > ga else 0.5 if gf == ga else 0.0
+        has_xg = xgf is not None and xga is not None and not (math.isnan(xgf) or math.isnan(xga))
+        if has_xg and xgf + xga > 0:
+            outcome = RESULT_WEIGHT * result + (1 - RESULT_WEIGHT) * xgf / (xgf + xga)
+            margin = min(MAX_MARGIN, 1.0 + abs(xgf - xga) / 2.0)
+        else:
+            outcome = result
+            margin = min(MAX_MARGIN, 1.0 + math.log1p(abs(gf - ga)) / 2.0)
+
+        delta = ELO_K * margin * (outcome - expected)
+        ratings[team] = ra + delta
+        ratings[opp] = rb - delta
+    return ratings
+
+
+# --- Sparse least-squares team strengths ---
+
+class StrengthFit:
+    """
+    Weighted ridge fit of  margin = home * h + s_team - s_opponent.
+
+    Only the normal equations (AᵀWA, AᵀWb) are kept, as a sparse matrix over
+    teams, so new results are folded in without touching old ones: old
+    evidence is decayed by its age, the new rows are added, and the small
+    SPD system is re-solved. `as_of` is the newest match date folded in
+    (the decay reference); `change_seq` the result change-log position
+    folded in, the watermark the next incremental run reads from.
+    """
+
+    def __init__(self):
+        self.team_ids = np.empty(0, dtype=np.int64)
+        self.ata = sp.csr_matrix((1, 1))    # Column 0 is home advantage
+        self.atb = np.zeros(1)
+        self.as_of: Optional[date] = None
+        self.change_seq: Optional[int] = None
+
+    def _ensure_teams(self, ids: np.ndarray):
+        new = np.setdiff1d(np.unique(ids), self.team_ids)
+        if not len(new):
+            return
+        self.team_ids = np.concatenate([self.team_ids, new])
+        size = len(self.team_ids) + 1
+        self.ata.resize((size, size))
+        self.atb = np.concatenate([self.atb, np.zeros(size - len(self.atb))])
+
+    def add(self, results: pd.DataFrame):
+        if results.empty:
+            return
+        self._ensure_teams(results[["team_id", "opponent_id"]].to_numpy().ravel())
+        # Late-ingested older matches don't move the reference date back
+        latest = max(results["date"].max(), self.as_of or date.min)
+
+        if self.as_of is not None:
+            decay = 0.5 ** ((latest - self.as_of).days / HALFLIFE_DAYS)
+            self.ata = self.ata * decay
+            self.atb = self.atb * decay
+        self.as_of = latest
+
+        # Target: half goal margin, half xG margin when we have it
+        goal_margin = (results["goals_for"] - results["goals_against"]).to_numpy(dtype=float)
+        xg_margin = (results["xg_for"] - results["xg_against"]).to_numpy(dtype=float)
+        target = np.where(np.isnan(xg_margin), goal_margin, 0.5 * goal_margin + 0.5 * xg_margin)
+        age_days = (pd.Timestamp(latest) - pd.to_datetime(results["date"])).dt.days.to_numpy()
+        weights = 0.5 ** (age_days / HALFLIFE_DAYS)
+
+        n = len(results)
+        col = {tid: i + 1 for i, tid in enumerate(self.team_ids)}
+        team_cols = results["team_id"].map(col).to_numpy()
+        opp_cols = results["opponent_id"].map(col).to_numpy()
+        rows = np.repeat(np.arange(n), 3)
+        cols = np.column_stack([np.zeros(n, dtype=np.int64), team_cols, opp_cols]).ravel()
+        vals = np.column_stack([_home_sign(results), np.ones(n), -np.ones(n)]).ravel()
+        design = sp.csr_matrix((vals, (rows, cols)), shape=(n, len(self.team_ids) + 1))
+
+        weighted = design.multiply(weights[:, None]).tocsr()
+        self.ata = (self.ata + design.T @ weighted).tocsr()
+        self.atb = self.atb + weighted.T @ target
+
+    def solve(self) -> pd.Series:
+        """Team strengths in goals per match vs an average team (0)."""
+        size = len(self.team_ids) + 1
+        ridge = sp.diags(np.r_[0.0, np.full(size - 1, RIDGE)])
+        solution = spsolve((self.ata + ridge).tocsc(), self.atb)
+        self.home_advantage = float(solution[0])
+        return pd.Series(solution[1:], index=self.team_ids, name="strength")
+
+    def save(self, path=DEFAULT_STATE_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        coo = self.ata.tocoo()
+        np.savez(path, team_ids=self.team_ids, row=coo.row, col=coo.col, data=coo.data,
+                 shape=np.array(coo.shape), atb=self.atb,
+                 as_of=np.array(self.as_of.isoformat() if self.as_of else ""),
+                 change_seq=np.array(-1 if self.change_seq is None else self.change_seq))
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATE_PATH) -> "StrengthFit":
+        data = np.load(path)
+        fit = cls()
+        fit.team_ids = data["team_ids"]
+        fit.ata = sp.csr_matrix((data["data"], (data["row"], data["col"])), shape=tuple(data["shape"]))
+        fit.atb = data["atb"]
+        as_of = str(data["as_of"])
+        fit.as_of = date.fromisoformat(as_of) if as_of else None
+        # States saved before change tracking have none: the next run refits
+        change_seq = int(data["change_seq"]) if "change_seq" in data else -1
+        fit.change_seq = change_seq if change_seq >= 0 else None
+        return fit
+
+
+# --- League embeddings ---
+
+def league_embeddings(db: Session, strengths: pd.Series, elo: Dict[int, float],
+                      results: pd.DataFrame) -> Dict[int, list]:
+    """
+    8-dim competition embedding built from its teams' fitted strengths:
+      0 strength index (1.0 = average league; read by gem scoring)
+      1 mean team strength   2 spread   3 strongest   4 weakest
+      5 mean ELO ((elo - 1500) / 400)
+      6 share of results against other leagues   7 log sample size / 10
+    """
+    teams = pd.DataFrame(
+        db.execute(select(Team.id, Team.current_competition_id)
+                   .where(Team.current_competition_id.is_not(None))).all(),
+        columns=["team_id", "competition_id"],
+    )
+    teams["strength"] = teams["team_id"].map(strengths)
+    teams["elo"] = teams["team_id"].map(elo)
+    teams = teams.dropna(subset=["strength"])
+    if teams.empty:
+        return {}
+
+    league_of = teams.set_index("team_id")["competition_id"]
+    played = results.assign(
+        league=results["team_id"].map(league_of), opp_league=results["opponent_id"].map(league_of)
+    )
+    per_side = pd.concat([
+        played[["league", "opp_league"]],
+        played[["opp_league", "league"]].set_axis(["league", "opp_league"], axis=1),
+    ]).dropna(subset=["league"])
+    per_side["cross"] = per_side["league"] != per_side["opp_league"]
+    sample = per_side.groupby("league")["cross"].agg(["mean", "size"])
+
+    stats = teams.groupby("competition_id").agg(
+        mean=("strength", "mean"), std=("strength", "std"), top=("strength", "max"),
+        bottom=("strength", "min"), elo=("elo", "mean"),
+    )
+    baseline = stats["mean"].mean()
+    out = {}
+    for comp_id, row in stats.iterrows():
+        cross, size = (sample.loc[comp_id] if comp_id in sample.index else (0.0, 0))
+        out[int(comp_id)] = [float(v) for v in (
+            max(0.05, 1.0 + row["mean"] - baseline),
+            row["mean"], 0.0 if np.isnan(row["std"]) else row["std"], row["top"], row["bottom"],
+            0.0 if np.isnan(row["elo"]) else (row["elo"] - ELO_START) / 400.0,
+            cross, math.log1p(size) / 10.0,
+        )]
+    return out
+
+
+def _latest_team_elo(db: Session) -> Dict[int, float]:
+    """Latest ELO snapshot per team."""
+    latest = (
+        select(RankingSnapshot.entity_id, func.max(RankingSnapshot.date).label("date"))
+        .where(RankingSnapshot.entity_type == "Team")
+        .group_by(RankingSnapshot.entity_id).subquery()
+    )
+    rows = db.execute(
+        select(RankingSnapshot.entity_id, RankingSnapshot.points, RankingSnapshot.date)
+        .join(latest, (latest.c.entity_id == RankingSnapshot.entity_id) & (latest.c.date == RankingSnapshot.date))
+        .where(RankingSnapshot.entity_type == "Team")
+    ).all()
+    return {entity_id: points for entity_id, points, _ in rows}
+
+
+def fit_league_strength(db: Session, full: bool = False, state_path=DEFAULT_STATE_PATH) -> int:
+    """
+    Updates team ELO, the least-squares fit and every league embedding.
+    Incremental by default: only results created since the last fit's
+    change-log position are read (so late or same-day results aren't
+    missed), ELO continues from the latest snapshots and the fit from its
+    saved normal equations. A result edited in place can't be taken back
+    out of either, so any edit since the last fit triggers a full refit.
+    full=True replays the whole history from scratch (ELO is sequential,
+    so late results are only in exact date order after one).
+    """
+    fit = None if full or not Path(state_path).exists() else StrengthFit.load(state_path)
+    mark = None if fit is None else fit.change_seq
+
+    _settle_results(db)
+    position = db.scalar(select(func.max(TeamMatchResult.change_seq)))
+    if mark is not None and db.scalar(select(exists().where(
+        TeamMatchResult.change_seq > mark, TeamMatchResult.created_seq <= mark,
+    ))):
+        logger.info("✏️ Results were edited since the last fit, refitting from scratch.")
+        mark = None
+
+    if mark is None:
+        ratings, fit = {}, StrengthFit()
+    else:
+        ratings = _latest_team_elo(db)
+    new_results = load_results(db, after_seq=mark)
+    db.commit()     # Lets result writers through again
+    if new_results.empty:
+        logger.info("✅ No new results since the last fit.")
+        return 0
+
+    ratings = run_elo(new_results, ratings)
+    fit.add(new_results)
+    fit.change_seq = position
+    strengths = fit.solve()
+    logger.info(f"🏟️ Fitted {len(strengths)} teams | home advantage {fit.home_advantage:+.2f} goals")
+
+    # Embedding context uses all results inside the decay horizon
+    context = load_results(db, since=fit.as_of - timedelta(days=HALFLIFE_DAYS))
+    embeddings = league_embeddings(db, strengths, ratings, context)
+
+    if embeddings:
+        db.execute(update(Competition), [
+            {"id": comp_id, "strength_embedding": vector} for comp_id, vector in embeddings.items()
+        ])
+
+    snapshot_date = fit.as_of
+    touched = {int(tid) for tid in set(new_results["team_id"]) | set(new_results["opponent_id"])}
+    snapshots = [
+        {"entity_type": "Team", "entity_id": tid, "date": snapshot_date, "points": float(ratings[tid])}
+        for tid in touched
+    ] + [
+        {"entity_type": "League", "entity_id": comp_id, "date": snapshot_date, "points": float(vector[0])}
+        for comp_id, vector in embeddings.items()
+    ]
+    # One snapshot per entity and day: a rerun (or full refit) replaces that day's rows
+    for entity_type, ids in (("Team", touched), ("League", set(embeddings))):
+        if ids:
+            db.execute(delete(RankingSnapshot).where(
+                RankingSnapshot.entity_type == entity_type,
+                RankingSnapshot.date == snapshot_date,
+                RankingSnapshot.entity_id.in_(ids),
+            ))
+    db.execute(RankingSnapshot.__table__.insert(), snapshots)
+    db.commit()
+    fit.save(state_path)
+    return len(new_results)
+
+
+def run(full: bool = False):
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        count = fit_league_strength(db, full=full)
+        logger.info(f"📊 Processed {count} results in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logger.error(f"❌ League strength fit failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run()
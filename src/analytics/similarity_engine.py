@@ -0,0 +1,198 @@
+import json
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.database.models import Player, PositionGroup
+
+logger = logging.getLogger(__name__)
+
+POSITION_CODES = {group: code for code, group in enumerate(PositionGroup)}
+DEFAULT_BLOCK_SIZE = 512
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k by argpartition, then a sort of just those k."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class SimilarityEngine:
+    """
+    Offline nearest-neighbour engine over every player's ability_vector.
+
+    Vectors are L2-normalized once into a contiguous float32 matrix, so cosine
+    similarity is a plain matrix multiply. Rows are sorted by PositionGroup,
+    which makes each group's sub-matrix a zero-copy slice.
+
+        engine = SimilarityEngine.from_db(db)
+        engine.save("data/similarity")              # once, after the nightly job
+        engine = SimilarityEngine.load("data/similarity")  # workers: mmap, instant
+        neighbours, scores = engine.knn_all(k=10)
+    """
+
+    def __init__(self, ids, vectors, positions, birth_days, values, normalized: bool = False):
+        order = np.argsort(positions, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        vectors = np.asarray(vectors, dtype=np.float32)[order]
+        self.vectors = vectors if normalized else _normalize(vectors)
+        self.positions = np.asarray(positions, dtype=np.int8)[order]
+        self.birth_days = np.asarray(birth_days, dtype=np.int32)[order]
+        self.values = np.asarray(values, dtype=np.float32)[order]
+        self._build_groups()
+
+    def _build_groups(self):
+        self.group_slices: Dict[int, slice] = {}
+        bounds = np.searchsorted(self.positions, np.arange(len(POSITION_CODES) + 1))
+        for code in range(len(POSITION_CODES)):
+            self.group_slices[code] = slice(int(bounds[code]), int(bounds[code + 1]))
+        self.row_of_id = {int(pid): row for row, pid in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    # --- Loading / persistence ---
+
+    @classmethod
+    def from_db(cls, db: Session) -> "SimilarityEngine":
+        """One query for every vector plus the metadata we filter on."""
+        rows = db.execute(
+            select(Player.id, Player.ability_vector, Player.position_group,
+                   Player.birth_date, Player.current_market_value)
+            .where(Player.ability_vector.is_not(None))
+        ).all()
+        if not rows:
+            raise ValueError("No players with an ability_vector")
+        ids, vectors, positions, birth_days, values = zip(*(
+            (pid, vec, POSITION_CODES[pos], birth.toordinal() if birth else 0,
+             np.nan if value is None else value)
+            for pid, vec, pos, birth, value in rows
+        ))
+        logger.info(f"📥 Loaded {len(ids)} ability vectors")
+        return cls(ids, np.vstack(vectors), positions, birth_days, values)
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ("ids", "vectors", "positions", "birth_days", "values"):
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        (directory / "meta.json").write_text(json.dumps({
+            "rows": len(self), "dim": int(self.vectors.shape[1]),
+            "positions": [g.value for g in PositionGroup],
+        }))
+        logger.info(f"💾 Saved similarity engine ({len(self)} rows) to {directory}")
+
+    @classmethod
+    def load(cls, directory, mmap: bool = True) -> "SimilarityEngine":
+        """Memory-maps the saved arrays; already sorted and normalized."""
+        directory = Path(directory)
+        mode = "r" if mmap else None
+        engine = cls.__new__(cls)
+        for name in ("ids", "vectors", "positions", "birth_days", "values"):
+            setattr(engine, name, np.load(directory / f"{name}.npy", mmap_mode=mode))
+        engine._build_groups()
+        return engine
+
+    # --- Queries ---
+
+    def _candidate_mask(self, rows: slice, max_age=None, min_age=None, max_value=None) -> Optional[np.ndarray]:
+        mask = None
+        if max_age is not None or min_age is not None:
+            ages = (date.today().toordinal() - self.birth_days[rows]) / 365.25
+            mask = np.ones(len(ages), dtype=bool)
+            if max_age is not None:
+                mask &= ages < max_age + 1
+            if min_age is not None:
+                mask &= ages >= min_age
+        if max_value is not None:
+            value_mask = self.values[rows] <= max_value  # NaN (unknown) -> excluded
+            mask = value_mask if mask is None else mask & value_mask
+        return mask
+
+    def query(
+        self,
+        vectors: np.ndarray,
+        k: int = 10,
+        position_group: Optional[PositionGroup] = None,
+        max_age: Optional[int] = None,
+        min_age: Optional[int] = None,
+        max_value: Optional[float] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched top-k by cosine similarity. Returns (player_ids, scores),
+        each shaped (len(vectors), k); missing slots hold id -1 / -inf.
+        """
+        queries = _normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        rows = self.group_slices[POSITION_CODES[position_group]] if position_group else slice(0, len(self))
+        return self._search(queries, rows, k, block_size, None,
+                            self._candidate_mask(rows, max_age, min_age, max_value))
+
+    def similar_to(self, player_ids: Iterable[int], k: int = 10, **filters) -> Tuple[np.ndarray, np.ndarray]:
+        """Neighbours for players already in the engine (excluding themselves)."""
+        rows = np.array([self.row_of_id[int(pid)] for pid in player_ids])
+        ids, scores = self.query(self.vectors[rows], k=k + 1, **filters)
+        keep = ids != self.ids[rows][:, None]
+        # Drop the self-match (or the weakest hit when self was filtered out)
+        ids = np.array([r[m][:k] for r, m in zip(ids, keep)])
+        scores = np.array([r[m][:k] for r, m in zip(scores, keep)])
+        return ids, scores
+
+    def knn_all(self, k: int = 10, within_group: bool = True,
+                block_size: int = DEFAULT_BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest neighbours for every player at once, using blocked matrix
+        multiplies. With within_group=True each player is only compared with
+        their own PositionGroup's sub-matrix. Row i answers for self.ids[i].
+        """
+        out_ids = np.full((len(self), k), -1, dtype=np.int64)
+        out_scores = np.full((len(self), k), -np.inf, dtype=np.float32)
+        groups = self.group_slices.values() if within_group else [slice(0, len(self))]
+        for rows in groups:
+            if rows.stop == rows.start:
+                continue
+            ids, scores = self._search(self.vectors[rows], rows, k, block_size, exclude_self=True)
+            out_ids[rows], out_scores[rows] = ids, scores
+        return out_ids, out_scores
+
+    def _search(self, queries, rows: slice, k, block_size, exclude_self=None, mask=None):
+        candidates = self.vectors[rows]
+        candidate_ids = self.ids[rows]
+        n = candidates.shape[0]
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if n == 0:
+            return out_ids, out_scores
+
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            scores = block @ candidates.T
+            if mask is not None:
+                scores[:, ~mask] = -np.inf
+            if exclude_self:
+                # Queries are the candidates themselves, in the same order
+                diag = np.arange(start, start + len(block))
+                scores[np.arange(len(block)), diag] = -np.inf
+            top, top_scores = _top_k(scores, k)
+            width = top.shape[1]
+            out_ids[start:start + len(block), :width] = np.where(
+                np.isfinite(top_scores), candidate_ids[top], -1)
+            out_scores[start:start + len(block), :width] = top_scores
+        return out_ids, out_scores
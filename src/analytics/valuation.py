@@ -0,0 +1,176 @@
+import logging
+import time
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from src.analytics.feature_store import DEFAULT_STORE_DIR, POSITION_CODES, FeatureStore
+from src.database.db import SessionLocal
+from src.database.models import PositionGroup, ValuationPrediction
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = "data/valuation_model.npz"
+
+MODEL_NAME = "ridge"
+RIDGE = 1.0
+PREDICT_BATCH = 100_000
+INSERT_CHUNK = 10_000
+
+FEATURES = [
+    "age", "age_sq", "contract_years", "height_cm", "gem_score", "log_minutes",
+    "goals_p90", "assists_p90", "xg_p90", "xa_p90", "rating", "strength",
+    "log_last_fee", "years_since_transfer", "has_transfer",
+    *(f"pos_{group.value}" for group in PositionGroup),
+]
+
+
+def design_matrix(raw: pd.DataFrame, today: Optional[date] = None) -> np.ndarray:
+    """Derives FEATURES (columns in that order) from a feature-store frame."""
+    today = (today or date.today()).toordinal()
+    age = (today - raw["birth_ordinal"].to_numpy()) / 365.25
+    minutes = raw["minutes"].to_numpy()
+    per90 = np.where(minutes > 0, 90.0 / np.where(minutes > 0, minutes, 1.0), np.nan)
+    has_transfer = ~np.isnan(raw["last_transfer_ordinal"].to_numpy())
+    positions = raw["position_code"].to_numpy()
+
+    columns = [
+        age, age ** 2,
+        np.clip((raw["contract_ordinal"].to_numpy() - today) / 365.25, 0.0, None),
+        raw["height_cm"].to_numpy(),
+        raw["gem_score"].to_numpy(),
+        np.log1p(np.nan_to_num(minutes)),
+        *(raw[col].to_numpy() * per90 for col in ["goals", "assists", "xg", "xa"]),
+        raw["rating"].to_numpy(),
+        raw["strength"].to_numpy(),
+        np.log1p(raw["last_fee"].to_numpy()),
+        (today - raw["last_transfer_ordinal"].to_numpy()) / 365.25,
+        has_transfer.astype(float),
+        *((positions == code).astype(float) for code in POSITION_CODES.values()),
+    ]
+    return np.column_stack(columns)
+
+
+# --- Model ---
+
+class ValuationModel:
+    """
+    Ridge regression on log market value. Missing features are imputed
+    with the training mean, i.e. contribute nothing after standardizing.
+    """
+
+    def __init__(self, mean, scale, coef, intercept, version):
+        self.mean = mean
+        self.scale = scale
+        self.coef = coef
+        self.intercept = intercept
+        self.version = version
+
+    @classmethod
+    def fit(cls, features: np.ndarray, target: np.ndarray, ridge: float = RIDGE,
+            version: Optional[str] = None) -> "ValuationModel":
+        mean = np.nanmean(features, axis=0)
+        mean = np.where(np.isnan(mean), 0.0, mean)
+        scale = np.nanstd(features, axis=0)
+        scale = np.where(np.isnan(scale) | (scale == 0), 1.0, scale)
+        x = np.nan_to_num((features - mean) / scale)
+        y = np.log(target)
+        intercept = y.mean()
+        coef = np.linalg.solve(x.T @ x + ridge * np.eye(x.shape[1]), x.T @ (y - intercept))
+        version = version or f"{MODEL_NAME}-{date.today():%Y%m%d}"
+        return cls(mean, scale, coef, intercept, version)
+
+    def predict(self, features: np.ndarray, batch_size: int = PREDICT_BATCH) -> np.ndarray:
+        out = np.empty(len(features))
+        for start in range(0, len(features), batch_size):
+            x = np.nan_to_num((features[start:start + batch_size] - self.mean) / self.scale)
+            out[start:start + batch_size] = np.exp(x @ self.coef + self.intercept)
+        return out
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, mean=self.mean, scale=self.scale, coef=self.coef,
+                 intercept=self.intercept, version=np.array(self.version), features=np.array(FEATURES))
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH) -> "ValuationModel":
+        data = np.load(path)
+        if [str(f) for f in data["features"]] != FEATURES:
+            raise ValueError("Saved valuation model was trained on a different feature set, retrain it.")
+        return cls(data["mean"], data["scale"], data["coef"], float(data["intercept"]), str(data["version"]))
+
+
+def train(raw: pd.DataFrame, today: Optional[date] = None) -> ValuationModel:
+    """Fits on every player with a known market value."""
+    labelled = raw[raw["market_value"] > 0]
+    if labelled.empty:
+        raise ValueError("No players with a market value to train on.")
+    model = ValuationModel.fit(design_matrix(labelled, today), labelled["market_value"].to_numpy())
+    logger.info(f"🧠 Trained {model.version} on {len(labelled)} players")
+    return model
+
+
+def write_predictions(db: Session, player_ids: np.ndarray, values: np.ndarray, version: str,
+                      today: Optional[date] = None) -> int:
+    """
+    Bulk-inserts one ValuationPrediction per player, chunked, one commit.
+    A rerun on the same day replaces that day's predictions for these players.
+    """
+    today = today or date.today()
+    rows = [
+        {"player_id": int(pid), "date": today, "predicted_value": float(value), "model_version": version}
+        for pid, value in zip(player_ids, values)
+    ]
+    for start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[start:start + INSERT_CHUNK]
+        db.execute(delete(ValuationPrediction).where(
+            ValuationPrediction.date == today,
+            ValuationPrediction.player_id.in_([row["player_id"] for row in chunk]),
+        ))
+        db.execute(insert(ValuationPrediction), chunk)
+    db.commit()
+    return len(rows)
+
+
+def reprice(retrain: bool = False, full: bool = False,
+            store_dir=DEFAULT_STORE_DIR, model_path=DEFAULT_MODEL_PATH) -> int:
+    """
+    Nightly run: refresh the feature store (dirty players only unless
+    full), train if asked or if there's no saved model, then predict every
+    player in vectorized batches and log the predictions.
+    """
+    db: Session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        raw = FeatureStore(store_dir).refresh(db, full=full).frame()
+        if raw.empty:
+            logger.warning("⚠️ No players to price.")
+            return 0
+
+        if retrain or not Path(model_path).exists():
+            model = train(raw)
+            model.save(model_path)
+        else:
+            model = ValuationModel.load(model_path)
+
+        values = model.predict(design_matrix(raw))
+        count = write_predictions(db, raw.index.to_numpy(), values, model.version)
+        logger.info(f"💶 Priced {count} players with {model.version} in {time.perf_counter() - started:.2f}s")
+        return count
+    except Exception as e:
+        logger.error(f"❌ Repricing failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    reprice()
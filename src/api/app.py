@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import random
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import asyncpg
+from fastapi import Depends, FastAPI, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from src.api.cache import ResponseCache
+from src.database.cache_events import CACHE_CHANNEL, LEADERBOARDS, PLAYERS
+from src.database.db import DATABASE_URL, get_async_db, get_async_engine
+from src.database.leaderboards import top_gems_statement, u21_radar_statement
+from src.database.models import Player, PositionGroup
+from src.database.schemas import (
+    LeaderboardEntry, PlayerDetailResponse, PlayerResponse, SimilarPlayerResponse,
+)
+from src.database.similarity import DEFAULT_EF_SEARCH, search_settings, similar_players_query
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+cache = ResponseCache()
+
+JSON = "application/json"
+
+LISTEN_HEALTHCHECK = 30.0   # Seconds between pings of the LISTEN connection
+LISTEN_BACKOFF_MAX = 60.0
+
+
+def _json(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _on_cache_event(connection, pid, channel, payload):
+    namespaces = json.loads(payload) if payload else []
+    dropped = cache.invalidate(*namespaces)
+    logger.info(f"🧹 Cache invalidated {namespaces or 'everything'} ({dropped} entries)")
+
+
+async def _listen_for_invalidations():
+    """
+    Keeps a dedicated LISTEN connection open for the life of the app.
+    Notifications sent while it was down are lost, so every (re)connect
+    clears the whole cache. Reconnects back off exponentially with jitter.
+    """
+    attempt = 0
+    while True:
+        try:
+            listener = await asyncpg.connect(DATABASE_URL)
+        except (OSError, asyncpg.PostgresError) as e:
+            attempt += 1
+            delay = random.uniform(0, min(LISTEN_BACKOFF_MAX, 2 ** attempt))
+            logger.warning(f"⚠️ Cache listener can't connect ({e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        closed = asyncio.Event()
+        listener.add_termination_listener(lambda _: closed.set())
+        try:
+            await listener.add_listener(CACHE_CHANNEL, _on_cache_event)
+            dropped = cache.invalidate()
+            if attempt:
+                logger.info(f"🔌 Cache listener reconnected; cleared {dropped} entries")
+            attempt = 0
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), LISTEN_HEALTHCHECK)
+                except asyncio.TimeoutError:
+                    # Catches half-open connections the termination listener never hears about
+                    await listener.execute("SELECT 1", timeout=LISTEN_HEALTHCHECK)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.warning(f"⚠️ Cache listener lost its connection: {e}")
+        finally:
+            listener.terminate()
+        attempt += 1
+        await asyncio.sleep(random.uniform(0, min(LISTEN_BACKOFF_MAX, 2 ** attempt)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the DB pool and a dedicated LISTEN connection for invalidations."""
+    engine = get_async_engine()
+    listener = asyncio.create_task(_listen_for_invalidations())
+    try:
+        yield
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        await engine.dispose()
+
+
+app = FastAPI(title="Gem Scouting API", lifespan=lifespan)
+
+
+async def _cached(namespace: str, key, build) -> Response:
+    body = cache.get(namespace, key)
+    if body is None:
+        # An invalidation arriving while we build means this body may already be stale
+        generation = cache.generation(namespace)
+        body = _json(await build())
+        cache.set(namespace, key, body, generation=generation)
+    return Response(content=body, media_type=JSON)
+
+
+# --- Players ---
+
+@app.get("/players/{player_id}", response_model=PlayerDetailResponse)
+async def player_detail(player_id: int, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        player = await db.scalar(
+            select(Player).where(Player.id == player_id)
+            .options(selectinload(Player.current_team), selectinload(Player.nationality_country))
+        )
+        if player is None:
+            raise HTTPException(status_code=404, detail="Player not found")
+        return PlayerDetailResponse.model_validate(player).model_dump(mode="json")
+
+    return await _cached(PLAYERS, ("detail", player_id), build)
+
+
+@app.get("/players/{player_id}/similar", response_model=list[SimilarPlayerResponse])
+async def similar_players(
+    player_id: int,
+    k: int = Query(10, ge=1, le=100),
+    metric: str = Query("cosine", pattern="^(cosine|l2)$"),
+    position_group: Optional[PositionGroup] = None,
+    min_age: Optional[int] = Query(None, ge=14, le=45),
+    max_age: Optional[int] = Query(None, ge=14, le=45),
+    max_market_value: Optional[float] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def build():
+        vector = await db.scalar(select(Player.ability_vector).where(Player.id == player_id))
+        if vector is None:
+            raise HTTPException(status_code=404, detail="Player not found or has no ability vector")
+        query = similar_players_query(
+            vector, k, metric, exclude_id=player_id, position_group=position_group,
+            min_age=min_age, max_age=max_age, max_market_value=max_market_value,
+        )
+        # Same transaction as the lookup above, so the SET LOCALs apply
+        for statement in search_settings(DEFAULT_EF_SEARCH):
+            await db.execute(statement)
+        # relaxed_order may return neighbours slightly out of order
+        rows = sorted((await db.execute(query)).all(), key=lambda row: row.distance)
+        return [
+            SimilarPlayerResponse(player=PlayerResponse.model_validate(player), distance=dist).model_dump(mode="json")
+            for player, dist in rows
+        ]
+
+    key = ("similar", player_id, k, metric, position_group, min_age, max_age, max_market_value)
+    return await _cached(PLAYERS, key, build)
+
+
+# --- Leaderboards (materialized views) ---
+
+@app.get("/leaderboards/top-gems", response_model=list[LeaderboardEntry])
+async def top_gems(
+    competition_id: int,
+    position_group: PositionGroup,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def build():
+        rows = (await db.execute(top_gems_statement(competition_id, position_group, limit))).mappings()
+        return [LeaderboardEntry.model_validate(dict(row)).model_dump(mode="json") for row in rows]
+
+    return await _cached(LEADERBOARDS, ("top-gems", competition_id, position_group, limit), build)
+
+
+@app.get("/leaderboards/u21", response_model=list[LeaderboardEntry])
+async def u21_radar(
+    position_group: Optional[PositionGroup] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def build():
+        rows = (await db.execute(u21_radar_statement(position_group, limit))).mappings()
+        return [LeaderboardEntry.model_validate(dict(row)).model_dump(mode="json") for row in rows]
+
+    return await _cached(LEADERBOARDS, ("u21", position_group, limit), build)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "cache": cache.stats()}
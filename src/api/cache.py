@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of serialized responses, grouped by namespace.
+
+    Values are the final JSON bytes, so a hit skips the database, the ORM
+    and pydantic entirely. Namespaces are dropped wholesale when ingestion
+    or scoring runs announce a change (see cache_events.py); the TTL is only
+    a backstop for writers that don't announce.
+
+    Each invalidation also bumps the namespace's generation. Callers read
+    generation() before building a response and pass it to set(), which
+    drops the body if an invalidation landed mid-build; otherwise the stale
+    response would be cached again and served until its TTL.
+
+    Not thread-safe on purpose: it lives on the event loop of one worker.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, bytes]]" = OrderedDict()
+        self._epoch = 0     # Bumped by invalidate-everything
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, namespace: str, key: Hashable) -> Optional[bytes]:
+        entry = self._entries.get((namespace, key))
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[(namespace, key)]
+            self.misses += 1
+            return None
+        self._entries.move_to_end((namespace, key))
+        self.hits += 1
+        return entry[1]
+
+    def generation(self, namespace: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(namespace, 0)
+
+    def set(self, namespace: str, key: Hashable, body: bytes, ttl: Optional[float] = None,
+            generation: Optional[Tuple[int, int]] = None) -> bool:
+        """Stores the body, unless `generation` shows the namespace was invalidated since."""
+        if generation is not None and generation != self.generation(namespace):
+            return False
+        self._entries[(namespace, key)] = (time.monotonic() + (ttl or self.ttl), body)
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return True
+
+    def invalidate(self, *namespaces: str) -> int:
+        """Drops every entry in these namespaces (all of them when none given)."""
+        if not namespaces:
+            self._epoch += 1
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+        for namespace in namespaces:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        stale = [key for key in self._entries if key[0] in namespaces]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
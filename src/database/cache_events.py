@@ -0,0 +1,24 @@
+import json
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel the read API listens on to drop cached responses
+CACHE_CHANNEL = "gem_cache"
+
+# Cache namespaces, one per family of API responses
+PLAYERS = "players"            # Player detail and similar-player lists
+LEADERBOARDS = "leaderboards"
+
+
+def notify_cache_invalidation(db: Session, *namespaces: str):
+    """
+    Queues a cache invalidation for the read API. NOTIFY is transactional,
+    so it's only delivered once the caller commits the writes it describes.
+    """
+    if namespaces:
+        db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                   {"channel": CACHE_CHANNEL, "payload": json.dumps(sorted(set(namespaces)))})
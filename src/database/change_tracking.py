@@ -0,0 +1,117 @@
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.database.models import DirtyPlayer, JobWatermark
+
+logger = logging.getLogger(__name__)
+
+# player_season_stats has no writer of its own in this repo (it's loaded by
+# hand / external tools), so a trigger marks its players dirty whatever writes it.
+# Transition tables allow one event per trigger, hence three triggers.
+SEASON_STAT_TRIGGER_SQL = """
+    CREATE OR REPLACE FUNCTION mark_season_stat_players_dirty() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO dirty_players (player_id, marked_at)
+        SELECT DISTINCT changed.player_id, now()
+        FROM changed_rows AS changed
+        JOIN players ON players.id = changed.player_id  -- Skips players being deleted
+        ON CONFLICT (player_id) DO UPDATE
+            SET marked_at = EXCLUDED.marked_at, change_seq = EXCLUDED.change_seq;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE TRIGGER player_season_stats_dirty_insert
+        AFTER INSERT ON player_season_stats REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION mark_season_stat_players_dirty();
+    CREATE OR REPLACE TRIGGER player_season_stats_dirty_update
+        AFTER UPDATE ON player_season_stats REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION mark_season_stat_players_dirty();
+    CREATE OR REPLACE TRIGGER player_season_stats_dirty_delete
+        AFTER DELETE ON player_season_stats REFERENCING OLD TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION mark_season_stat_players_dirty();
+"""
+
+
+def create_change_triggers(db: Session):
+    """Installs the dirty-marking triggers (idempotent). Caller commits."""
+    db.execute(text(SEASON_STAT_TRIGGER_SQL))
+
+
+def mark_players_dirty(db: Session, player_ids: Iterable[int]) -> int:
+    """Records that these players' inputs changed. Caller commits."""
+    ids = sorted({int(pid) for pid in player_ids if pid is not None})
+    if not ids:
+        return 0
+    stmt = insert(DirtyPlayer).values([{"player_id": pid, "marked_at": func.now()} for pid in ids])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DirtyPlayer.player_id],
+        # change_seq takes its default, i.e. the next sequence value
+        set_={"marked_at": stmt.excluded.marked_at, "change_seq": stmt.excluded.change_seq},
+    )
+    db.execute(stmt)
+    return len(ids)
+
+
+def _settle(db: Session):
+    """
+    Waits for every in-flight writer to dirty_players to commit.
+
+    Sequence values are handed out when a row is written, not when it
+    commits, so a slow writer can commit a lower change_seq after a job
+    has read past it. SHARE mode conflicts with the writers' ROW EXCLUSIVE
+    lock, which they take before drawing a value, so once it's granted
+    every value up to the current maximum is visible. The caller commits
+    right after reading to let writers through again.
+    """
+    db.execute(text("LOCK TABLE dirty_players IN SHARE MODE"))
+
+
+def latest_change(db: Session) -> Optional[int]:
+    """
+    Current change-log position, for full runs to store once they're done.
+    Commits the caller's transaction (which releases the lock).
+    """
+    _settle(db)
+    position = db.scalar(select(func.max(DirtyPlayer.change_seq)))
+    db.commit()
+    return position
+
+
+def get_watermark(db: Session, job_name: str) -> Optional[int]:
+    return db.scalar(select(JobWatermark.change_seq).where(JobWatermark.job_name == job_name))
+
+
+def dirty_player_ids(db: Session, job_name: str) -> Tuple[List[int], Optional[int]]:
+    """
+    Players changed since `job_name` last ran, plus the watermark to store
+    once the job has processed them (None when nothing changed).
+    Commits the caller's transaction (which releases the lock).
+    """
+    watermark = get_watermark(db, job_name)
+    _settle(db)
+    query = select(DirtyPlayer.player_id, DirtyPlayer.change_seq)
+    if watermark is not None:
+        query = query.where(DirtyPlayer.change_seq > watermark)
+    rows = db.execute(query).all()
+    db.commit()
+    if not rows:
+        return [], None
+    return [pid for pid, _ in rows], max(seq for _, seq in rows)
+
+
+def advance_watermark(db: Session, job_name: str, watermark: int):
+    """Moves the job's watermark forward. Caller commits with its own writes."""
+    stmt = insert(JobWatermark).values(job_name=job_name, watermark=func.now(), change_seq=watermark)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JobWatermark.job_name],
+        set_={
+            "watermark": stmt.excluded.watermark,
+            "change_seq": func.greatest(JobWatermark.change_seq, stmt.excluded.change_seq),
+        },
+    )
+    db.execute(stmt)
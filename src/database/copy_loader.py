@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+import logging
+import time
+from datetime import date
+from itertools import islice
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from src.database.partitions import ensure_partitions
+from src.database.schemas import MatchSnapshotCreate, TeamMatchResultCreate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# How each big table is fed: columns we COPY, the unique constraint we merge
+# on (and its columns, for in-chunk de-duplication), plus server-side values.
+MATCH_SNAPSHOT_TARGET = {
+    "table": "match_snapshots",
+    "columns": ["player_id", "date", "opponent_id", "competition_id",
+                "minutes_played", "match_rating", "stats"],
+    "constraint": "_match_snapshot_uc",
+    "key": ["player_id", "date"],
+    "generated": {"id": "gen_random_uuid()"},
+    # New/changed appearances make the player dirty for incremental jobs
+    "dirty_column": "player_id",
+    # Range-partitioned: partitions for each chunk's dates are created first
+    "partition_column": "date",
+}
+
+TEAM_MATCH_RESULT_TARGET = {
+    "table": "team_match_results",
+    "columns": ["date", "team_id", "opponent_id", "competition_id", "season_id",
+                "goals_for", "goals_against", "is_home", "is_neutral_venue",
+                "xg_for", "xg_against", "possession"],
+    "constraint": "_team_match_result_uc",
+    "key": ["team_id", "opponent_id", "date"],
+    "generated": {},
+    "partition_column": "date",
+    # Rows the merge actually changes take a new change-log position
+    "change_sequence": "team_match_results_change_seq",
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return None  # csv writes an unquoted empty field -> NULL
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _merge_sql(target: dict, staging: str) -> str:
+    columns = target["columns"]
+    insert_cols = list(target["generated"]) + columns
+    select_cols = list(target["generated"].values()) + [f'"{c}"' for c in columns]
+    key = ", ".join(f'"{c}"' for c in target["key"])
+    updated = [c for c in columns if c not in target["key"]]
+    updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in updated)
+    merge = f"""
+        INSERT INTO {target['table']} ({", ".join(f'"{c}"' for c in insert_cols)})
+        SELECT DISTINCT ON ({key}) {", ".join(select_cols)}
+        FROM {staging}
+        ORDER BY {key}
+        ON CONFLICT ON CONSTRAINT {target['constraint']} DO UPDATE SET {updates}
+    """
+    sequence = target.get("change_sequence")
+    if sequence:
+        # Re-ingesting an unchanged row must not look like an edit
+        current = ", ".join(f'{target["table"]}."{c}"' for c in updated)
+        incoming = ", ".join(f'EXCLUDED."{c}"' for c in updated)
+        merge += f""", "change_seq" = nextval('{sequence}')
+        WHERE ({current}) IS DISTINCT FROM ({incoming})
+    """
+    dirty = target.get("dirty_column")
+    if not dirty:
+        return merge
+    return f"""
+        WITH merged AS ({merge} RETURNING "{dirty}")
+        INSERT INTO dirty_players (player_id, marked_at)
+        SELECT DISTINCT "{dirty}", now() FROM merged
+        ON CONFLICT (player_id) DO UPDATE SET marked_at = EXCLUDED.marked_at, change_seq = EXCLUDED.change_seq
+    """
+
+
+def copy_load(db: Session, records: Iterable, target: dict, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              commit: bool = True) -> dict:
+    """
+    Streams pydantic records into `target` via COPY -> temp staging -> merge.
+
+    Only one chunk is ever held in memory. Each chunk is its own transaction:
+    the staging table is created ON COMMIT DROP, filled with copy_expert,
+    merged with INSERT ... ON CONFLICT and committed. With commit=False the
+    staging table is dropped instead and the caller commits, so several
+    loads can share one transaction.
+    """
+    table = target["table"]
+    columns = target["columns"]
+    col_list = ", ".join(f'"{c}"' for c in columns)
+    staging = f"_stg_{table}"
+    merge_sql = _merge_sql(target, staging)
+
+    records = iter(records)
+    stats = {"rows": 0, "chunks": 0, "seconds": 0.0}
+    started = time.perf_counter()
+
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        chunk_started = time.perf_counter()
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in chunk:
+            writer.writerow([_csv_value(getattr(record, c)) for c in columns])
+        buffer.seek(0)
+
+        partition_column = target.get("partition_column")
+        if partition_column:
+            dates = [getattr(record, partition_column) for record in chunk]
+            ensure_partitions(db, table, min(dates), max(dates))
+
+        raw = db.connection().connection.dbapi_connection
+        with raw.cursor() as cur:
+            cur.execute(
+                f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                f"SELECT {col_list} FROM {table} WITH NO DATA"
+            )
+            cur.copy_expert(f"COPY {staging} ({col_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cur.execute(merge_sql)
+            if not commit:
+                cur.execute(f"DROP TABLE {staging}")
+        if commit:
+            db.commit()
+
+        stats["rows"] += len(chunk)
+        stats["chunks"] += 1
+        elapsed = time.perf_counter() - chunk_started
+        logger.info(f"📦 {table}: chunk {stats['chunks']} | {len(chunk)} rows | "
+                    f"{len(chunk) / max(elapsed, 1e-9):,.0f} rows/sec")
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_sec"] = stats["rows"] / max(stats["seconds"], 1e-9)
+    logger.info(f"✅ Loaded {stats['rows']:,} rows into {table} in {stats['seconds']:.1f}s "
+                f"({stats['rows_per_sec']:,.0f} rows/sec)")
+    return stats
+
+
+def load_match_snapshots(db: Session, records: Iterable[MatchSnapshotCreate],
+                         chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    return copy_load(db, records, MATCH_SNAPSHOT_TARGET, chunk_size)
+
+
+def load_team_match_results(db: Session, records: Iterable[TeamMatchResultCreate],
+                            chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    return copy_load(db, records, TEAM_MATCH_RESULT_TARGET, chunk_size)
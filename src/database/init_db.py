@@ -1,8 +1,12 @@
 import logging
-from sqlalchemy import text
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
 
 # 1. Import the engine and Base from YOUR existing db.py
-from src.database.db import engine, Base
+from src.database.db import engine, Base, SessionLocal
+from src.database.change_tracking import create_change_triggers
+from src.database.leaderboards import create_leaderboards
+from src.database.partitions import ensure_future_partitions
 
 # 2. Import ALL your models. 
 # SQLAlchemy needs to "see" them to create the tables.
@@ -19,13 +23,48 @@ from src.database.models import (
     Transfer,
     ValuationPrediction,
     TeamSeasonContext,
-    RankingSnapshot
+    RankingSnapshot,
+    DirtyPlayer,
+    JobWatermark,
+    PlayerForm,
+    CrawlState
 )
 
 # Set up logging so you can see the SQL commands in the terminal
 logging.basicConfig()
 logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
 
+def add_missing_columns():
+    """
+    Adds model columns missing on pre-existing tables (e.g. newly declared
+    HOT_STATS generated columns, which Postgres backfills on ADD COLUMN).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                spec = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {spec}"))
+
+# Indexes no longer declared on the models because another one covers them
+RETIRED_INDEXES = [
+    "ix_match_snapshots_player_id",     # Leading column of _match_snapshot_uc
+]
+
+def create_missing_indexes():
+    """Creates model-declared indexes that are missing on pre-existing tables, drops retired ones."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        for name in RETIRED_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
 def init_db():
     print("🚀 Connecting to database...")
     
@@ -38,6 +77,33 @@ def init_db():
     print("🏗️  Creating Tables...")
     # This looks at all the imported models and generates the "CREATE TABLE" SQL
     Base.metadata.create_all(bind=engine)
+
+    print("🧱 Ensuring columns...")
+    # create_all doesn't alter existing tables either
+    add_missing_columns()
+
+    print("🧭 Ensuring indexes...")
+    # create_all skips tables that already exist, so add any new indexes explicitly
+    create_missing_indexes()
+
+    print("🧩 Ensuring partitions...")
+    # match_snapshots / team_match_results are range-partitioned by date,
+    # with a default partition catching writes outside the created ranges
+    with SessionLocal() as db:
+        ensure_future_partitions(db)
+        db.commit()
+
+    print("🚩 Ensuring change-tracking triggers...")
+    # player_season_stats writes mark their players dirty for incremental jobs
+    with SessionLocal() as db:
+        create_change_triggers(db)
+        db.commit()
+
+    print("🏆 Ensuring leaderboards...")
+    # Materialized views over players; refreshed after every scoring run
+    with SessionLocal() as db:
+        create_leaderboards(db)
+        db.commit()
     
     print("✅ Database initialized successfully!")
 
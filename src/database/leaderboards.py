@@ -0,0 +1,154 @@
+import logging
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.database import cache_events
+from src.database.db import SessionLocal
+from src.database.models import Player, PositionGroup
+
+logger = logging.getLogger(__name__)
+
+TOP_PER_GROUP = 100
+U21_AGE = 21
+
+# Shared player context: team, its current competition and nationality
+_PLAYER_CONTEXT = """
+    SELECT p.id AS player_id, p.name, p.image_url, p.position_group, p.birth_date,
+           p.current_gem_score AS gem_score, p.current_market_value AS market_value,
+           t.id AS team_id, t.name AS team_name,
+           c.id AS competition_id, c.name AS competition_name,
+           n.id AS nationality_id, n.name AS nationality, n.flag_url
+    FROM players p
+    LEFT JOIN teams t ON t.id = p.current_team_id
+    LEFT JOIN competitions c ON c.id = t.current_competition_id
+    LEFT JOIN countries n ON n.id = p.nationality_id
+    WHERE p.current_gem_score IS NOT NULL
+"""
+
+# name -> (defining query, unique index columns, lookup index columns).
+# The unique index is what REFRESH ... CONCURRENTLY needs.
+LEADERBOARDS = {
+    "mv_top_gems": (
+        f"""
+        SELECT * FROM (
+            SELECT ctx.*, row_number() OVER (
+                PARTITION BY ctx.competition_id, ctx.position_group
+                ORDER BY ctx.gem_score DESC, ctx.player_id
+            ) AS rank
+            FROM ({_PLAYER_CONTEXT}) ctx
+            WHERE ctx.competition_id IS NOT NULL
+        ) ranked
+        WHERE rank <= {TOP_PER_GROUP}
+        """,
+        ["competition_id", "position_group", "player_id"],
+        ["competition_id", "position_group", "rank"],
+    ),
+    "mv_u21_radar": (
+        f"""
+        SELECT ctx.*, row_number() OVER (
+            PARTITION BY ctx.position_group ORDER BY ctx.gem_score DESC, ctx.player_id
+        ) AS rank
+        FROM ({_PLAYER_CONTEXT}) ctx
+        WHERE ctx.birth_date > current_date - interval '{U21_AGE} years'
+        """,
+        ["player_id"],
+        ["position_group", "rank"],
+    ),
+}
+
+
+def create_leaderboards(db: Session):
+    """Creates missing views (populated) and their indexes. Caller commits."""
+    for name, (query, unique_cols, lookup_cols) in LEADERBOARDS.items():
+        db.execute(text(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query} WITH DATA"))
+        db.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_uidx ON {name} ({', '.join(unique_cols)})"))
+        db.execute(text(f"CREATE INDEX IF NOT EXISTS {name}_lookup_idx ON {name} ({', '.join(lookup_cols)})"))
+
+
+def missing_leaderboards(db: Session) -> List[str]:
+    existing = set(db.scalars(
+        text("SELECT matviewname FROM pg_matviews WHERE matviewname = ANY(:names)"),
+        {"names": list(LEADERBOARDS)},
+    ).all())
+    return [name for name in LEADERBOARDS if name not in existing]
+
+
+def refresh_leaderboards(db: Session, concurrently: bool = True):
+    """
+    Recomputes every leaderboard. CONCURRENTLY diffs into the existing view,
+    so dashboard reads keep being served while the refresh runs. Views that
+    don't exist yet (init_db not re-run since they were added) are created
+    instead, already populated.
+    """
+    missing = missing_leaderboards(db)
+    if missing:
+        create_leaderboards(db)
+        cache_events.notify_cache_invalidation(db, cache_events.LEADERBOARDS)
+        db.commit()
+        logger.info(f"🏆 Created {', '.join(missing)}")
+
+    mode = "CONCURRENTLY " if concurrently else ""
+    for name in LEADERBOARDS:
+        if name in missing:
+            continue
+        started = time.perf_counter()
+        db.execute(text(f"REFRESH MATERIALIZED VIEW {mode}{name}"))
+        cache_events.notify_cache_invalidation(db, cache_events.LEADERBOARDS)
+        db.commit()
+        logger.info(f"🏆 Refreshed {name} in {time.perf_counter() - started:.2f}s")
+
+
+# --- Reads (plain index lookups) ---
+# Statements are built separately so the async API can run the same SQL.
+
+def top_gems_statement(competition_id: int, position_group: PositionGroup, limit: int = 20):
+    return text(
+        "SELECT * FROM mv_top_gems WHERE competition_id = :competition_id "
+        "AND position_group = :position_group AND rank <= :limit ORDER BY rank"
+    ).bindparams(
+        competition_id=competition_id, position_group=position_group.name, limit=limit
+    ).columns(position_group=Player.position_group.type)
+
+
+def u21_radar_statement(position_group: Optional[PositionGroup] = None, limit: int = 20):
+    if position_group is None:
+        return text(
+            "SELECT * FROM mv_u21_radar ORDER BY gem_score DESC, player_id LIMIT :limit"
+        ).bindparams(limit=limit).columns(position_group=Player.position_group.type)
+    return text(
+        "SELECT * FROM mv_u21_radar WHERE position_group = :position_group "
+        "AND rank <= :limit ORDER BY rank"
+    ).bindparams(
+        position_group=position_group.name, limit=limit
+    ).columns(position_group=Player.position_group.type)
+
+
+def top_gems(db: Session, competition_id: int, position_group: PositionGroup,
+             limit: int = 20) -> List[dict]:
+    statement = top_gems_statement(competition_id, position_group, limit)
+    return [dict(row) for row in db.execute(statement).mappings().all()]
+
+
+def u21_radar(db: Session, position_group: Optional[PositionGroup] = None, limit: int = 20) -> List[dict]:
+    statement = u21_radar_statement(position_group, limit)
+    return [dict(row) for row in db.execute(statement).mappings().all()]
+
+
+def refresh_all(concurrently: bool = True):
+    db: Session = SessionLocal()
+    try:
+        refresh_leaderboards(db, concurrently)
+    except Exception as e:
+        logger.error(f"❌ Leaderboard refresh failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    refresh_all()
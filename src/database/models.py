@@ -4,8 +4,8 @@ from uuid import UUID, uuid4
 import enum
 
 from sqlalchemy import (
-    String, Integer, Float, Boolean, Date, DateTime, 
-    ForeignKey, UniqueConstraint, Index, Enum, CheckConstraint
+    String, Integer, BigInteger, Float, Boolean, Date, DateTime, 
+    ForeignKey, UniqueConstraint, Index, Enum, CheckConstraint, Computed, Sequence, func
 )
 from sqlalchemy.dialects.postgresql import JSONB, ARRAY, UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -156,6 +156,19 @@ class Player(Base):
         UniqueConstraint('fotmob_id', name='_fotmob_player_uc'),
         # 2. Index for fast lookup by
         Index('idx_player_lookup', 'name', 'nationality_id'),
+        # 3. ANN indexes for "find similar players" (one per distance metric)
+        Index(
+            'idx_player_ability_hnsw_cosine', 'ability_vector',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'ability_vector': 'vector_cosine_ops'},
+        ),
+        Index(
+            'idx_player_ability_hnsw_l2', 'ability_vector',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'ability_vector': 'vector_l2_ops'},
+        ),
     )
 
 class PlayerSeasonStat(Base):
@@ -193,6 +206,10 @@ class PlayerSeasonStat(Base):
         
         # Speed up the "Show me Player X's history" query
         Index('idx_player_history', 'player_id', 'season_id'),
+
+        # Ad-hoc containment filters: detailed_stats @> '{"saves": 5}'
+        Index('idx_player_season_stats_detailed_gin', 'detailed_stats',
+              postgresql_using='gin', postgresql_ops={'detailed_stats': 'jsonb_path_ops'}),
     )
 
 
@@ -220,6 +237,11 @@ class ValuationPrediction(Base):
     predicted_value: Mapped[float] = mapped_column(Float)
     model_version: Mapped[str] = mapped_column(String(20))
 
+    __table_args__ = (
+        # One prediction per player and day (write_predictions replaces reruns)
+        Index('ix_valuation_prediction_player_date', 'player_id', 'date'),
+    )
+
 
 
 class MatchSnapshot(Base):
@@ -230,9 +252,11 @@ class MatchSnapshot(Base):
     __tablename__ = "match_snapshots"
     
     id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True, default=uuid4)
-    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"), index=True)
+    # Indexed by the (player_id, date) unique constraint below
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"))
     
-    date: Mapped[date] = mapped_column(Date)
+    # Partition key (see partitions.py), so it has to be part of the PK
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
     opponent_id: Mapped[int] = mapped_column(ForeignKey("teams.id"))
     competition_id: Mapped[int] = mapped_column(ForeignKey("competitions.id"))
     
@@ -246,6 +270,24 @@ class MatchSnapshot(Base):
     player: Mapped["Player"] = relationship()
     opponent: Mapped["Team"] = relationship(foreign_keys=[opponent_id])
 
+    __table_args__ = (
+        # One appearance per player per day (lets bulk loads merge instead of duplicate)
+        UniqueConstraint('player_id', 'date', name='_match_snapshot_uc'),
+
+        # Ad-hoc containment filters: stats @> '{"goals": 2}'
+        Index('idx_match_snapshot_stats_gin', 'stats',
+              postgresql_using='gin', postgresql_ops={'stats': 'jsonb_path_ops'}),
+
+        # Range-partitioned by month; the (player_id, date) unique index
+        # above is created on every partition
+        {'postgresql_partition_by': 'RANGE (date)'},
+    )
+
+# Result change position, drawn on insert and again whenever the merge
+# rewrites a row; the league strength fit reads past its stored position.
+RESULT_CHANGE_SEQ = Sequence("team_match_results_change_seq", metadata=Base.metadata)
+
+
 class TeamMatchResult(Base):
     """
     The 'Anchor' Data.
@@ -254,8 +296,8 @@ class TeamMatchResult(Base):
     """
     __tablename__ = "team_match_results"
     
-    id: Mapped[int] = mapped_column(primary_key=True)
-    date: Mapped[date] = mapped_column(Date)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    date: Mapped[date] = mapped_column(Date, primary_key=True) # Partition key
     
     # Who Played?
     team_id: Mapped[int] = mapped_column(ForeignKey("teams.id"))
@@ -274,6 +316,13 @@ class TeamMatchResult(Base):
     xg_for: Mapped[Optional[float]] = mapped_column(Float)
     xg_against: Mapped[Optional[float]] = mapped_column(Float)
     possession: Mapped[Optional[float]] = mapped_column(Float) # 0.0 to 1.0
+
+    # Change tracking: created_seq is drawn once, change_seq on every
+    # rewrite, so a row with only change_seq past a watermark was edited
+    created_seq: Mapped[int] = mapped_column(BigInteger, server_default=RESULT_CHANGE_SEQ.next_value())
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, server_default=RESULT_CHANGE_SEQ.next_value(), index=True
+    )
     
     team: Mapped["Team"] = relationship(foreign_keys=[team_id])
     opponent: Mapped["Team"] = relationship(foreign_keys=[opponent_id])
@@ -285,6 +334,12 @@ class TeamMatchResult(Base):
         
         # 2. No Duplicates: A team can't have two results vs same opponent on same day
         UniqueConstraint('team_id', 'opponent_id', 'date', name='_team_match_result_uc'),
+
+        # 3. "Team X's last N games"
+        Index('idx_team_match_result_team_date', 'team_id', 'date'),
+
+        # Range-partitioned by season
+        {'postgresql_partition_by': 'RANGE (date)'},
     )
 
 
@@ -312,4 +367,127 @@ class PlayerInternationalStat(Base):
     # Constraint: A player can only have ONE summary row per level per country
     __table_args__ = (
         UniqueConstraint('player_id', 'level', 'country_id', name='_player_level_country_uc'),
-    )
\ No newline at end of file
+    )
+
+
+# Change-log position. Every mark takes the next value, and jobs only read
+# it once in-flight writers have committed (see change_tracking.py).
+DIRTY_PLAYER_SEQ = Sequence("dirty_players_change_seq", metadata=Base.metadata)
+
+
+class DirtyPlayer(Base):
+    """
+    Change log for incremental jobs.
+    Writers upsert a row whenever a player's inputs change (profile fields,
+    new MatchSnapshot / PlayerSeasonStat rows); jobs read rows whose
+    change_seq is above their JobWatermark.
+    """
+    __tablename__ = "dirty_players"
+
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"), primary_key=True)
+    marked_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, server_default=DIRTY_PLAYER_SEQ.next_value(), index=True
+    )
+
+
+class JobWatermark(Base):
+    """Last change-log position each incremental job has processed."""
+    __tablename__ = "job_watermarks"
+
+    job_name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    watermark: Mapped[datetime] = mapped_column(DateTime)  # When it last advanced
+    change_seq: Mapped[Optional[int]] = mapped_column(BigInteger)
+
+
+class CrawlState(Base):
+    """
+    What the crawler last saw for each FotMob entity (keyed by FotMob ID).
+    The scheduler uses it to pick who to refetch, and to skip the DB write
+    when the relevant part of a payload hashes the same as last time.
+    """
+    __tablename__ = "crawl_state"
+
+    kind: Mapped[str] = mapped_column(String(20), primary_key=True) # "player", "team", "match"
+    entity_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    payload_hash: Mapped[Optional[str]] = mapped_column(String(64))
+    last_fetched_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
+    last_changed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    last_match_date: Mapped[Optional[date]] = mapped_column(Date)
+
+
+class PlayerForm(Base):
+    """
+    Per-player form summary (one row per player, read in O(1) by the dashboard).
+    Rolling last-N averages, exponentially decayed aggregates and momentum,
+    plus the running state the incremental form job resumes from.
+    """
+    __tablename__ = "player_form"
+
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"), primary_key=True)
+    first_match_date: Mapped[Optional[date]] = mapped_column(Date) # Debut tracking
+    last_match_date: Mapped[Optional[date]] = mapped_column(Date)
+    matches_played: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Last-N window
+    form_rating: Mapped[Optional[float]] = mapped_column(Float)
+    form_minutes_share: Mapped[Optional[float]] = mapped_column(Float) # 0.0 to 1.0
+    form_goals_p90: Mapped[Optional[float]] = mapped_column(Float)
+    form_assists_p90: Mapped[Optional[float]] = mapped_column(Float)
+    form_xg_p90: Mapped[Optional[float]] = mapped_column(Float)
+
+    # Exponentially decayed (recent matches weigh more)
+    ewm_rating: Mapped[Optional[float]] = mapped_column(Float)
+    ewm_minutes_share: Mapped[Optional[float]] = mapped_column(Float)
+    ewm_goals_p90: Mapped[Optional[float]] = mapped_column(Float)
+    ewm_assists_p90: Mapped[Optional[float]] = mapped_column(Float)
+    ewm_xg_p90: Mapped[Optional[float]] = mapped_column(Float)
+
+    # Short-term rating minus long-term baseline: > 0 means trending up
+    momentum: Mapped[Optional[float]] = mapped_column(Float)
+
+    # Window buffer + EWM accumulators for incremental updates
+    state: Mapped[dict] = mapped_column(JSONB, default={})
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+# --- Hot stats ---
+# JSONB keys we filter and sort on constantly. Each one becomes a STORED
+# generated column named stat_<key> (NULL unless the JSON value is a number)
+# with its own B-tree index, so "progressive carries > X" is an index scan.
+# Add a key here and run init_db.py; the column is backfilled by Postgres.
+# Analytics imports these lists rather than repeating the keys.
+
+# PlayerSeasonStat.detailed_stats keys ranked per 90 by gem scoring
+SEASON_STAT_KEYS = [
+    "tackles_won", "interceptions", "progressive_passes",
+    "progressive_carries", "successful_dribbles", "saves",
+]
+# MatchSnapshot.stats counts the form engine tracks
+MATCH_STAT_KEYS = ["goals", "assists", "xg"]
+
+HOT_STATS = {
+    PlayerSeasonStat: ("detailed_stats", SEASON_STAT_KEYS),
+    MatchSnapshot: ("stats", MATCH_STAT_KEYS),
+}
+
+
+def _hot_stat_column(source: str, key: str):
+    expression = (
+        f"CASE WHEN jsonb_typeof({source}->'{key}') = 'number' "
+        f"THEN ({source}->>'{key}')::double precision END"
+    )
+    return mapped_column(f"stat_{key}", Float, Computed(expression, persisted=True))
+
+
+def hot_stat(model, key: str):
+    """The generated column for a hot stat, e.g. hot_stat(MatchSnapshot, "xg")."""
+    if key not in HOT_STATS.get(model, (None, []))[1]:
+        raise KeyError(f"'{key}' is not a hot stat of {model.__name__}, add it to HOT_STATS")
+    return getattr(model, f"stat_{key}")
+
+
+for _model, (_source, _keys) in HOT_STATS.items():
+    for _key in _keys:
+        setattr(_model, f"stat_{_key}", _hot_stat_column(_source, _key))
+        Index(f"idx_{_model.__tablename__}_stat_{_key}", _model.__table__.c[f"stat_{_key}"])
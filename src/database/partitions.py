@@ -0,0 +1,193 @@
+import logging
+from datetime import date
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.database.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Range-partitioned tables and how their date range is sliced
+PARTITIONED_TABLES = {
+    "match_snapshots": "month",
+    "team_match_results": "season",
+}
+
+SEASON_START_MONTH = 7      # Seasons run July -> June
+HISTORY_START = date(2015, 7, 1)
+MONTHS_AHEAD = 3
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_bounds(day: date, granularity: str) -> Tuple[date, date, str]:
+    """[start, end) of the partition holding `day`, plus its name suffix."""
+    if granularity == "month":
+        start = date(day.year, day.month, 1)
+        return start, _add_months(start, 1), f"{start:%Y_%m}"
+    if granularity == "season":
+        year = day.year if day.month >= SEASON_START_MONTH else day.year - 1
+        start = date(year, SEASON_START_MONTH, 1)
+        return start, date(year + 1, SEASON_START_MONTH, 1), f"{year}_{(year + 1) % 100:02d}"
+    raise ValueError(f"Unknown partition granularity: {granularity}")
+
+
+def iter_partitions(first: date, last: date, granularity: str) -> Iterator[Tuple[date, date, str]]:
+    """Every partition overlapping [first, last]."""
+    start, end, suffix = partition_bounds(first, granularity)
+    while start <= last:
+        yield start, end, suffix
+        start, end, suffix = partition_bounds(end, granularity)
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    return bool(db.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+             "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table)"),
+        {"table": table},
+    ).scalar())
+
+
+def existing_partitions(db: Session, table: str) -> List[str]:
+    rows = db.execute(
+        text("SELECT child.relname FROM pg_inherits i "
+             "JOIN pg_class parent ON parent.oid = i.inhparent "
+             "JOIN pg_class child ON child.oid = i.inhrelid "
+             "WHERE parent.relname = :table ORDER BY child.relname"),
+        {"table": table},
+    ).all()
+    return [name for (name,) in rows]
+
+
+def default_partition(table: str) -> str:
+    return f"{table}_default"
+
+
+def ensure_default_partition(db: Session, table: str) -> bool:
+    """
+    Catch-all partition, so ORM / upsert writes outside the pre-created
+    ranges land somewhere instead of failing with "no partition found".
+    ensure_partitions moves its rows out once their range exists. Caller commits.
+    """
+    name = default_partition(table)
+    if name in existing_partitions(db, table):
+        return False
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} DEFAULT"))
+    logger.info(f"🧩 {table}: created default partition")
+    return True
+
+
+def _stored_columns(db: Session, table: str) -> List[str]:
+    """Columns that hold written values, i.e. everything but generated columns."""
+    rows = db.execute(
+        text("SELECT column_name FROM information_schema.columns "
+             "WHERE table_name = :table AND is_generated = 'NEVER' ORDER BY ordinal_position"),
+        {"table": table},
+    ).all()
+    return [name for (name,) in rows]
+
+
+def ensure_partitions(db: Session, table: str, first: date, last: date) -> int:
+    """
+    Creates any missing partitions covering [first, last]. Indexes and
+    constraints declared on the parent are created on each new partition by
+    Postgres. Caller commits.
+
+    Postgres refuses a new range while the default partition holds rows in
+    it, so in that case the default is detached (which locks the parent for
+    the rest of the transaction), the range created, its rows moved over
+    and the default re-attached.
+    """
+    granularity = PARTITIONED_TABLES[table]
+    existing = set(existing_partitions(db, table))
+    default = default_partition(table)
+    created = 0
+    for start, end, suffix in iter_partitions(first, last, granularity):
+        name = f"{table}_{suffix}"
+        if name in existing:
+            continue
+        in_range = {"start": start, "end": end}
+        stranded = default in existing and db.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE date >= :start AND date < :end)"), in_range,
+        ).scalar()
+        if stranded:
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        if stranded:
+            # Generated columns are recomputed on insert, so they're left out
+            columns = ", ".join(_stored_columns(db, table))
+            moved = db.execute(text(
+                f"WITH moved AS (DELETE FROM {default} WHERE date >= :start AND date < :end "
+                f"RETURNING {columns}) INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+            ), in_range).rowcount
+            db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+            logger.info(f"🧩 {table}: moved {moved} row(s) from {default} into {name}")
+        created += 1
+    if created:
+        logger.info(f"🧩 {table}: created {created} partition(s) for {first} -> {last}")
+    return created
+
+
+def ensure_future_partitions(db: Session, months_ahead: int = MONTHS_AHEAD,
+                             today: Optional[date] = None) -> int:
+    """History through a few months ahead (plus a default) for every partitioned table. Run nightly."""
+    today = today or date.today()
+    horizon = _add_months(today, months_ahead)
+    created = 0
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(db, table):
+            logger.warning(f"⚠️ {table} exists but is not partitioned; dump and reload it to partition.")
+            continue
+        ensure_default_partition(db, table)
+        created += ensure_partitions(db, table, HISTORY_START, horizon)
+    return created
+
+
+def detach_partitions_before(db: Session, table: str, cutoff: date, drop: bool = False) -> List[str]:
+    """
+    Detaches (optionally drops) every partition ending on or before `cutoff`,
+    e.g. seasons that are no longer queried. Detached partitions stay as
+    plain tables and can be archived or re-attached. Caller commits.
+    """
+    granularity = PARTITIONED_TABLES[table]
+    existing = set(existing_partitions(db, table))
+    removed = []
+    first, _, _ = partition_bounds(HISTORY_START, granularity)
+    for start, end, suffix in iter_partitions(first, cutoff, granularity):
+        name = f"{table}_{suffix}"
+        if end > cutoff or name not in existing:
+            continue
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+        removed.append(name)
+    if removed:
+        logger.info(f"🗄️ {table}: {'dropped' if drop else 'detached'} {len(removed)} partition(s)")
+    return removed
+
+
+def maintain_partitions(months_ahead: int = MONTHS_AHEAD) -> int:
+    db: Session = SessionLocal()
+    try:
+        created = ensure_future_partitions(db, months_ahead)
+        db.commit()
+        return created
+    except Exception as e:
+        logger.error(f"❌ Partition maintenance failed: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    maintain_partitions()
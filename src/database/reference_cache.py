@@ -0,0 +1,91 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.database.models import Competition, Country, Team
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceCache:
+    """
+    In-process lookup tables for the tiny, rarely-changing reference data
+    (countries, teams, competitions). Loaded once with three queries, then
+    every foreign-key resolution is a dict hit.
+
+    Only ids are cached (never ORM objects), so the maps are safe to share
+    across sessions. Anything that writes reference rows must call
+    invalidate() so the next lookup reloads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.country_by_name: Dict[str, int] = {}
+        self.country_by_iso: Dict[str, int] = {}
+        self.team_by_name: Dict[str, int] = {}
+        self.team_by_fotmob_id: Dict[int, int] = {}
+        self.competition_by_name: Dict[str, int] = {}
+
+    def load(self, db: Session):
+        with self._lock:
+            country_by_name, country_by_iso = {}, {}
+            for id_, name, iso in db.execute(select(Country.id, Country.name, Country.iso_code)):
+                country_by_name[name] = id_
+                if iso:
+                    country_by_iso[iso.upper()] = id_
+
+            team_by_name, team_by_fotmob_id = {}, {}
+            # Ordered by id so duplicate names resolve to the oldest row, like .first()
+            for id_, name, fotmob_id in db.execute(select(Team.id, Team.name, Team.fotmob_id).order_by(Team.id)):
+                team_by_name.setdefault(name, id_)
+                if fotmob_id is not None:
+                    team_by_fotmob_id[fotmob_id] = id_
+
+            competition_by_name = {}
+            for id_, name in db.execute(select(Competition.id, Competition.name).order_by(Competition.id)):
+                competition_by_name.setdefault(name, id_)
+
+            self.country_by_name, self.country_by_iso = country_by_name, country_by_iso
+            self.team_by_name, self.team_by_fotmob_id = team_by_name, team_by_fotmob_id
+            self.competition_by_name = competition_by_name
+            self._loaded = True
+        logger.info(f"📚 Reference cache loaded: {len(country_by_name)} countries, "
+                    f"{len(team_by_name)} teams, {len(competition_by_name)} competitions")
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    def _ensure(self, db: Session):
+        if not self._loaded:
+            self.load(db)
+
+    # --- Lookups ---
+
+    def country_id(self, db: Session, name: Optional[str] = None, iso_code: Optional[str] = None) -> Optional[int]:
+        self._ensure(db)
+        if name and name in self.country_by_name:
+            return self.country_by_name[name]
+        if iso_code:
+            return self.country_by_iso.get(iso_code.upper())
+        return None
+
+    def team_id(self, db: Session, name: Optional[str] = None, fotmob_id: Optional[int] = None) -> Optional[int]:
+        self._ensure(db)
+        if fotmob_id is not None and fotmob_id in self.team_by_fotmob_id:
+            return self.team_by_fotmob_id[fotmob_id]
+        if name:
+            return self.team_by_name.get(name)
+        return None
+
+    def competition_id(self, db: Session, name: Optional[str]) -> Optional[int]:
+        self._ensure(db)
+        return self.competition_by_name.get(name) if name else None
+
+
+# Process-wide instance used by the ingestion hot paths
+reference_cache = ReferenceCache()
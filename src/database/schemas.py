@@ -91,6 +91,35 @@ class PlayerResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PlayerDetailResponse(PlayerResponse):
+    current_team: Optional[TeamResponse] = None
+    nationality_country: Optional[CountryResponse] = None
+
+
+class SimilarPlayerResponse(BaseModel):
+    player: PlayerResponse
+    distance: float
+
+
+class LeaderboardEntry(BaseModel):
+    """One row of a materialized leaderboard (see leaderboards.py)."""
+    rank: int
+    player_id: int
+    name: str
+    image_url: Optional[str] = None
+    position_group: PositionGroup
+    birth_date: Optional[date] = None
+    gem_score: float
+    market_value: Optional[float] = None
+    team_id: Optional[int] = None
+    team_name: Optional[str] = None
+    competition_id: Optional[int] = None
+    competition_name: Optional[str] = None
+    nationality_id: Optional[int] = None
+    nationality: Optional[str] = None
+    flag_url: Optional[str] = None
+
+
 # ==========================================
 # Create / ingestion schemas (match DB columns)
 # ==========================================
@@ -183,8 +212,9 @@ class PlayerScraperInput(BaseModel):
 
     fotmob_id: Optional[int] = None
     transfermarkt_id: Optional[str] = None
+    current_team_name: Optional[str] = None
 
-    position_group: PositionGroup
+    position_group: Optional[PositionGroup] = None  # None: label we can't map, keep the stored group
     specific_positions: List[str] = Field(default_factory=list)
 
     season_stats: List[PlayerSeasonStatCreate] = Field(default_factory=list)
@@ -1,69 +1,83 @@
+import json
 import logging
+from pathlib import Path
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from src.database.db import SessionLocal
 from src.database.models import Country, Competition, Team, CompetitionType
+from src.database.reference_cache import reference_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_or_create_country(db: Session, name: str, iso: str, flag: str):
-    """Helper function to avoid repeating code"""
-    country = db.query(Country).filter_by(name=name).first()
-    if not country:
-        country = Country(name=name, iso_code=iso, continent="Europe", flag_url=flag)
-        db.add(country)
-        db.commit()
-        db.refresh(country)
-        logger.info(f"✅ Created Country: {name}")
-    return country
+# Countries -> leagues -> teams for every league we scout. Countries without
+# leagues are there so players of that nationality resolve.
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "leagues.json"
 
-def get_or_create_league(db: Session, name: str, country_id: int, logo: str):
-    """Helper function for Leagues"""
-    league = db.query(Competition).filter_by(name=name).first()
-    if not league:
-        league = Competition(
-            name=name, type=CompetitionType.LEAGUE, country_id=country_id,
-            continent="Europe", logo_url=logo
-        )
-        db.add(league)
-        db.commit()
-        db.refresh(league)
-        logger.info(f"✅ Created League: {name}")
-    return league
+def seed_from_fixture(db: Session, path: Path = FIXTURE_PATH):
+    """
+    Declarative seeding: diff the fixture against the DB with one SELECT per
+    table and insert whatever is missing in one bulk INSERT per table.
+    Existing rows are left untouched, so re-running is a no-op.
+    """
+    with open(path, encoding="utf-8") as f:
+        fixture = json.load(f)
+    countries = fixture["countries"]
 
-def seed_england(db: Session):
-    logger.info("--- Seeding England ---")
-    england = get_or_create_country(
-        db, "England", "ENG", 
-        "https://upload.wikimedia.org/wikipedia/en/b/be/Flag_of_England.svg"
-    )
-    
-    prem = get_or_create_league(
-        db, "Premier League", england.id,
-        logo="https://upload.wikimedia.org/wikipedia/en/f/f2/Premier_League_Logo.svg"
-    )
+    # --- Countries ---
+    existing = dict(db.execute(select(Country.name, Country.id)).all())
+    new_countries = [
+        {"name": c["name"], "iso_code": c["iso_code"], "continent": c.get("continent", "Europe"),
+         "flag_url": c.get("flag_url")}
+        for c in countries if c["name"] not in existing
+    ]
+    if new_countries:
+        rows = db.execute(insert(Country).returning(Country.name, Country.id), new_countries).all()
+        existing.update(dict(rows))
+        logger.info(f"✅ Created {len(rows)} countries")
+    country_ids = existing
 
-    teams = [
-        "AFC Bournemouth", "Arsenal", "Aston Villa", "Brentford", "Brighton & Hove Albion",
-        "Burnley", "Chelsea", "Crystal Palace", "Everton", "Fulham", "Leeds United",
-        "Liverpool", "Manchester City", "Manchester United", "Newcastle United",
-        "Nottingham Forest", "Sunderland", "Tottenham Hotspur",
-        "West Ham United", "Wolverhampton Wanderers"
+    # --- Leagues ---
+    existing = dict(db.execute(select(Competition.name, Competition.id)).all())
+    new_leagues = [
+        {"name": league["name"], "type": CompetitionType.LEAGUE, "country_id": country_ids[c["name"]],
+         "continent": c.get("continent", "Europe"), "logo_url": league.get("logo_url")}
+        for c in countries for league in c.get("leagues", []) if league["name"] not in existing
     ]
-    
-    # Bulk insert logic could go here, but loop is fine for 20 items
-    for name in teams:
-        if not db.query(Team).filter_by(name=name).first():
-            db.add(Team(name=name, country_id=england.id, current_competition_id=prem.id))
-            logger.info(f"   + Added {name}")
+    if new_leagues:
+        rows = db.execute(insert(Competition).returning(Competition.name, Competition.id), new_leagues).all()
+        existing.update(dict(rows))
+        logger.info(f"✅ Created {len(rows)} leagues")
+    league_ids = existing
+
+    # --- Teams ---
+    existing = set(db.scalars(select(Team.name)).all())
+    new_teams = []
+    for c in countries:
+        for league in c.get("leagues", []):
+            for team in league["teams"]:
+                # Plain string, or {"name": ..., "fotmob_id": ...} when we know the ID
+                team = {"name": team} if isinstance(team, str) else team
+                if team["name"] in existing:
+                    continue
+                existing.add(team["name"])
+                new_teams.append({
+                    "name": team["name"], "fotmob_id": team.get("fotmob_id"),
+                    "logo_url": team.get("logo_url"), "is_national_team": False,
+                    "country_id": country_ids[c["name"]],
+                    "current_competition_id": league_ids[league["name"]],
+                })
+    if new_teams:
+        db.execute(insert(Team), new_teams)
+        logger.info(f"✅ Created {len(new_teams)} teams")
+
     db.commit()
+    reference_cache.invalidate()
 
 def seed_static_data():
     db: Session = SessionLocal()
     try:
-        seed_england(db)
-        # seed_spain(db) # Uncomment when ready
-        # seed_germany(db)
+        seed_from_fixture(db)
     except Exception as e:
         logger.error(f"❌ Seeding Failed: {e}")
         db.rollback()
@@ -72,4 +86,4 @@ def seed_static_data():
         logger.info("🏁 Static Seeding Finished.")
 
 if __name__ == "__main__":
-    seed_static_data()
\ No newline at end of file
+    seed_static_data()
@@ -0,0 +1,104 @@
+import logging
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from src.database.models import Player, PositionGroup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EF_SEARCH = 100
+
+
+def years_ago(today: date, years: int) -> date:
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # 29 Feb
+        return today.replace(year=today.year - years, day=28)
+
+
+def search_settings(ef_search: int = DEFAULT_EF_SEARCH):
+    """SET LOCAL only lasts for this transaction; values can't be bound params."""
+    return [
+        text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"),
+        text("SET LOCAL hnsw.iterative_scan = relaxed_order"),
+    ]
+
+
+def similar_players_query(
+    vector: Sequence[float],
+    k: int = 10,
+    metric: str = "cosine",
+    exclude_id: Optional[int] = None,
+    position_group: Optional[PositionGroup] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    max_market_value: Optional[float] = None,
+):
+    """The filtered top-k select (Player, distance); shared by sync and async callers."""
+    if metric == "cosine":
+        distance = Player.ability_vector.cosine_distance(vector)
+    elif metric == "l2":
+        distance = Player.ability_vector.l2_distance(vector)
+    else:
+        raise ValueError(f"Unknown metric: {metric}")
+
+    query = select(Player, distance.label("distance")).where(Player.ability_vector.is_not(None))
+    if exclude_id is not None:
+        query = query.where(Player.id != exclude_id)
+    if position_group is not None:
+        query = query.where(Player.position_group == position_group)
+    if max_market_value is not None:
+        query = query.where(Player.current_market_value <= max_market_value)
+
+    today = date.today()
+    if max_age is not None:
+        # Still max_age until the day before turning max_age + 1
+        query = query.where(Player.birth_date > years_ago(today, max_age + 1))
+    if min_age is not None:
+        query = query.where(Player.birth_date <= years_ago(today, min_age))
+
+    return query.order_by(distance).limit(k)
+
+
+def find_similar_players(
+    db: Session,
+    player_id: Optional[int] = None,
+    vector: Optional[Sequence[float]] = None,
+    k: int = 10,
+    metric: str = "cosine",
+    position_group: Optional[PositionGroup] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    max_market_value: Optional[float] = None,
+    ef_search: int = DEFAULT_EF_SEARCH,
+) -> List[Tuple[Player, float]]:
+    """
+    Top-k players closest to `player_id`'s ability vector (or a raw vector),
+    served by the HNSW index on players.ability_vector.
+
+        find_similar_players(db, player_id=42, position_group=PositionGroup.STRIKER,
+                             max_age=23, max_market_value=20_000_000)
+
+    Returns (player, distance) pairs, nearest first. Higher ef_search trades
+    speed for recall; iterative scans keep filtered queries from coming back
+    short (pgvector >= 0.8).
+    """
+    if vector is None:
+        if player_id is None:
+            raise ValueError("Pass either player_id or vector")
+        vector = db.scalar(select(Player.ability_vector).where(Player.id == player_id))
+        if vector is None:
+            logger.warning(f"⚠️ Player {player_id} has no ability vector yet.")
+            return []
+
+    query = similar_players_query(vector, k, metric, exclude_id=player_id, position_group=position_group,
+                                  min_age=min_age, max_age=max_age, max_market_value=max_market_value)
+    for statement in search_settings(ef_search):
+        db.execute(statement)
+
+    # relaxed_order may return neighbours slightly out of order
+    rows = sorted(db.execute(query).all(), key=lambda row: row.distance)
+    return [(player, dist) for player, dist in rows]
@@ -0,0 +1,170 @@
+import logging
+from typing import Dict, Iterable, List
+
+from sqlalchemy import case, cast, column as sql_column, func, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.database.cache_events import PLAYERS, notify_cache_invalidation
+from src.database.change_tracking import mark_players_dirty
+from src.database.models import Player, PositionGroup
+from src.database.reference_cache import reference_cache
+from src.database.schemas import PlayerScraperInput
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def player_rows(db: Session, players: List[PlayerScraperInput]) -> List[dict]:
+    """
+    Turns scraper inputs into `players` rows, resolving country/team names
+    through the in-process reference cache (no queries once it is warm).
+    Rows the DB would reject (no FotMob ID, unknown country, no birth date)
+    are skipped with a warning. Duplicate FotMob IDs keep the last input,
+    since ON CONFLICT cannot touch the same row twice in one statement.
+    A player whose position couldn't be mapped keeps their stored group
+    (one lookup per batch); a new one has none to keep and is skipped.
+    """
+    rows: Dict[int, dict] = {}
+    for p in players:
+        if p.fotmob_id is None:
+            logger.warning(f"⚠️ '{p.name}' has no FotMob ID. Skipping.")
+            continue
+        nationality_id = reference_cache.country_id(db, name=p.nationality_name)
+        if nationality_id is None:
+            logger.warning(f"⚠️ Country '{p.nationality_name}' not found. Skipping {p.name}.")
+            continue
+        if not p.birth_date:
+            logger.warning(f"⚠️ Birth Date is None for {p.name}. Skipping.")
+            continue
+
+        rows[p.fotmob_id] = {
+            "fotmob_id": p.fotmob_id,
+            "name": p.name,
+            "birth_date": p.birth_date,
+            "nationality_id": nationality_id,
+            "current_team_id": reference_cache.team_id(db, name=p.current_team_name),
+            "image_url": p.image_url,
+            "position_group": PositionGroup(p.position_group.value) if p.position_group else None,
+            "specific_positions": p.specific_positions,
+            "height_cm": p.height_cm,
+            "preferred_foot": p.preferred_foot,
+            "contract_expiry": p.contract_expiry,
+            "current_market_value": p.current_market_value,
+        }
+
+    ungrouped = [fotmob_id for fotmob_id, row in rows.items() if row["position_group"] is None]
+    if ungrouped:
+        stored = dict(db.execute(
+            select(Player.fotmob_id, Player.position_group).where(Player.fotmob_id.in_(ungrouped))
+        ).all())
+        for fotmob_id in ungrouped:
+            if fotmob_id in stored:
+                rows[fotmob_id]["position_group"] = stored[fotmob_id]
+            else:
+                logger.warning(f"⚠️ New player {rows.pop(fotmob_id)['name']} has no mapped position. Skipping.")
+    return list(rows.values())
+
+
+def upsert_player_rows(db: Session, rows: List[dict]) -> List[int]:
+    """
+    Single INSERT ... ON CONFLICT (fotmob_id) DO UPDATE for a batch of rows.
+    Rows whose values did not change are left alone; inserted or changed
+    players are marked dirty for the incremental jobs. Returns the FotMob
+    IDs of every row the statement wrote (or found already up to date).
+    """
+    if not rows:
+        return []
+    stmt = insert(Player).values(rows)
+    excluded = stmt.excluded
+    set_ = {
+        "name": excluded.name,
+        "birth_date": excluded.birth_date,
+        "nationality_id": excluded.nationality_id,
+        "contract_expiry": excluded.contract_expiry,
+        "current_market_value": excluded.current_market_value,
+        "position_group": excluded.position_group,
+        # Keep what we knew when this scrape could not resolve it
+        "current_team_id": func.coalesce(excluded.current_team_id, Player.current_team_id),
+        "image_url": func.coalesce(excluded.image_url, Player.image_url),
+        "height_cm": func.coalesce(excluded.height_cm, Player.height_cm),
+        "preferred_foot": func.coalesce(excluded.preferred_foot, Player.preferred_foot),
+        "specific_positions": case(
+            (func.cardinality(excluded.specific_positions) > 0, excluded.specific_positions),
+            else_=Player.specific_positions,
+        ),
+    }
+    current = tuple_(*(getattr(Player, key) for key in set_))
+    stmt = stmt.on_conflict_do_update(
+        constraint="_fotmob_player_uc",
+        set_=set_,
+        where=current.is_distinct_from(tuple_(*set_.values())),
+    ).returning(Player.id)
+
+    changed = db.execute(stmt).scalars().all()
+    mark_players_dirty(db, changed)
+    return [row["fotmob_id"] for row in rows]
+
+
+def upsert_players(db: Session, players: Iterable[PlayerScraperInput], batch_size: int = DEFAULT_BATCH_SIZE,
+                   commit: bool = True) -> List[int]:
+    """
+    Batch ingestion API: one upsert statement and one commit per batch.
+    Accepts any iterable (including generators), so callers can stream.
+    Returns the FotMob IDs written; players skipped by player_rows() or
+    lost to a failed batch are not in it.
+
+    With commit=False nothing is committed or rolled back: the caller owns
+    the transaction (e.g. to store crawl state alongside) and a failing
+    batch raises instead of being logged and skipped.
+    """
+    written: List[int] = []
+    batch: List[PlayerScraperInput] = []
+    for player in players:
+        batch.append(player)
+        if len(batch) >= batch_size:
+            written += _write_batch(db, batch, commit)
+            batch = []
+    if batch:
+        written += _write_batch(db, batch, commit)
+    return written
+
+
+def _write_batch(db: Session, batch: List[PlayerScraperInput], commit: bool = True) -> List[int]:
+    try:
+        written = upsert_player_rows(db, player_rows(db, batch))
+        if written:
+            notify_cache_invalidation(db, PLAYERS)
+        if commit:
+            db.commit()
+    except Exception as e:
+        if not commit:
+            raise
+        logger.error(f"❌ Player batch of {len(batch)} failed: {e}")
+        db.rollback()
+        return []
+    logger.info(f"💾 Upserted {len(written)} player(s)")
+    return written
+
+
+def bulk_update_column(db: Session, column, values_by_id: dict, chunk_size: int = 10_000) -> int:
+    """
+    Writes {primary key: value} into one column with a single
+    UPDATE ... FROM (VALUES ...) per chunk, instead of one UPDATE per row.
+
+        bulk_update_column(db, Player.current_gem_score, {1: 81.2, 2: 40.5})
+
+    None writes NULL (the cast keeps an all-NULL chunk from being typed as text).
+    """
+    table = column.class_.__table__
+    pk = table.primary_key.columns.values()[0]
+    items = list(values_by_id.items())
+    for start in range(0, len(items), chunk_size):
+        data = values(
+            sql_column("id", pk.type), sql_column("value", column.type), name="new_values"
+        ).data(items[start:start + chunk_size])
+        db.execute(
+            update(table).where(pk == data.c.id).values({column.key: cast(data.c.value, column.type)})
+        )
+    return len(items)
@@ -0,0 +1,180 @@
+import logging
+import queue
+import threading
+from typing import Iterable, Iterator, Optional, Tuple
+
+from playwright.sync_api import sync_playwright, Route
+
+logger = logging.getLogger(__name__)
+
+# Resource types that never contribute to __NEXT_DATA__
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# Trackers / ad networks FotMob pulls in on every page view
+BLOCKED_URL_PARTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "amazon-adsystem.com",
+    "scorecardresearch.com",
+    "facebook.net",
+    "hotjar.com",
+    "criteo",
+    "taboola",
+)
+
+# Seconds fetch_all() waits on a result before checking any worker is still alive
+WORKER_CHECK_INTERVAL = 5.0
+
+# Prefer the object Next.js hydrated, but the raw <script> tag is enough
+NEXT_DATA_JS = """() => window.__NEXT_DATA__ || JSON.parse(
+    (document.getElementById('__NEXT_DATA__') || {}).textContent || 'null'
+)"""
+
+
+def _block_route(route: Route):
+    """Aborts requests for heavy assets and analytics, lets the rest through."""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return route.abort()
+    if any(part in request.url for part in BLOCKED_URL_PARTS):
+        return route.abort()
+    return route.continue_()
+
+
+class BrowserPool:
+    """
+    Long-lived pool of Chromium pages fed from a queue of URLs.
+
+    The sync Playwright API is bound to the thread that started it, so every
+    worker thread owns one browser + context + page for the lifetime of the
+    pool. Per-URL cost drops to a single navigation.
+
+        with BrowserPool(size=4) as pool:
+            for url, next_data in pool.fetch_all(urls):
+                ...
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        headless: bool = True,
+        block_resources: bool = True,
+        timeout_ms: int = 30_000,
+    ):
+        self.size = size
+        self.headless = headless
+        self.block_resources = block_resources
+        self.timeout_ms = timeout_ms
+
+        self._tasks: "queue.Queue[Optional[Tuple[str, queue.Queue]]]" = queue.Queue()
+        self._threads: list[threading.Thread] = []
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._threads:
+            return self
+        logger.info(f"🚀 Starting browser pool with {self.size} page(s) (headless={self.headless})")
+        for i in range(self.size):
+            thread = threading.Thread(target=self._worker, name=f"browser-pool-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def close(self):
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._tasks = queue.Queue()  # Sentinels no dead worker picked up
+        logger.info("🛑 Browser pool closed.")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- Public API ---
+
+    def fetch(self, url: str) -> Optional[dict]:
+        """Loads one URL and returns its __NEXT_DATA__ (None on failure)."""
+        for _, next_data in self.fetch_all([url]):
+            return next_data
+        return None
+
+    def fetch_all(self, urls: Iterable[str]) -> Iterator[Tuple[str, Optional[dict]]]:
+        """
+        Queues every URL and yields (url, next_data) as pages finish.
+        Results arrive in completion order, not input order.
+        """
+        self.start()
+        results: queue.Queue = queue.Queue()
+        pending = 0
+        for url in urls:
+            self._tasks.put((url, results))
+            pending += 1
+
+        while pending:
+            try:
+                result = results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                if not any(thread.is_alive() for thread in self._threads):
+                    self._fail_queued()  # Every worker is gone; nobody else will answer
+                continue
+            pending -= 1
+            yield result
+
+    def _fail_queued(self):
+        """Answers every queued URL with None."""
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                return
+            if task is not None:
+                url, results = task
+                results.put((url, None))
+
+    # --- Worker ---
+
+    def _worker(self):
+        try:
+            self._serve()
+        except Exception as e:
+            # e.g. Chromium failed to launch; fetch_all() notices once no worker is left
+            logger.error(f"❌ {threading.current_thread().name} stopped: {e}")
+
+    def _serve(self):
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=self.headless)
+            context = browser.new_context()
+            context.set_default_timeout(self.timeout_ms)
+            if self.block_resources:
+                context.route("**/*", _block_route)
+            page = context.new_page()
+
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                url, results = task
+                try:
+                    results.put((url, self._load(page, url)))
+                except Exception as e:
+                    logger.error(f"❌ Failed to load {url}: {e}")
+                    results.put((url, None))
+                    # A crashed page is useless for the next URL
+                    if page.is_closed() or "crash" in str(e).lower():
+                        page = context.new_page()
+
+            context.close()
+            browser.close()
+
+    def _load(self, page, url: str) -> Optional[dict]:
+        logger.info(f"🌍 Navigating to {url}...")
+        page.goto(url, wait_until="domcontentloaded")
+        return page.evaluate(NEXT_DATA_JS)
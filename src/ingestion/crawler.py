@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import httpx
+from playwright.async_api import async_playwright, Route
+
+from src.ingestion.browser_pool import BLOCKED_RESOURCE_TYPES, BLOCKED_URL_PARTS, NEXT_DATA_JS
+from src.ingestion.next_data import AsyncNextDataClient
+
+logger = logging.getLogger(__name__)
+
+ENTITY_URLS = {
+    "player": "https://www.fotmob.com/players/{id}",
+    "team": "https://www.fotmob.com/teams/{id}/overview",
+    "match": "https://www.fotmob.com/match/{id}",
+}
+
+_ID_IN_URL = re.compile(r"/(?:players|teams|match)/(\d+)")
+
+
+def entity_id_from_url(url: str) -> Optional[int]:
+    """'https://www.fotmob.com/players/737066/erling-haaland' -> 737066"""
+    match = _ID_IN_URL.search(url)
+    return int(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """
+    Global rate limit shared by every worker.
+    Refills `rate` tokens per second up to `capacity` (the allowed burst).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ProgressJournal:
+    """
+    Append-only JSONL log of finished entities so a crawl can be resumed.
+    Only successes are skipped on resume; failures get retried.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done: set[str] = set()
+        if self.path.exists():
+            with self.path.open() as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write from a killed run
+                    key = f"{entry['kind']}:{entry['id']}"
+                    if entry.get("status") == "ok":
+                        self.done.add(key)
+                    else:
+                        self.done.discard(key)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a")
+
+    def is_done(self, kind: str, entity_id) -> bool:
+        return f"{kind}:{entity_id}" in self.done
+
+    def record(self, kind: str, entity_id, status: str, error: Optional[str] = None):
+        entry = {"kind": kind, "id": entity_id, "status": status, "at": datetime.now().isoformat()}
+        if error:
+            entry["error"] = error[:200]
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        if status == "ok":
+            self.done.add(f"{kind}:{entity_id}")
+
+    def close(self):
+        self._file.close()
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_retryable(error: Exception) -> bool:
+    """429 and 5xx are worth another try; other 4xx won't change. Transport/render errors are."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return True
+
+
+async def _block_route(route: Route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        part in request.url for part in BLOCKED_URL_PARTS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class AsyncBrowserFetcher:
+    """
+    Shared async browser context, launched on first use.
+    In "http" mode it only ever starts for pages missing their payload.
+    """
+
+    def __init__(self, headless: bool = True, timeout_ms: int = 30_000):
+        self.headless = headless
+        self.timeout_ms = timeout_ms
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_context(self):
+        async with self._lock:
+            if self._context is None:
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._context = await self._browser.new_context()
+                self._context.set_default_timeout(self.timeout_ms)
+                await self._context.route("**/*", _block_route)
+        return self._context
+
+    async def fetch(self, url: str) -> Optional[dict]:
+        context = await self._ensure_context()
+        page = await context.new_page()
+        try:
+            await page.goto(url, wait_until="domcontentloaded")
+            return await page.evaluate(NEXT_DATA_JS)
+        finally:
+            await page.close()
+
+    async def close(self):
+        if self._context is not None:
+            await self._context.close()
+            await self._browser.close()
+            await self._playwright.stop()
+            self._context = None
+
+
+class FotMobCrawler:
+    """
+    Asyncio crawler: N concurrent fetches behind one token bucket.
+
+    mode="http" (default) reads the embedded __NEXT_DATA__ over httpx and
+    only renders pages that lack it; mode="browser" always renders.
+
+        crawler = FotMobCrawler(concurrency=8, rate=3, journal_path="data/crawl.jsonl")
+        asyncio.run(crawler.crawl(player_ids, handler=save))
+
+    `handler(entity_id, next_data)` may be sync or async. It runs on the
+    event loop thread, so a single DB session is safe to share.
+
+    An entity is journaled as done once its handler returns. A handler that
+    only buffers should return False and call mark_done() once the work is
+    durable (e.g. after its batch commits); pass `flush` to crawl() to write
+    what's left in the buffer before the journal closes.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        rate: float = 2.0,
+        burst: Optional[float] = None,
+        max_retries: int = 4,
+        journal_path=None,
+        headless: bool = True,
+        timeout_ms: int = 30_000,
+        mode: str = "http",
+    ):
+        if mode not in ("http", "browser"):
+            raise ValueError(f"Unknown crawl mode: {mode}")
+        self.mode = mode
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.journal_path = journal_path
+        self.headless = headless
+        self.timeout_ms = timeout_ms
+        self.stats = {"ok": 0, "failed": 0, "skipped": 0}
+        self._journal: Optional[ProgressJournal] = None
+
+    def mark_done(self, kind: str, entity_ids: Iterable[Any]):
+        """Journals entities whose handler deferred it (returned False)."""
+        if self._journal:
+            for entity_id in entity_ids:
+                self._journal.record(kind, entity_id, "ok")
+
+    async def crawl(self, ids: Iterable[Any], handler: Callable, kind: str = "player",
+                    flush: Optional[Callable] = None):
+        journal = self._journal = ProgressJournal(self.journal_path) if self.journal_path else None
+        queue: asyncio.Queue = asyncio.Queue()
+        for entity_id in ids:
+            if journal and journal.is_done(kind, entity_id):
+                self.stats["skipped"] += 1
+                continue
+            queue.put_nowait(entity_id)
+
+        total = queue.qsize()
+        logger.info(f"🚀 Crawling {total} {kind}(s) with {self.concurrency} workers "
+                    f"({self.stats['skipped']} already done)")
+        started = time.monotonic()
+
+        self._browser = AsyncBrowserFetcher(self.headless, self.timeout_ms)
+        try:
+            async with AsyncNextDataClient(max_connections=self.concurrency) as http:
+                self._http = http
+                workers = [
+                    asyncio.create_task(self._worker(queue, handler, kind, journal))
+                    for _ in range(min(self.concurrency, total) or 1)
+                ]
+                await queue.join()
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+            if flush:
+                result = flush()
+                if asyncio.iscoroutine(result):
+                    await result
+        finally:
+            await self._browser.close()
+            if journal:
+                journal.close()
+            self._journal = None
+
+        elapsed = time.monotonic() - started
+        logger.info(f"🏁 Crawl finished in {elapsed:.1f}s | {self.stats}")
+        return self.stats
+
+    async def fetch_next_data(self, kind: str, entity_id) -> Optional[dict]:
+        url = ENTITY_URLS[kind].format(id=entity_id)
+        if self.mode == "http":
+            next_data = await self._http.fetch(url)
+            if next_data:
+                return next_data
+            logger.info(f"🐢 No embedded payload for {url}, falling back to browser")
+        return await self._browser.fetch(url)
+
+    async def _worker(self, queue: asyncio.Queue, handler, kind, journal):
+        while True:
+            entity_id = await queue.get()
+            try:
+                await self._process(entity_id, handler, kind, journal)
+            finally:
+                queue.task_done()
+
+    async def _process(self, entity_id, handler, kind, journal):
+        next_data, error = None, None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt))
+            await self.bucket.acquire()
+            try:
+                next_data = await self.fetch_next_data(kind, entity_id)
+                if not next_data:
+                    raise ValueError("missing __NEXT_DATA__")
+                break
+            except Exception as e:
+                next_data, error = None, e
+                logger.warning(f"⚠️ {kind} {entity_id} attempt {attempt + 1} failed: {e}")
+                if not is_retryable(e):
+                    break
+        if next_data is None:
+            self._fail(kind, entity_id, journal, f"Giving up on {kind} {entity_id}", error)
+            return
+
+        # The page is fetched; a handler error won't go away by downloading it again
+        try:
+            result = handler(entity_id, next_data)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception as e:
+            self._fail(kind, entity_id, journal, f"Handler failed for {kind} {entity_id}", e)
+            return
+        self.stats["ok"] += 1
+        if journal and result is not False:
+            journal.record(kind, entity_id, "ok")
+
+    def _fail(self, kind, entity_id, journal, message: str, error: Exception):
+        self.stats["failed"] += 1
+        logger.error(f"❌ {message}: {error}")
+        if journal:
+            journal.record(kind, entity_id, "failed", str(error))
@@ -0,0 +1,319 @@
+import logging
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from src.database.models import PositionGroup
+
+logger = logging.getLogger(__name__)
+
+IMAGE_URL = "https://images.fotmob.com/image_resources/playerimages/{id}.png"
+
+
+# --- Converters (raw JSON value -> column value, None when unusable) ---
+
+def parse_date(value) -> Optional[date]:
+    """'2000-07-21T00:00:00.000Z', '2000-07-21' or {'utcTime': ...} -> date(2000, 7, 21)"""
+    if isinstance(value, dict):
+        value = value.get("utcTime")
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+_CURRENCY = str.maketrans("", "", "€£$ ")
+_MULTIPLIERS = {"K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+
+
+def parse_market_value(value) -> Optional[int]:
+    """{'numberValue': 180000000}, '€180M' or '€850K' -> euros"""
+    if isinstance(value, dict):
+        number = value.get("numberValue")
+        if isinstance(number, (int, float)):
+            return int(number)
+        value = value.get("fallback")
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not isinstance(value, str):
+        return None
+    clean = value.translate(_CURRENCY).upper()
+    multiplier = _MULTIPLIERS.get(clean[-1:])
+    if multiplier:
+        clean = clean[:-1]
+    try:
+        return int(float(clean) * (multiplier or 1))
+    except ValueError:
+        return None
+
+
+def parse_height(value) -> Optional[int]:
+    """{'numberValue': 195} or '195 cm' -> 195"""
+    if isinstance(value, dict):
+        number = value.get("numberValue")
+        if isinstance(number, (int, float)):
+            return int(number)
+        value = value.get("fallback")
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        digits = value.split(" ", 1)[0]
+        return int(digits) if digits.isdigit() else None
+    return None
+
+
+def parse_text(value) -> Optional[str]:
+    """Info values are either plain strings or {'key': ..., 'fallback': ...}."""
+    if isinstance(value, dict):
+        value = value.get("fallback")
+    return value if isinstance(value, str) and value else None
+
+
+def parse_foot(value) -> Optional[str]:
+    text = parse_text(value)
+    return text.lower() if text else None
+
+
+def season_id(value) -> Optional[str]:
+    """'2023/2024' -> '2023-2024' (our season_id format)"""
+    return value.replace("/", "-") if isinstance(value, str) else None
+
+
+def map_position_group(fotmob_label: str) -> Optional[PositionGroup]:
+    if not fotmob_label: return None
+    label = fotmob_label.lower()
+
+    if "goalkeeper" in label: return PositionGroup.GOALKEEPER
+    if "centre back" in label: return PositionGroup.CENTRE_BACK
+    if "left back" in label or "right back" in label: return PositionGroup.FULL_BACK
+    if any(x in label for x in ["defensive midfield", "central midfield"]): return PositionGroup.MIDFIELDER
+    if any(x in label for x in ["attacking midfield", "right wing", "left wing", "winger"]): return PositionGroup.WINGER_AM
+    if any(x in label for x in ["center forward", "striker", "cf", "st"]): return PositionGroup.STRIKER
+    return None
+
+
+# --- Sources (where a field's raw value lives) ---
+# Each source builds a getter(obj, info) -> raw value once, when the spec is
+# compiled; compile_spec() runs a payload through the getters in order.
+
+Getter = Callable[[dict, Optional[Dict[str, Any]]], Any]
+
+
+class Path:
+    """Dotted path from the object being extracted, e.g. 'primaryTeam.teamName'."""
+
+    def __init__(self, dotted: str):
+        self.keys = tuple(dotted.split("."))
+
+    def getter(self) -> Getter:
+        first, *rest = self.keys
+        if not rest:
+            return lambda obj, info: obj.get(first)
+
+        def get(obj, info):
+            raw = obj.get(first)
+            for key in rest:
+                if raw.__class__ is not dict:
+                    return None
+                raw = raw.get(key)
+            return raw
+        return get
+
+
+class Info:
+    """
+    A playerInformation entry, matched (case-insensitively) on its
+    translationKey, title key or title text. The label index is built
+    once per payload, so every Info lookup is a dict hit.
+    """
+
+    def __init__(self, *labels: str):
+        self.labels = tuple(label.lower() for label in labels)
+
+    def getter(self) -> Getter:
+        labels = self.labels
+
+        def get(obj, info):
+            for label in labels:
+                raw = info.get(label)
+                if raw is not None:
+                    return raw
+            return None
+        return get
+
+
+class Each:
+    """Applies a nested spec to every item of the list at `path`."""
+
+    def __init__(self, path: str, spec: dict):
+        self.path = Path(path)
+        self.spec = spec
+
+    def getter(self) -> Getter:
+        get_list = self.path.getter()
+        extract = compile_spec(self.spec, info_list=None)
+
+        def get(obj, info):
+            raw = get_list(obj, info)
+            if raw.__class__ is not list:
+                return None
+            return [extract(item) for item in raw if item.__class__ is dict]
+        return get
+
+
+def info_index(items) -> Dict[str, Any]:
+    """playerInformation list -> {lowercased label: raw value}, first entry wins."""
+    index = {}
+    if not isinstance(items, list):
+        return index
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        value = item.get("value")
+        title = item.get("title")
+        if isinstance(title, dict):
+            labels = (item.get("translationKey"), title.get("key"), title.get("default"))
+        else:
+            labels = (item.get("translationKey"), title)
+        for label in labels:
+            if label.__class__ is str:
+                label = label.lower()
+                if label not in index:
+                    index[label] = value
+    return index
+
+
+def compile_spec(spec: Dict[str, Tuple[Sequence, Optional[Callable]]],
+                 info_list: Optional[str] = "playerInformation") -> Callable[[dict], dict]:
+    """
+    Turns {field: ([source, ...], converter)} into one extractor function.
+    Sources are tried in order; the first that converts to a non-None value
+    wins. Getters are built once here, so a payload costs only its dict
+    lookups and converters.
+    """
+    fields = [(name, [source.getter() for source in sources], convert)
+              for name, (sources, convert) in spec.items()]
+
+    def extract(obj: dict) -> dict:
+        info = info_index(obj.get(info_list)) if info_list else None
+        record = {}
+        for name, getters, convert in fields:
+            value = None
+            for get in getters:
+                raw = get(obj, info)
+                if raw is None:
+                    continue
+                if convert is None:
+                    value = raw
+                else:
+                    try:
+                        value = convert(raw)
+                    except (TypeError, ValueError):
+                        continue
+                if value is not None:
+                    break
+            record[name] = value
+        return record
+    return extract
+
+
+# --- Specs ---
+
+TRANSFER_SPEC = {
+    "date": ([Path("transferDate")], parse_date),
+    "from_team_name": ([Path("fromClub")], None),
+    "from_team_fotmob_id": ([Path("fromClubId")], int),
+    "to_team_name": ([Path("toClub")], None),
+    "to_team_fotmob_id": ([Path("toClubId")], int),
+    "fee_amount": ([Path("fee.value"), Path("fee.feeText")], parse_market_value),
+}
+
+SEASON_SPEC = {
+    "season_id": ([Path("seasonName")], season_id),
+    "team_name": ([Path("team")], None),
+    "team_fotmob_id": ([Path("teamId")], int),
+    "appearances": ([Path("appearances")], int),
+    "goals": ([Path("goals")], int),
+    "assists": ([Path("assists")], int),
+    "rating": ([Path("rating.rating"), Path("rating")], float),
+}
+
+PLAYER_SPEC = {
+    "name": ([Path("name")], None),
+    "fotmob_id": ([Path("id")], int),
+    "birth_date": ([Path("birthDate")], parse_date),
+    "contract_expiry": ([Path("contractEnd")], parse_date),
+    "nationality_name": ([Path("meta.personJSONLD.nationality.name"), Info("country_sentencecase", "country")],
+                         parse_text),
+    "height_cm": ([Info("height_sentencecase", "height")], parse_height),
+    "preferred_foot": ([Info("preferred_foot", "preferred foot")], parse_foot),
+    "current_market_value": ([Info("transfer_value", "market value", "transfer value")], parse_market_value),
+    "current_team_name": ([Path("primaryTeam.teamName")], None),
+    "image_url": ([Path("id")], lambda player_id: IMAGE_URL.format(id=int(player_id))),
+    "position_label": ([Path("positionDescription.primaryPosition.label"),
+                        Path("positionDescription.strPos.label")], parse_text),
+}
+
+# Only walked when history is asked for; the scraper input doesn't need it
+HISTORY_SPEC = {
+    "transfers": ([Each("transfers", TRANSFER_SPEC)], None),
+    "season_entries": ([Each("careerHistory.careerItems.senior.seasonEntries", SEASON_SPEC)], None),
+}
+
+extract_profile = compile_spec(PLAYER_SPEC)
+extract_history = compile_spec(HISTORY_SPEC, info_list=None)
+
+
+def player_profile(next_data: dict) -> Optional[dict]:
+    """The main player object inside props.pageProps.fallback."""
+    fallback = (next_data.get("props") or {}).get("pageProps", {}).get("fallback") or {}
+    for data in fallback.values():
+        if isinstance(data, dict) and "name" in data and ("contractEnd" in data or "birthDate" in data):
+            return data
+    return None
+
+
+def extract_player_record(next_data: dict, history: bool = False) -> Optional[dict]:
+    """PLAYER_SPEC fields (plus HISTORY_SPEC with history=True) from a page's __NEXT_DATA__."""
+    profile = player_profile(next_data)
+    if profile is None:
+        return None
+    record = extract_profile(profile)
+    if history:
+        record.update(extract_history(profile))
+    return record
+
+
+def extract_player_fields(next_data: dict) -> Optional[dict]:
+    """
+    PlayerScraperInput fields from a page's __NEXT_DATA__, or None.
+    Plain dict in, plain dict out, so it can run in a worker process.
+    Transfers and season entries come from extract_player_record(history=True):
+    the scraper input's history schemas need DB IDs we don't have yet.
+    """
+    record = extract_player_record(next_data)
+    if record is None:
+        logger.error("❌ Could not find valid player data.")
+        return None
+
+    label = record["position_label"]
+    group = map_position_group(label)
+    if not group:
+        # Everything else is still worth saving; the upsert keeps their stored group
+        logger.warning(f"⚠️ Unmapped position '{label}' for {record['name']}. Keeping current group.")
+
+    return dict(
+        name=record["name"],
+        fotmob_id=record["fotmob_id"],
+        nationality_name=record["nationality_name"],
+        birth_date=record["birth_date"],
+        height_cm=record["height_cm"],
+        preferred_foot=record["preferred_foot"],
+        image_url=record["image_url"],
+        contract_expiry=record["contract_expiry"],
+        current_market_value=record["current_market_value"],
+        current_team_name=record["current_team_name"],
+        position_group=group.value if group else None,
+        specific_positions=[label] if label else [],
+    )
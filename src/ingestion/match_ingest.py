@@ -0,0 +1,284 @@
+import logging
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.database.copy_loader import MATCH_SNAPSHOT_TARGET, TEAM_MATCH_RESULT_TARGET, copy_load
+from src.database.db import SessionLocal
+from src.database.models import Player
+from src.database.reference_cache import reference_cache
+from src.database.schemas import MatchSnapshotCreate, TeamMatchResultCreate
+from src.ingestion.crawler import ENTITY_URLS
+from src.ingestion.next_data import NextDataClient
+from src.ingestion.payload_cache import PayloadCache
+
+logger = logging.getLogger(__name__)
+
+# Matches per write transaction (~25 appearances + 2 results each)
+DEFAULT_MATCH_BATCH = 50
+
+# FotMob stat keys -> the names MatchSnapshot.stats uses (see HOT_STATS)
+STAT_ALIASES = {
+    "expected_goals": "xg",
+    "expected_assists": "xa",
+    "expected_goals_on_target_variant": "xgot",
+}
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.rstrip("%"))
+        except ValueError:
+            return None
+    return None
+
+
+def _match_date(general: dict):
+    raw = general.get("matchTimeUTCDate") or general.get("matchTimeUTC")
+    if not isinstance(raw, str):
+        return None
+    try:
+        return datetime.fromisoformat(raw.replace("Z", "").split(".")[0]).date()
+    except ValueError:
+        return None
+
+
+def _team_stats(content: dict) -> Dict[str, Tuple]:
+    """'Periods.All' stat groups flattened to {key: (home value, away value)}."""
+    periods = (content.get("stats") or {}).get("Periods") or {}
+    groups = (periods.get("All") or {}).get("stats") or []
+    flat = {}
+    for group in groups:
+        for stat in group.get("stats") or []:
+            values = stat.get("stats")
+            if stat.get("key") and isinstance(values, list) and len(values) == 2:
+                flat[stat["key"]] = (_number(values[0]), _number(values[1]))
+    return flat
+
+
+def _player_stats(entry: dict) -> Dict[str, float]:
+    """Nested {group: {label: {key, stat: {value, total}}}} -> {key: value}."""
+    flat = {}
+    for group in entry.get("stats") or []:
+        for item in (group.get("stats") or {}).values():
+            if not isinstance(item, dict) or not item.get("key"):
+                continue
+            stat = item.get("stat") or {}
+            value = _number(stat.get("value"))
+            if value is None:
+                continue
+            key = STAT_ALIASES.get(item["key"], item["key"])
+            flat[key] = value
+            total = _number(stat.get("total"))
+            if total is not None:
+                flat[f"{key}_total"] = total
+    return flat
+
+
+def parse_match(next_data: dict) -> Optional[dict]:
+    """
+    Pulls everything we store from one match page's __NEXT_DATA__:
+    fixture, score, team-level xG/possession and each player's line.
+    Returns None for matches that haven't finished (or odd payloads).
+    """
+    page = (next_data.get("props") or {}).get("pageProps") or {}
+    general = page.get("general") or {}
+    header = page.get("header") or {}
+    content = page.get("content") or {}
+
+    status = header.get("status") or {}
+    if not (general.get("finished") or status.get("finished")):
+        return None
+    match_date = _match_date(general)
+    teams = header.get("teams") or []
+    home, away = general.get("homeTeam") or {}, general.get("awayTeam") or {}
+    if match_date is None or len(teams) != 2 or not home.get("id") or not away.get("id"):
+        logger.warning(f"⚠️ Match {general.get('matchId')} payload is missing fixture data. Skipping.")
+        return None
+
+    team_stats = _team_stats(content)
+    xg = team_stats.get("expected_goals", (None, None))
+    possession = team_stats.get("BallPossesion", (None, None))
+
+    players = []
+    for entry in (content.get("playerStats") or {}).values():
+        if not isinstance(entry, dict) or entry.get("id") is None:
+            continue
+        stats = _player_stats(entry)
+        # Minutes and rating have their own columns, not the stats blob
+        minutes = stats.pop("minutes_played", None)
+        if not minutes:
+            continue  # Unused substitute
+        players.append({
+            "fotmob_id": int(entry["id"]),
+            "team_fotmob_id": int(entry["teamId"]) if entry.get("teamId") is not None else None,
+            "minutes_played": int(minutes),
+            "match_rating": stats.pop("rating_title", None),
+            "stats": stats,
+        })
+
+    season = general.get("parentLeagueSeason") or general.get("leagueSeason") or ""
+    return {
+        "match_id": general.get("matchId"),
+        "date": match_date,
+        "competition": general.get("leagueName"),
+        "parent_competition": general.get("parentLeagueName"),
+        "season_id": season.replace("/", "-"),
+        "home": {"fotmob_id": int(home["id"]), "name": home.get("name"),
+                 "goals": teams[0].get("score"), "xg": xg[0],
+                 "possession": possession[0] / 100 if possession[0] is not None else None},
+        "away": {"fotmob_id": int(away["id"]), "name": away.get("name"),
+                 "goals": teams[1].get("score"), "xg": xg[1],
+                 "possession": possession[1] / 100 if possession[1] is not None else None},
+        "players": players,
+    }
+
+
+def _player_ids(db: Session, fotmob_ids: Iterable[int]) -> Dict[int, int]:
+    ids = list(set(fotmob_ids))
+    if not ids:
+        return {}
+    rows = db.execute(select(Player.fotmob_id, Player.id).where(Player.fotmob_id.in_(ids)))
+    return dict(rows.all())
+
+
+def build_records(db: Session, matches: List[dict]) -> Tuple[List[TeamMatchResultCreate], List[MatchSnapshotCreate], int]:
+    """
+    Turns parsed matches into both TeamMatchResult rows (one per side) and a
+    MatchSnapshot per appearance. Teams/competitions come from the reference
+    cache and players from a single fotmob_id lookup for the whole batch.
+    Returns (results, snapshots, unknown players skipped).
+    """
+    player_ids = _player_ids(db, (p["fotmob_id"] for m in matches for p in m["players"]))
+    results, snapshots, unknown = [], [], 0
+
+    for match in matches:
+        home, away = match["home"], match["away"]
+        home_id = reference_cache.team_id(db, name=home["name"], fotmob_id=home["fotmob_id"])
+        away_id = reference_cache.team_id(db, name=away["name"], fotmob_id=away["fotmob_id"])
+        competition_id = (reference_cache.competition_id(db, match["competition"])
+                          or reference_cache.competition_id(db, match["parent_competition"]))
+        if not home_id or not away_id or not competition_id:
+            logger.warning(f"⚠️ Match {match['match_id']}: unknown team or competition "
+                           f"({home['name']} v {away['name']}, {match['competition']}). Skipping.")
+            continue
+
+        team_ids = {home["fotmob_id"]: (home_id, away_id), away["fotmob_id"]: (away_id, home_id)}
+        try:
+            pair = [
+                TeamMatchResultCreate(
+                    date=match["date"],
+                    team_id=team_ids[side["fotmob_id"]][0],
+                    opponent_id=team_ids[side["fotmob_id"]][1],
+                    competition_id=competition_id,
+                    season_id=match["season_id"],
+                    goals_for=side["goals"],
+                    goals_against=other["goals"],
+                    is_home=is_home,
+                    xg_for=side["xg"],
+                    xg_against=other["xg"],
+                    possession=side["possession"],
+                )
+                for side, other, is_home in ((home, away, True), (away, home, False))
+            ]
+        except ValidationError as e:
+            logger.error(f"❌ Match {match['match_id']} result is invalid: {e}")
+            continue
+        results.extend(pair)
+
+        for line in match["players"]:
+            player_id = player_ids.get(line["fotmob_id"])
+            if player_id is None or line["team_fotmob_id"] not in team_ids:
+                unknown += 1
+                continue
+            snapshots.append(MatchSnapshotCreate(
+                player_id=player_id,
+                date=match["date"],
+                opponent_id=team_ids[line["team_fotmob_id"]][1],
+                competition_id=competition_id,
+                minutes_played=line["minutes_played"],
+                match_rating=line["match_rating"],
+                stats=line["stats"],
+            ))
+    return results, snapshots, unknown
+
+
+def write_matches(db: Session, matches: List[dict]) -> dict:
+    """
+    Writes a batch of parsed matches in ONE transaction: both result rows
+    per match, every appearance, and the dirty marks for those players.
+    """
+    results, snapshots, unknown = build_records(db, matches)
+    try:
+        copy_load(db, results, TEAM_MATCH_RESULT_TARGET, commit=False)
+        copy_load(db, snapshots, MATCH_SNAPSHOT_TARGET, commit=False)
+        db.commit()
+    except Exception as e:
+        logger.error(f"❌ Match batch of {len(matches)} failed: {e}")
+        db.rollback()
+        return {"matches": 0, "results": 0, "snapshots": 0, "unknown_players": unknown}
+    return {"matches": len(results) // 2, "results": len(results),
+            "snapshots": len(snapshots), "unknown_players": unknown}
+
+
+def ingest_match_payloads(db: Session, payloads: Iterable[dict], batch_size: int = DEFAULT_MATCH_BATCH) -> dict:
+    """Parses and writes match payloads, `batch_size` matches per transaction."""
+    totals = {"matches": 0, "results": 0, "snapshots": 0, "unknown_players": 0, "unparsed": 0}
+    payloads = iter(payloads)
+    while True:
+        chunk = list(islice(payloads, batch_size))
+        if not chunk:
+            break
+        parsed = []
+        for next_data in chunk:
+            match = parse_match(next_data) if next_data else None
+            if match is None:
+                totals["unparsed"] += 1
+            else:
+                parsed.append(match)
+        if parsed:
+            for key, value in write_matches(db, parsed).items():
+                totals[key] += value
+    return totals
+
+
+def ingest_matches(match_ids: Iterable[int], workers: int = 8, batch_size: int = DEFAULT_MATCH_BATCH,
+                   cache: PayloadCache = None) -> dict:
+    """
+    Fetches each match page once and stores both teams' results plus every
+    appearance. A matchday is ~10 fetches instead of one per player.
+    """
+    urls = {ENTITY_URLS["match"].format(id=match_id): match_id for match_id in match_ids}
+    started = time.perf_counter()
+    db: Session = SessionLocal()
+    try:
+        with NextDataClient() as client:
+            def payloads():
+                for url, next_data in client.fetch_all(urls, workers=workers):
+                    if next_data and cache:
+                        cache.put("match", urls[url], next_data)
+                    yield next_data
+
+            totals = ingest_match_payloads(db, payloads(), batch_size)
+    finally:
+        db.close()
+
+    logger.info(f"⚽ Ingested {totals['matches']} match(es) from {len(urls)} fetch(es): "
+                f"{totals['snapshots']} appearances, {totals['unknown_players']} unknown player(s), "
+                f"{totals['unparsed']} unparsed in {time.perf_counter() - started:.1f}s")
+    return totals
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    ingest_matches(int(arg) for arg in sys.argv[1:])
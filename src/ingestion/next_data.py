@@ -0,0 +1,151 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+
+import httpx
+
+from src.ingestion.browser_pool import BrowserPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+
+_MARKER = 'id="__NEXT_DATA__"'
+
+
+def extract_next_data(html: str) -> Optional[dict]:
+    """
+    Pulls the <script id="__NEXT_DATA__"> JSON out of server-rendered HTML.
+    Plain str.find calls instead of an HTML parse: the tag is unique and
+    Next.js escapes '<' inside the payload, so the first '</script>' closes it.
+    """
+    if not html:
+        return None
+    marker = html.find(_MARKER)
+    if marker == -1:
+        return None
+    start = html.find(">", marker)
+    end = html.find("</script>", start)
+    if start == -1 or end == -1:
+        return None
+    try:
+        return json.loads(html[start + 1:end])
+    except json.JSONDecodeError:
+        logger.warning("⚠️ __NEXT_DATA__ tag found but JSON is invalid.")
+        return None
+
+
+class NextDataClient:
+    """
+    Browserless fetcher: one pooled httpx.Client, Playwright only as fallback.
+
+        with NextDataClient() as client:
+            next_data = client.fetch(url)
+
+    The fallback BrowserPool is started lazily, so a run where every page
+    embeds its payload never launches Chromium.
+    """
+
+    def __init__(self, timeout: float = 20.0, browser_fallback: bool = True, fallback_pages: int = 1):
+        self.client = httpx.Client(
+            headers=DEFAULT_HEADERS, limits=DEFAULT_LIMITS, timeout=timeout, follow_redirects=True
+        )
+        self.browser_fallback = browser_fallback
+        self.fallback_pages = fallback_pages
+        self._pool: Optional[BrowserPool] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.client.close()
+        if self._pool:
+            self._pool.close()
+
+    def fetch_html(self, url: str) -> Optional[dict]:
+        """Raises on HTTP errors; returns None only when the payload is missing."""
+        response = self.client.get(url)
+        response.raise_for_status()
+        return extract_next_data(response.text)
+
+    def fetch(self, url: str) -> Optional[dict]:
+        try:
+            next_data = self.fetch_html(url)
+        except httpx.HTTPError as e:
+            logger.error(f"❌ HTTP fetch failed for {url}: {e}")
+            return None
+        if next_data or not self.browser_fallback:
+            return next_data
+        logger.info(f"🐢 No embedded payload for {url}, falling back to browser")
+        return self._browser().fetch(url)
+
+    def fetch_all(self, urls: Iterable[str], workers: int = 8) -> Iterator[Tuple[str, Optional[dict]]]:
+        """
+        Fetches many URLs over a thread pool sharing the one connection pool.
+        Pages without an embedded payload are retried through the browser pool
+        at the end, so they arrive last.
+        """
+        misses = []
+
+        def _one(url):
+            try:
+                return url, self.fetch_html(url)
+            except httpx.HTTPError as e:
+                logger.error(f"❌ HTTP fetch failed for {url}: {e}")
+                return url, False
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for url, next_data in executor.map(_one, urls):
+                if next_data is None and self.browser_fallback:
+                    misses.append(url)
+                else:
+                    yield url, next_data or None
+
+        if misses:
+            logger.info(f"🐢 {len(misses)} page(s) need the browser fallback")
+            yield from self._browser().fetch_all(misses)
+
+    def _browser(self) -> BrowserPool:
+        if self._pool is None:
+            self._pool = BrowserPool(size=self.fallback_pages).start()
+        return self._pool
+
+
+class AsyncNextDataClient:
+    """Async twin of NextDataClient for the crawler. No browser fallback here."""
+
+    def __init__(self, timeout: float = 20.0, max_connections: int = 20):
+        self.client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+
+    async def fetch_html(self, url: str) -> str:
+        """Raw page, for callers that parse the payload elsewhere (e.g. a process pool)."""
+        response = await self.client.get(url)
+        response.raise_for_status()
+        return response.text
+
+    async def fetch(self, url: str) -> Optional[dict]:
+        return extract_next_data(await self.fetch_html(url))
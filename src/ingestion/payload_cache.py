@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "data/payload_cache"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    kind TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (kind, entity_id, fetched_at)
+);
+CREATE INDEX IF NOT EXISTS idx_payloads_fetched ON payloads (fetched_at);
+CREATE INDEX IF NOT EXISTS idx_payloads_digest ON payloads (digest);
+"""
+
+
+class PayloadCache:
+    """
+    On-disk cache of raw __NEXT_DATA__ payloads.
+
+    Blobs are zlib-compressed and content-addressed (sha256 of the canonical
+    JSON), so re-fetching an unchanged page costs no extra disk. A small
+    SQLite index maps (kind, entity_id, fetched_at) -> digest.
+
+        cache = PayloadCache()
+        cache.put("player", 737066, next_data)
+        for entity_id, fetched_at, payload in cache.iter_latest("player"):
+            ...
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, level: int = 6):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.level = level
+        self.conn = sqlite3.connect(self.root / "index.sqlite", check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- Blobs ---
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}.json.z"
+
+    def _write_blob(self, raw: bytes) -> Tuple[str, int]:
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            data = zlib.compress(raw, self.level)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)  # Atomic: readers never see half a blob
+        return digest, path.stat().st_size
+
+    def load_blob(self, digest: str) -> dict:
+        return json.loads(zlib.decompress(self._blob_path(digest).read_bytes()))
+
+    # --- Public API ---
+
+    def put(self, kind: str, entity_id, next_data: dict, fetched_at: Optional[datetime] = None) -> str:
+        raw = json.dumps(next_data, sort_keys=True, separators=(",", ":")).encode()
+        digest, size = self._write_blob(raw)
+        fetched_at = (fetched_at or datetime.now()).isoformat()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO payloads VALUES (?, ?, ?, ?, ?)",
+            (kind, str(entity_id), fetched_at, digest, size),
+        )
+        self.conn.commit()
+        return digest
+
+    def latest(self, kind: str, entity_id) -> Optional[dict]:
+        row = self.conn.execute(
+            "SELECT digest FROM payloads WHERE kind = ? AND entity_id = ? "
+            "ORDER BY fetched_at DESC LIMIT 1",
+            (kind, str(entity_id)),
+        ).fetchone()
+        return self.load_blob(row[0]) if row else None
+
+    def latest_blob_paths(self, kind: Optional[str] = None) -> List[Path]:
+        """Blob files of the newest payload of each entity (of one kind, or all kinds)."""
+        query = "SELECT MAX(fetched_at), digest FROM payloads"
+        query += " WHERE kind = ? GROUP BY kind, entity_id" if kind else " GROUP BY kind, entity_id"
+        rows = self.conn.execute(query, (kind,) if kind else ()).fetchall()
+        return [self._blob_path(digest) for _, digest in rows]
+
+    def iter_latest(self, kind: str) -> Iterator[Tuple[str, str, dict]]:
+        """Yields (entity_id, fetched_at, next_data) for the newest payload of each entity."""
+        rows = self.conn.execute(
+            "SELECT entity_id, MAX(fetched_at), digest FROM payloads WHERE kind = ? GROUP BY entity_id",
+            (kind,),
+        ).fetchall()
+        for entity_id, fetched_at, digest in rows:
+            try:
+                yield entity_id, fetched_at, self.load_blob(digest)
+            except (OSError, zlib.error, ValueError) as e:
+                logger.warning(f"⚠️ Unreadable cached payload {kind}:{entity_id}: {e}")
+
+    # --- Eviction ---
+
+    def evict(self, max_age_days: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+        """
+        Drops index rows older than the TTL, then the oldest rows until the
+        blob store fits in max_bytes. Blobs no row points at are deleted.
+        """
+        removed = 0
+        if max_age_days is not None:
+            cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+            removed += self.conn.execute("DELETE FROM payloads WHERE fetched_at < ?", (cutoff,)).rowcount
+
+        if max_bytes is not None:
+            # Size of distinct blobs, oldest reference first
+            rows = self.conn.execute(
+                "SELECT kind, entity_id, fetched_at, digest, size FROM payloads ORDER BY fetched_at"
+            ).fetchall()
+            blob_sizes = {digest: size for *_, digest, size in rows}
+            refs = {}
+            for *_, digest, _ in rows:
+                refs[digest] = refs.get(digest, 0) + 1
+            total = sum(blob_sizes.values())
+            for kind, entity_id, fetched_at, digest, size in rows:
+                if total <= max_bytes:
+                    break
+                self.conn.execute(
+                    "DELETE FROM payloads WHERE kind = ? AND entity_id = ? AND fetched_at = ?",
+                    (kind, entity_id, fetched_at),
+                )
+                removed += 1
+                refs[digest] -= 1
+                if refs[digest] == 0:
+                    total -= size
+        self.conn.commit()
+
+        live = {row[0] for row in self.conn.execute("SELECT DISTINCT digest FROM payloads")}
+        deleted = 0
+        for path in self.blob_dir.glob("*/*.json.z"):
+            if path.name.split(".")[0] not in live:
+                path.unlink(missing_ok=True)
+                deleted += 1
+        logger.info(f"🧹 Evicted {removed} index row(s) and {deleted} blob(s)")
+        return removed
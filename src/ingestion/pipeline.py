@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+
+import httpx
+from pydantic import ValidationError
+
+from src.database.db import SessionLocal
+from src.database.schemas import PlayerScraperInput
+from src.database.upserts import DEFAULT_BATCH_SIZE
+from src.ingestion.crawler import ENTITY_URLS, TokenBucket, backoff_delay, is_retryable
+from src.ingestion.extractors import extract_player_fields
+from src.ingestion.next_data import AsyncNextDataClient, extract_next_data
+from src.ingestion.scheduler import (
+    last_match_date, payload_digest, save_players_with_crawl_state, unchanged_ids,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 256        # Per queue; bounds memory whatever the crawl size
+DEFAULT_FLUSH_INTERVAL = 5.0    # Seconds a partial batch may wait before it's written
+
+_STOP = object()
+
+
+def parse_page(kind: str, html: str, extract: Callable[[dict], Optional[dict]]):
+    """
+    CPU-bound half of ingestion, run in a worker process: JSON decode,
+    digest and field extraction. Only the small results cross back, never
+    the full payload. None when the page has no embedded __NEXT_DATA__.
+    """
+    next_data = extract_next_data(html)
+    if not next_data:
+        return None
+    match_date = last_match_date(next_data) if kind == "player" else None
+    return payload_digest(kind, next_data), match_date, extract(next_data)
+
+
+def validate_player(fields: dict) -> Optional[PlayerScraperInput]:
+    try:
+        return PlayerScraperInput(**fields)
+    except ValidationError as e:
+        logger.error(f"❌ Invalid player payload: {e}")
+        return None
+
+
+def write_players(batch: List[tuple], kind: str = "player", skip_unchanged: bool = True) -> int:
+    """
+    Writer stage: (entity_id, digest, last match date, PlayerScraperInput
+    or None) rows -> one upsert plus crawl state per batch, on a
+    short-lived session. Crawl state is only stored for players written or
+    unchanged since the last crawl; the rest are fetched again next time.
+    """
+    db = SessionLocal()
+    try:
+        digests = {entity_id: digest for entity_id, digest, _, _ in batch}
+        unchanged = unchanged_ids(db, kind, digests) if skip_unchanged else set()
+        return len(save_players_with_crawl_state(db, batch, unchanged, kind))
+    finally:
+        db.close()
+
+
+class IngestionPipeline:
+    """
+    fetch -> parse -> validate -> write, each stage with its own workers,
+    joined by bounded asyncio queues.
+
+        pipeline = IngestionPipeline(fetch_workers=16, rate=5)
+        asyncio.run(pipeline.run(player_ids))
+
+    - fetch: async httpx behind the crawler's token bucket (I/O bound).
+    - parse: `extract` in a process pool, fed the raw HTML (CPU bound).
+      It must be a picklable top-level function returning a dict or None.
+    - validate: `validate` on the event loop (cheap).
+    - write: `write` in a thread, batch_size rows or every flush_interval
+      seconds, whichever comes first.
+
+    A full queue blocks its producer, so a slow stage throttles the ones
+    before it instead of piling payloads up in memory. Pages without an
+    embedded payload are counted as missing; crawl those in browser mode.
+    """
+
+    def __init__(
+        self,
+        extract: Callable[[dict], Optional[dict]] = extract_player_fields,
+        validate: Callable[[dict], Any] = validate_player,
+        write: Callable[[List[tuple]], int] = write_players,
+        kind: str = "player",
+        fetch_workers: int = 8,
+        parse_workers: Optional[int] = None,
+        validate_workers: int = 1,
+        rate: float = 2.0,
+        burst: Optional[float] = None,
+        max_retries: int = 3,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self.extract = extract
+        self.validate = validate
+        self.write = write
+        self.kind = kind
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.validate_workers = validate_workers
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"fetched": 0, "failed": 0, "missing": 0, "unextracted": 0,
+                      "invalid": 0, "batches": 0, "written": 0}
+
+    async def run(self, entity_ids: Iterable[Any]) -> dict:
+        fetch_q = asyncio.Queue(self.queue_size)
+        parse_q = asyncio.Queue(self.queue_size)
+        validate_q = asyncio.Queue(self.queue_size)
+        write_q = asyncio.Queue(self.queue_size)
+        started = time.monotonic()
+
+        parse_workers = self.parse_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=parse_workers) as processes:
+            async with AsyncNextDataClient(max_connections=self.fetch_workers) as http:
+                stages = [
+                    ([self._feed(entity_ids, fetch_q)], fetch_q, self.fetch_workers),
+                    ([self._fetch(http, fetch_q, parse_q) for _ in range(self.fetch_workers)],
+                     parse_q, parse_workers),
+                    ([self._parse(processes, parse_q, validate_q) for _ in range(parse_workers)],
+                     validate_q, self.validate_workers),
+                    ([self._validate(validate_q, write_q) for _ in range(self.validate_workers)],
+                     write_q, 1),
+                ]
+                tasks = [asyncio.create_task(self._write(write_q))]
+                for workers, downstream, consumers in stages:
+                    tasks.append(asyncio.create_task(self._stage(workers, downstream, consumers)))
+                try:
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    for task in tasks:
+                        task.cancel()
+                    raise
+
+        elapsed = time.monotonic() - started
+        logger.info(f"🏁 Pipeline finished in {elapsed:.1f}s "
+                    f"({self.stats['fetched'] / max(elapsed, 1e-9):.1f} pages/sec) | {self.stats}")
+        return self.stats
+
+    @staticmethod
+    async def _stage(workers, downstream: asyncio.Queue, consumers: int):
+        """Runs one stage's workers, then tells each downstream worker to stop."""
+        await asyncio.gather(*workers)
+        for _ in range(consumers):
+            await downstream.put(_STOP)
+
+    async def _feed(self, entity_ids, fetch_q: asyncio.Queue):
+        for entity_id in entity_ids:
+            await fetch_q.put(entity_id)
+
+    async def _fetch(self, http: AsyncNextDataClient, fetch_q: asyncio.Queue, parse_q: asyncio.Queue):
+        while (entity_id := await fetch_q.get()) is not _STOP:
+            url = ENTITY_URLS[self.kind].format(id=entity_id)
+            html = None
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    await asyncio.sleep(backoff_delay(attempt))
+                await self.bucket.acquire()
+                try:
+                    html = await http.fetch_html(url)
+                    break
+                except httpx.HTTPError as e:
+                    logger.warning(f"⚠️ {self.kind} {entity_id} attempt {attempt + 1} failed: {e}")
+                    if not is_retryable(e):
+                        break
+            if html is None:
+                self.stats["failed"] += 1
+                logger.error(f"❌ Giving up on {self.kind} {entity_id}")
+                continue
+            self.stats["fetched"] += 1
+            await parse_q.put((entity_id, html))
+
+    async def _parse(self, processes: ProcessPoolExecutor, parse_q: asyncio.Queue, validate_q: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while (item := await parse_q.get()) is not _STOP:
+            entity_id, html = item
+            try:
+                parsed = await loop.run_in_executor(processes, parse_page, self.kind, html, self.extract)
+            except Exception as e:
+                logger.error(f"❌ Parsing {self.kind} {entity_id} failed: {e}")
+                self.stats["unextracted"] += 1
+                continue
+            if parsed is None:
+                self.stats["missing"] += 1
+                continue
+            await validate_q.put((entity_id, *parsed))
+
+    async def _validate(self, validate_q: asyncio.Queue, write_q: asyncio.Queue):
+        while (item := await validate_q.get()) is not _STOP:
+            entity_id, digest, match_date, fields = item
+            record = self.validate(fields) if fields else None
+            if fields is None:
+                self.stats["unextracted"] += 1
+            elif record is None:
+                self.stats["invalid"] += 1
+            # Passed on without a record too: if unchanged, its crawl state still gets bumped
+            await write_q.put((entity_id, digest, match_date, record))
+
+    async def _write(self, write_q: asyncio.Queue):
+        batch: List[tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+        done = False
+        while not done:
+            try:
+                item = await asyncio.wait_for(write_q.get(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                item = None
+            if item is _STOP:
+                done = True
+            elif item is not None:
+                batch.append(item)
+            if batch and (done or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                # Sync DB work off the loop; fetching keeps going meanwhile
+                try:
+                    self.stats["written"] += await asyncio.to_thread(self.write, batch)
+                except Exception as e:
+                    logger.error(f"❌ Write batch of {len(batch)} failed: {e}")
+                self.stats["batches"] += 1
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
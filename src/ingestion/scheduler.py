@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.database.models import CrawlState, Player, TeamMatchResult
+from src.database.upserts import upsert_players
+from src.ingestion.extractors import Path, parse_date, player_profile
+
+logger = logging.getLogger(__name__)
+
+# Profile fields whose change is worth a DB write. Page chrome, SEO blocks
+# and "trending" widgets change on every fetch and are left out of the hash.
+PLAYER_HASH_FIELDS = (
+    "id", "name", "birthDate", "contractEnd", "playerInformation", "primaryTeam",
+    "positionDescription", "recentMatches", "mainLeague", "careerHistory",
+    "injuryInformation",
+)
+# The only part of the SEO "meta" block the extractors read
+META_NATIONALITY = Path("meta.personJSONLD.nationality").getter()
+
+# Refresh policy
+STALE_AFTER = timedelta(days=7)         # Everyone is refetched at least weekly
+ACTIVE_REFRESH = timedelta(days=1)      # Played within ACTIVE_DAYS
+CONTRACT_REFRESH = timedelta(days=2)    # Contract ends within CONTRACT_WINDOW_DAYS
+ACTIVE_DAYS = 14
+CONTRACT_WINDOW_DAYS = 180
+
+# Lower runs first
+PRIORITY_NEW = 0
+PRIORITY_JUST_PLAYED = 1
+PRIORITY_CONTRACT = 2
+PRIORITY_ACTIVE = 3
+PRIORITY_STALE = 4
+
+
+def _relevant(kind: str, next_data: dict):
+    if kind == "player":
+        profile = player_profile(next_data) or {}
+        relevant = {field: profile.get(field) for field in PLAYER_HASH_FIELDS}
+        relevant["nationality"] = META_NATIONALITY(profile, None)
+        return relevant
+    return (next_data.get("props") or {}).get("pageProps")
+
+
+def payload_digest(kind: str, next_data: dict) -> str:
+    """sha256 of the canonical JSON of the part of the payload we store."""
+    raw = json.dumps(_relevant(kind, next_data), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def last_match_date(next_data: dict) -> Optional[date]:
+    """Newest match date in a player's recentMatches (a list, or lists keyed by tournament)."""
+    recent = (player_profile(next_data) or {}).get("recentMatches") or []
+    if isinstance(recent, dict):
+        recent = [match for matches in recent.values() if isinstance(matches, list) for match in matches]
+    days = [parse_date(match.get("matchDate")) for match in recent if isinstance(match, dict)]
+    return max((day for day in days if day), default=None)
+
+
+def unchanged_ids(db: Session, kind: str, digests: Dict[int, str]) -> Set[int]:
+    """IDs whose payload digest matches the stored crawl state. One SELECT, no writes."""
+    if not digests:
+        return set()
+    known = db.execute(
+        select(CrawlState.entity_id, CrawlState.payload_hash)
+        .where(CrawlState.kind == kind, CrawlState.entity_id.in_(list(digests)))
+    ).all()
+    return {entity_id for entity_id, digest in known if digests.get(entity_id) == digest}
+
+
+def store_crawl_state(db: Session, kind: str, fetched: List[Tuple[int, str, Optional[date]]]):
+    """
+    Upserts (entity_id, payload digest, last match date) for a batch of
+    fetches. A stored digest means "the DB already holds this payload", so
+    only call it for payloads that were written (or were unchanged), in the
+    same transaction as the write. Caller commits.
+    """
+    latest = {int(entity_id): (digest, match_date) for entity_id, digest, match_date in fetched
+              if entity_id is not None}  # Last fetch of a duplicate wins
+    if not latest:
+        return
+    now = datetime.now()
+    stmt = insert(CrawlState).values([
+        {"kind": kind, "entity_id": entity_id, "payload_hash": digest,
+         "last_fetched_at": now, "last_changed_at": now, "last_match_date": match_date}
+        for entity_id, (digest, match_date) in latest.items()
+    ])
+    excluded = stmt.excluded
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[CrawlState.kind, CrawlState.entity_id],
+        set_={
+            "payload_hash": excluded.payload_hash,
+            "last_fetched_at": excluded.last_fetched_at,
+            "last_changed_at": case(
+                (CrawlState.payload_hash.is_distinct_from(excluded.payload_hash), excluded.last_changed_at),
+                else_=CrawlState.last_changed_at,
+            ),
+            "last_match_date": func.coalesce(excluded.last_match_date, CrawlState.last_match_date),
+        },
+    ))
+
+
+def save_players_with_crawl_state(db: Session, batch: List[tuple], unchanged: Set[int],
+                                  kind: str = "player") -> List[int]:
+    """
+    Writes one batch of (fotmob_id, digest, last match date, PlayerScraperInput
+    or None) rows in ONE transaction: upserts the players not in `unchanged`,
+    then stores crawl state for the ones written plus the unchanged ones.
+    Players that didn't extract, were skipped by the upsert or lost to a
+    failed write get no crawl state, so the next crawl fetches them again.
+    Returns the FotMob IDs written.
+    """
+    players = [player for entity_id, _, _, player in batch if player and entity_id not in unchanged]
+    try:
+        written = upsert_players(db, players, batch_size=max(len(players), 1), commit=False)
+    except Exception as e:
+        logger.error(f"❌ Player batch of {len(players)} failed: {e}")
+        db.rollback()
+        written = []
+    stored = unchanged.union(written)
+    store_crawl_state(db, kind, [(entity_id, digest, day) for entity_id, digest, day, _ in batch
+                                 if entity_id in stored])
+    db.commit()
+    return written
+
+
+def due_players(db: Session, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[int]:
+    """
+    FotMob IDs of players worth refetching, most urgent first:
+    never fetched, their team played since our last fetch, contract ending
+    soon, recently active, then anyone older than STALE_AFTER. Players
+    that fit none of these are not due and cost nothing today.
+    """
+    now = now or datetime.now()
+    today = now.date()
+
+    # Latest result per team; the date bound keeps partition pruning on
+    played = (
+        select(TeamMatchResult.team_id, func.max(TeamMatchResult.date).label("played_on"))
+        .where(TeamMatchResult.date >= today - timedelta(days=ACTIVE_DAYS))
+        .group_by(TeamMatchResult.team_id)
+        .subquery()
+    )
+    fetched_at = CrawlState.last_fetched_at
+    priority = case(
+        (fetched_at.is_(None), PRIORITY_NEW),
+        (played.c.played_on > func.date(fetched_at), PRIORITY_JUST_PLAYED),
+        (and_(Player.contract_expiry.between(today, today + timedelta(days=CONTRACT_WINDOW_DAYS)),
+              fetched_at < now - CONTRACT_REFRESH), PRIORITY_CONTRACT),
+        (and_(CrawlState.last_match_date >= today - timedelta(days=ACTIVE_DAYS),
+              fetched_at < now - ACTIVE_REFRESH), PRIORITY_ACTIVE),
+        (fetched_at < now - STALE_AFTER, PRIORITY_STALE),
+    )
+
+    query = (
+        select(Player.fotmob_id)
+        .outerjoin(CrawlState, and_(CrawlState.kind == "player", CrawlState.entity_id == Player.fotmob_id))
+        .outerjoin(played, played.c.team_id == Player.current_team_id)
+        .where(Player.fotmob_id.is_not(None))
+        .where(priority.is_not(None))
+        .order_by(priority, fetched_at.asc().nulls_first())
+    )
+    if limit:
+        query = query.limit(limit)
+    ids = db.execute(query).scalars().all()
+    logger.info(f"🗓️ {len(ids)} player(s) due for a refresh")
+    return ids
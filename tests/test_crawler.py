@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.ingestion import crawler
+from src.ingestion.crawler import FotMobCrawler, ProgressJournal
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://www.fotmob.com/players/1")
+    return httpx.HTTPStatusError(f"{status}", request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.fixture
+def fotmob(monkeypatch):
+    monkeypatch.setattr(crawler, "backoff_delay", lambda attempt: 0)
+    fotmob = FotMobCrawler(rate=1000, max_retries=3)
+    fotmob.calls = 0
+
+    def serve(*outcomes):
+        async def fetch_next_data(kind, entity_id):
+            outcome = outcomes[min(fotmob.calls, len(outcomes) - 1)]
+            fotmob.calls += 1
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        fotmob.fetch_next_data = fetch_next_data
+    fotmob.serve = serve
+    return fotmob
+
+
+def process(fotmob, handler, journal=None):
+    asyncio.run(fotmob._process(1, handler, "player", journal))
+
+
+@pytest.mark.parametrize("status", [404, 410, 403])
+def test_client_errors_are_not_retried(fotmob, status, tmp_path):
+    fotmob.serve(status_error(status))
+    journal = ProgressJournal(tmp_path / "crawl.jsonl")
+    process(fotmob, lambda *_: None, journal)
+    journal.close()
+
+    assert fotmob.calls == 1
+    assert fotmob.stats == {"ok": 0, "failed": 1, "skipped": 0}
+    assert '"status": "failed"' in (tmp_path / "crawl.jsonl").read_text()
+
+
+@pytest.mark.parametrize("error", [status_error(503), status_error(429), httpx.ConnectTimeout("slow")])
+def test_transient_errors_are_retried(fotmob, error):
+    handled = []
+    fotmob.serve(error, error, {"props": {}})
+    process(fotmob, lambda entity_id, data: handled.append(entity_id))
+
+    assert fotmob.calls == 3
+    assert handled == [1]
+    assert fotmob.stats["ok"] == 1
+
+
+def test_gives_up_after_max_retries(fotmob):
+    fotmob.serve(status_error(502))
+    process(fotmob, lambda *_: None)
+    assert fotmob.calls == fotmob.max_retries + 1
+    assert fotmob.stats["failed"] == 1
+
+
+def test_handler_errors_do_not_refetch(fotmob, tmp_path):
+    def handler(entity_id, data):
+        raise KeyError("bug in the handler")
+
+    fotmob.serve({"props": {}})
+    journal = ProgressJournal(tmp_path / "crawl.jsonl")
+    process(fotmob, handler, journal)
+    journal.close()
+
+    assert fotmob.calls == 1
+    assert fotmob.stats == {"ok": 0, "failed": 1, "skipped": 0}
+    reopened = ProgressJournal(tmp_path / "crawl.jsonl")
+    assert not reopened.is_done("player", 1)
+    reopened.close()
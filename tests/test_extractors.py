@@ -0,0 +1,163 @@
+from datetime import date
+
+import pytest
+
+from src.database.models import PositionGroup
+from src.ingestion.extractors import (
+    HISTORY_SPEC, Each, Info, Path, compile_spec, extract_player_fields, extract_player_record,
+    parse_height, parse_market_value,
+)
+
+
+def make_page(profile: dict) -> dict:
+    """__NEXT_DATA__ wrapping a player profile the way FotMob pages do."""
+    return {"props": {"pageProps": {"fallback": {"player:123": profile, "translations": {"en": {}}}}}}
+
+
+@pytest.fixture
+def profile():
+    return {
+        "id": 123,
+        "name": "Jamie Example",
+        "birthDate": {"utcTime": "2004-03-15T00:00:00.000Z"},
+        "contractEnd": {"utcTime": "2028-06-30T00:00:00.000Z"},
+        "primaryTeam": {"teamName": "Brentford", "teamId": 9937},
+        "positionDescription": {"primaryPosition": {"label": "Right Winger"}},
+        "meta": {"personJSONLD": {"nationality": {"name": "Denmark"}}},
+        "playerInformation": [
+            {"translationKey": "height_sentencecase", "title": "Height",
+             "value": {"numberValue": 181, "fallback": "181 cm"}},
+            {"translationKey": "preferred_foot", "title": "Preferred foot",
+             "value": {"key": "left", "fallback": "Left"}},
+            {"translationKey": "transfer_value", "title": "Market value",
+             "value": {"numberValue": 24500000, "fallback": "€24.5M"}},
+        ],
+        "transfers": [
+            {"transferDate": {"utcTime": "2023-07-01T00:00:00.000Z"}, "fromClub": "FC Nordsjælland",
+             "fromClubId": 10202, "toClub": "Brentford", "toClubId": 9937,
+             "fee": {"feeText": "€8.5M"}},
+            "not a transfer",
+        ],
+        "careerHistory": {"careerItems": {"senior": {"seasonEntries": [
+            {"seasonName": "2023/2024", "team": "Brentford", "teamId": 9937,
+             "appearances": 30, "goals": 6, "assists": 4, "rating": {"rating": "7.12"}},
+            {"seasonName": "2022/2023", "team": "FC Nordsjælland", "teamId": "10202",
+             "appearances": "28", "goals": 9, "assists": None, "rating": 7.4},
+        ]}}},
+    }
+
+
+def test_profile_fields(profile):
+    record = extract_player_record(make_page(profile))
+
+    assert record["name"] == "Jamie Example"
+    assert record["fotmob_id"] == 123
+    assert record["birth_date"] == date(2004, 3, 15)
+    assert record["contract_expiry"] == date(2028, 6, 30)
+    assert record["current_team_name"] == "Brentford"
+    assert record["nationality_name"] == "Denmark"
+    assert record["position_label"] == "Right Winger"
+    assert record["image_url"].endswith("/123.png")
+    assert "transfers" not in record
+
+
+def test_info_labels(profile):
+    record = extract_player_record(make_page(profile))
+    assert (record["height_cm"], record["preferred_foot"], record["current_market_value"]) == (181, "left", 24500000)
+
+    # Older pages: no translationKey, plain string values, title text in another case
+    profile["playerInformation"] = [
+        {"title": "HEIGHT", "value": "178 cm"},
+        {"title": {"key": "preferred foot", "default": "Preferred foot"}, "value": "Right"},
+        {"title": "Transfer value", "value": "€850K"},
+        {"title": "Country", "value": {"fallback": "Ghana"}},
+    ]
+    del profile["meta"]
+    record = extract_player_record(make_page(profile))
+    assert record["height_cm"] == 178
+    assert record["preferred_foot"] == "right"
+    assert record["current_market_value"] == 850_000
+    assert record["nationality_name"] == "Ghana"
+
+
+def test_info_first_entry_wins_and_missing_is_none(profile):
+    profile["playerInformation"].insert(0, {"translationKey": "height_sentencecase", "value": "190 cm"})
+    profile["playerInformation"].append(None)
+    record = extract_player_record(make_page(profile))
+    assert record["height_cm"] == 190
+
+    profile["playerInformation"] = "unexpected"
+    record = extract_player_record(make_page(profile))
+    assert record["height_cm"] is None and record["current_market_value"] is None
+
+
+@pytest.mark.parametrize("value, expected", [
+    ({"numberValue": 180000000}, 180_000_000),
+    ({"numberValue": None, "fallback": "€1.2B"}, 1_200_000_000),
+    ("€180M", 180_000_000),
+    ("£850K", 850_000),
+    ("$ 2.5m", 2_500_000),
+    (1500000, 1_500_000),
+    ("Free", None),
+    ("", None),
+    (None, None),
+])
+def test_market_value_formats(value, expected):
+    assert parse_market_value(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ({"numberValue": 195}, 195),
+    ({"fallback": "195 cm"}, 195),
+    ("172 cm", 172),
+    (168.0, 168),
+    ("unknown", None),
+    ([], None),
+])
+def test_height_formats(value, expected):
+    assert parse_height(value) == expected
+
+
+def test_each_lists(profile):
+    record = extract_player_record(make_page(profile), history=True)
+
+    assert record["transfers"] == [{
+        "date": date(2023, 7, 1), "from_team_name": "FC Nordsjælland", "from_team_fotmob_id": 10202,
+        "to_team_name": "Brentford", "to_team_fotmob_id": 9937, "fee_amount": 8_500_000,
+    }]
+    assert record["season_entries"] == [
+        {"season_id": "2023-2024", "team_name": "Brentford", "team_fotmob_id": 9937,
+         "appearances": 30, "goals": 6, "assists": 4, "rating": 7.12},
+        {"season_id": "2022-2023", "team_name": "FC Nordsjælland", "team_fotmob_id": 10202,
+         "appearances": 28, "goals": 9, "assists": None, "rating": 7.4},
+    ]
+
+    del profile["careerHistory"]["careerItems"]
+    profile["transfers"] = {"not": "a list"}
+    record = extract_player_record(make_page(profile), history=True)
+    assert record["transfers"] is None and record["season_entries"] is None
+
+
+def test_sources_fall_back_in_order_and_bad_values_are_skipped():
+    extract = compile_spec({
+        "rating": ([Path("rating.rating"), Path("rating"), Info("rating")], float),
+        "nested": ([Each("items", {"n": ([Path("n")], int)})], None),
+    })
+    assert extract({"rating": {"rating": "n/a"}, "playerInformation": [{"title": "Rating", "value": "6.9"}]}) == {
+        "rating": 6.9, "nested": None,
+    }
+    assert extract({"rating": "7.0", "items": [{"n": "1"}, {"n": "x"}, 3]}) == {
+        "rating": 7.0, "nested": [{"n": 1}, {"n": None}],
+    }
+    assert compile_spec(HISTORY_SPEC, info_list=None)({}) == {"transfers": None, "season_entries": None}
+
+
+def test_player_fields_for_the_scraper_input(profile):
+    fields = extract_player_fields(make_page(profile))
+    assert fields["position_group"] == PositionGroup.WINGER_AM.value
+    assert fields["specific_positions"] == ["Right Winger"]
+    assert fields["current_market_value"] == 24500000
+
+    profile["positionDescription"]["primaryPosition"]["label"] = "Sweeper"
+    assert extract_player_fields(make_page(profile))["position_group"] is None
+    assert extract_player_fields({"props": {"pageProps": {"fallback": {}}}}) is None
@@ -0,0 +1,98 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.analytics import feature_store
+from src.analytics.feature_store import COLUMNS, FEATURE_STORE_JOB, FeatureStore
+
+DAY_1, DAY_2, DAY_3 = date(2025, 3, 1), date(2025, 3, 2), date(2025, 3, 3)
+
+
+class FakeDB:
+    """
+    Stands in for the tables the store reads: extract() rows per player and
+    the dirty_players change log with its per-job watermarks.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.rows = {}
+        self.changes = []        # (change_seq, player_id)
+        self.watermarks = {}
+        self.extracted = []
+
+    def write(self, player_ids):
+        for pid in player_ids:
+            row = self.rng.normal(size=len(COLUMNS))
+            row[self.rng.random(len(COLUMNS)) < 0.1] = np.nan
+            self.rows[int(pid)] = row
+            self.changes.append((len(self.changes) + 1, int(pid)))
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB(np.random.default_rng(3))
+
+    def extract(_, player_ids=None):
+        ids = sorted(fake.rows if player_ids is None else set(player_ids) & fake.rows.keys())
+        fake.extracted.append(None if player_ids is None else len(ids))
+        matrix = np.array([fake.rows[pid] for pid in ids]).reshape(len(ids), len(COLUMNS))
+        return np.array(ids, dtype=np.int64), matrix
+
+    def latest_change(_):
+        return max((seq for seq, _ in fake.changes), default=None)
+
+    def dirty_player_ids(_, job_name):
+        mark = fake.watermarks.get(job_name, 0)
+        new = [(seq, pid) for seq, pid in fake.changes if seq > mark]
+        if not new:
+            return [], None
+        return sorted({pid for _, pid in new}), max(seq for seq, _ in new)
+
+    def advance_watermark(_, job_name, watermark):
+        fake.watermarks[job_name] = max(fake.watermarks.get(job_name, 0), watermark)
+
+    monkeypatch.setattr(feature_store, "extract", extract)
+    monkeypatch.setattr(feature_store, "latest_change", latest_change)
+    monkeypatch.setattr(feature_store, "dirty_player_ids", dirty_player_ids)
+    monkeypatch.setattr(feature_store, "advance_watermark", advance_watermark)
+    return fake
+
+
+def assert_snapshots_equal(got, expected):
+    np.testing.assert_array_equal(got.ids, expected.ids)
+    np.testing.assert_array_equal(got.matrix, expected.matrix)
+    assert got.columns == expected.columns
+
+
+def test_incremental_refresh_matches_a_full_rebuild(db, tmp_path):
+    store = FeatureStore(tmp_path / "incremental")
+    db.write(range(1, 501))
+    store.refresh(db, snapshot_date=DAY_1)
+
+    db.write(db.rng.choice(range(1, 501), 60, replace=False))    # Changed players
+    db.write(range(1001, 1031))                                 # New players
+    db.write([7, 7, 8])                                         # Changed twice
+    incremental = store.refresh(db, snapshot_date=DAY_2)
+    full = FeatureStore(tmp_path / "full").refresh(db, full=True, snapshot_date=DAY_2)
+
+    assert db.extracted[1] == len({pid for seq, pid in db.changes if seq > 500})
+    assert_snapshots_equal(incremental, full)
+    assert incremental.meta["watermark"] == len(db.changes) == db.watermarks[FEATURE_STORE_JOB]
+    assert store.open(as_of=DAY_1).ids.tolist() == list(range(1, 501))   # Older snapshot untouched
+
+
+def test_refresh_without_changes_carries_the_snapshot_forward(db, tmp_path):
+    store = FeatureStore(tmp_path)
+    db.write(range(1, 51))
+    first = store.refresh(db, snapshot_date=DAY_1)
+    second = store.refresh(db, snapshot_date=DAY_3)
+
+    assert db.extracted == [None]
+    assert_snapshots_equal(second, first)
+    assert second.meta["watermark"] is None
+    assert store.snapshot_dates() == [DAY_1, DAY_3]
@@ -0,0 +1,86 @@
+import json
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from src.analytics.form import WINDOW_FIELDS, _frame, advance_state, compute_full_states, summarize
+
+
+def make_rows(player_ids, rng, start=date(2024, 8, 1), matches=(1, 30)):
+    """_snapshot_query()-shaped rows: some players with few matches, gaps in ratings and stats."""
+    rows = []
+    for pid in player_ids:
+        day = start + timedelta(days=int(rng.integers(0, 20)))
+        for _ in range(rng.integers(*matches)):
+            rows.append((
+                pid, day, rng.choice([None, 0, 12, 45, 90, 90]),
+                rng.choice([None, 6.1, 6.8, 7.3, 8.4]),
+                rng.choice([None, 0.0, 1.0, 2.0]), rng.choice([None, 0.0, 1.0]),
+                rng.choice([None, 0.05, 0.3, 0.9]),
+            ))
+            day += timedelta(days=int(rng.integers(3, 10)))
+    return rows
+
+
+def stored(state: dict) -> dict:
+    """What comes back out of player_form.state (JSONB)."""
+    return json.loads(json.dumps(state))
+
+
+def assert_rows_equal(got: dict, expected: dict):
+    """player_form rows, minus the state column (compared by assert_states_equal)."""
+    assert got.keys() == expected.keys()
+    for key, value in expected.items():
+        if key == "state":
+            continue
+        if isinstance(value, float):
+            assert got[key] == pytest.approx(value, rel=1e-9), key
+        else:
+            assert got[key] == value, key
+
+
+def assert_states_equal(got: dict, expected: dict):
+    assert got["first_match_date"] == expected["first_match_date"]
+    assert got["matches_played"] == expected["matches_played"]
+    assert len(got["window"]) == len(expected["window"])
+    for got_entry, expected_entry in zip(got["window"], expected["window"]):
+        assert got_entry[0] == expected_entry[0]
+        assert got_entry[1:] == pytest.approx(expected_entry[1:], rel=1e-12, nan_ok=True)
+    for name, value in expected["ewm"].items():
+        if value is None:
+            assert got["ewm"][name] is None, name
+        else:
+            assert got["ewm"][name] == pytest.approx(value, rel=1e-9), name
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(7)
+
+
+def test_incremental_states_match_a_full_recompute(rng):
+    rows = make_rows(range(1, 201), rng)
+    cutoff = date(2024, 11, 1)
+    before = [row for row in rows if row[1] < cutoff]
+    after = [row for row in rows if row[1] >= cutoff]
+    debutants = make_rows(range(1001, 1021), rng, start=cutoff + timedelta(days=5), matches=(1, 8))
+
+    states = {pid: stored(state) for pid, state in compute_full_states(_frame(before)).items()}
+    new = _frame(after + debutants)
+    for pid, matches in new.groupby("player_id", sort=False):
+        states[int(pid)] = advance_state(states.get(int(pid)),
+                                         list(matches[WINDOW_FIELDS].itertuples(index=False, name=None)))
+
+    expected = compute_full_states(_frame(rows + debutants))
+    assert states.keys() == expected.keys()
+    for pid, state in expected.items():
+        assert_states_equal(states[pid], state)
+        assert_rows_equal(summarize(pid, states[pid]), summarize(pid, state))
+
+
+def test_state_survives_the_jsonb_round_trip(rng):
+    frame = _frame(make_rows(range(1, 21), rng))
+    for pid, state in compute_full_states(frame).items():
+        assert stored(state) == state
+        assert summarize(pid, stored(state))["momentum"] == summarize(pid, state)["momentum"]
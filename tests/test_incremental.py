@@ -0,0 +1,98 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.gem_score import (
+    DETAILED_PER90_KEYS, METRICS, MIN_MINUTES, PER90_COLUMNS, blend_scores, compute_gem_scores, metric_frame,
+)
+from src.analytics.incremental import PercentileIndex
+from src.database.models import PositionGroup
+
+TODAY = date(2025, 1, 1)
+
+
+def make_players(ids, rng) -> pd.DataFrame:
+    """aggregate_players()-shaped rows with random stats, ties and gaps."""
+    n = len(ids)
+    players = pd.DataFrame(index=pd.Index(ids, name="player_id"))
+    players["minutes"] = rng.integers(200, 3000, n).astype(float)
+    for col in [*PER90_COLUMNS, *DETAILED_PER90_KEYS]:
+        players[col] = rng.integers(0, 40, n).astype(float)  # Integers: plenty of equal values
+    players.loc[players.sample(frac=0.2, random_state=1).index, "saves"] = np.nan
+    players["rating"] = rng.choice([6.5, 7.0, 7.5, np.nan], n)
+    players["strength"] = rng.uniform(0.5, 1.5, n)
+    # By index: rng.choice(list(PositionGroup)) turns the str enums into '<U11' strings
+    groups = list(PositionGroup)
+    players["position_group"] = [groups[i] for i in rng.integers(0, len(groups), n)]
+    players["birth_date"] = pd.to_datetime("1995-01-01") + pd.to_timedelta(rng.integers(0, 3650, n), unit="D")
+    return players
+
+
+def full_scores(players: pd.DataFrame):
+    """What rescore_full computes: index over everyone, everyone ranked against it."""
+    eligible = metric_frame(players)
+    index = PercentileIndex()
+    index.upsert(eligible)
+    return index, blend_scores(eligible, index.percentiles(eligible), TODAY)
+
+
+def incremental_scores(index: PercentileIndex, players: pd.DataFrame, dirty):
+    """What rescore_dirty computes for the dirty players."""
+    eligible = metric_frame(players.loc[players.index.intersection(dirty)])
+    index.remove(set(dirty) - set(eligible.index))
+    index.upsert(eligible)
+    return blend_scores(eligible, index.percentiles(eligible), TODAY)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(12)
+
+
+def test_dirty_players_score_like_a_full_run(rng):
+    before = make_players(range(1, 2001), rng)
+    index, _ = full_scores(before)
+
+    after = before.copy()
+    changed = rng.choice(after.index, 300, replace=False)
+    after.loc[changed] = make_players(changed, rng)
+    after.loc[changed[:40], "minutes"] = MIN_MINUTES - 1       # Drop out of the distribution
+    new = make_players(range(5001, 5101), rng)                # Debutants
+    after = pd.concat([after, new])
+    dirty = [*changed, *new.index]
+
+    expected_index, expected = full_scores(after)
+    got = incremental_scores(index, after, dirty)
+
+    assert len(got) > 200
+    assert got.index.isin(after.index[after["minutes"] >= MIN_MINUTES]).all()
+    assert after.loc[got.index, "position_group"].nunique() == len(PositionGroup)
+
+    pd.testing.assert_series_equal(got.sort_index(), expected.loc[got.index].sort_index())
+    assert set(got.index) == set(expected.index) & set(dirty)
+    assert index.players.keys() == expected_index.players.keys()
+    for key, values in expected_index.sorted.items():
+        np.testing.assert_array_equal(index.sorted[key], values)
+
+
+def test_index_roundtrips_through_disk(rng, tmp_path):
+    index, _ = full_scores(make_players(range(1, 301), rng))
+    index.save(tmp_path / "index.npz")
+    loaded = PercentileIndex.load(tmp_path / "index.npz")
+
+    assert loaded.metrics == METRICS
+    assert loaded.sorted.keys() == index.sorted.keys()
+    for key, values in index.sorted.items():
+        np.testing.assert_array_equal(loaded.sorted[key], values)
+
+
+def test_one_shot_scoring_matches_the_index(rng):
+    """compute_gem_scores and the PercentileIndex rank ties the same way."""
+    players = make_players(range(1, 2001), rng)
+    _, expected = full_scores(players)
+    got = compute_gem_scores(players, TODAY)
+
+    assert len(expected) > 1000
+    pd.testing.assert_series_equal(got.sort_index(), expected.sort_index())
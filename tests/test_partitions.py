@@ -0,0 +1,99 @@
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from src.database import partitions
+from src.database.partitions import ensure_default_partition, ensure_partitions, existing_partitions
+
+# Needs a throwaway Postgres, e.g. TEST_DATABASE_URL=postgresql://postgres@localhost:5432/postgres
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TABLE = "test_partitioned_snapshots"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    try:
+        engine.connect().close()
+    except OperationalError as e:
+        pytest.skip(f"Test database unreachable: {e}")
+
+    monkeypatch.setitem(partitions.PARTITIONED_TABLES, TABLE, "month")
+    with Session(engine) as session:
+        session.execute(text(f"DROP TABLE IF EXISTS {TABLE} CASCADE"))
+        # Shaped like match_snapshots: composite PK with the partition key,
+        # a (player_id, date) unique constraint and a generated hot-stat column
+        session.execute(text(f"""
+            CREATE TABLE {TABLE} (
+                id serial,
+                player_id integer NOT NULL,
+                date date NOT NULL,
+                stats jsonb DEFAULT '{{}}',
+                stat_goals double precision GENERATED ALWAYS AS (
+                    CASE WHEN jsonb_typeof(stats->'goals') = 'number'
+                    THEN (stats->>'goals')::double precision END
+                ) STORED,
+                PRIMARY KEY (id, date),
+                UNIQUE (player_id, date)
+            ) PARTITION BY RANGE (date)
+        """))
+        session.commit()
+        yield session
+        session.rollback()
+        session.execute(text(f"DROP TABLE IF EXISTS {TABLE} CASCADE"))
+        session.commit()
+    engine.dispose()
+
+
+def insert_snapshot(db, player_id, day, goals):
+    db.execute(text(f"INSERT INTO {TABLE} (player_id, date, stats) VALUES (:p, :d, CAST(:s AS jsonb))"),
+               {"p": player_id, "d": day, "s": f'{{"goals": {goals}}}'})
+
+
+def test_rows_in_the_default_partition_move_into_a_new_range(db):
+    ensure_partitions(db, TABLE, date(2025, 1, 1), date(2025, 1, 31))
+    ensure_default_partition(db, TABLE)
+    db.commit()
+
+    # Outside every range: lands in the default partition instead of failing
+    insert_snapshot(db, 1, date(2025, 1, 10), 1)
+    insert_snapshot(db, 1, date(2025, 2, 3), 2)
+    insert_snapshot(db, 2, date(2025, 2, 20), 3)
+    insert_snapshot(db, 2, date(2025, 5, 1), 4)
+    db.commit()
+
+    assert ensure_partitions(db, TABLE, date(2025, 1, 1), date(2025, 3, 31)) == 2
+    db.commit()
+
+    assert f"{TABLE}_default" in existing_partitions(db, TABLE)
+    rows = db.execute(text(
+        f"SELECT tableoid::regclass::text, player_id, date, stat_goals FROM {TABLE} ORDER BY date"
+    )).all()
+    assert rows == [
+        (f"{TABLE}_2025_01", 1, date(2025, 1, 10), 1.0),
+        (f"{TABLE}_2025_02", 1, date(2025, 2, 3), 2.0),
+        (f"{TABLE}_2025_02", 2, date(2025, 2, 20), 3.0),
+        (f"{TABLE}_default", 2, date(2025, 5, 1), 4.0),
+    ]
+
+    # The moved partition keeps the parent's constraints and generated column
+    with pytest.raises(Exception, match="duplicate key"):
+        insert_snapshot(db, 1, date(2025, 2, 3), 5)
+    db.rollback()
+    insert_snapshot(db, 3, date(2025, 2, 4), 6)
+    assert db.execute(text(f"SELECT stat_goals FROM {TABLE}_2025_02 WHERE player_id = 3")).scalar() == 6.0
+
+
+def test_ranges_are_created_directly_when_the_default_partition_is_empty(db):
+    ensure_default_partition(db, TABLE)
+    assert not ensure_default_partition(db, TABLE)
+    assert ensure_partitions(db, TABLE, date(2025, 1, 1), date(2025, 2, 1)) == 2
+    assert ensure_partitions(db, TABLE, date(2025, 1, 1), date(2025, 2, 1)) == 0
+    db.commit()
+    assert existing_partitions(db, TABLE) == [f"{TABLE}_2025_01", f"{TABLE}_2025_02", f"{TABLE}_default"]
@@ -0,0 +1,19 @@
+from src.api.cache import ResponseCache
+
+
+def test_invalidation_during_a_build_is_not_lost():
+    cache = ResponseCache()
+    generation = cache.generation("players")
+    cache.invalidate("players")                     # Lands while the response is being built
+    assert not cache.set("players", 1, b"stale", generation=generation)
+    assert cache.get("players", 1) is None
+
+    generation = cache.generation("players")
+    cache.invalidate("leaderboards")                # Other namespaces don't matter
+    assert cache.set("players", 1, b"fresh", generation=generation)
+    assert cache.get("players", 1) == b"fresh"
+
+    generation = cache.generation("players")
+    cache.invalidate()                              # Everything, e.g. after a listener reconnect
+    assert not cache.set("players", 2, b"stale", generation=generation)
+    assert len(cache) == 0
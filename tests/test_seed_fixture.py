@@ -0,0 +1,26 @@
+import json
+from collections import Counter
+
+from src.database.seed_static import FIXTURE_PATH
+
+
+def load_fixture():
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        return json.load(f)["countries"]
+
+
+def test_fixture_names_are_unique():
+    """The seeder diffs countries, leagues and teams by name, so a repeat would be dropped."""
+    countries = load_fixture()
+    leagues = [league for c in countries for league in c.get("leagues", [])]
+    teams = [team if isinstance(team, str) else team["name"] for league in leagues for team in league["teams"]]
+
+    for names in ([c["name"] for c in countries], [league["name"] for league in leagues], teams):
+        assert [name for name, n in Counter(names).items() if n > 1] == []
+
+
+def test_every_league_has_teams():
+    for country in load_fixture():
+        assert country["iso_code"] and country["continent"]
+        for league in country.get("leagues", []):
+            assert league["teams"], league["name"]